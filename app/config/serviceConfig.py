@@ -0,0 +1,69 @@
+# 서비스 동작 설정 - 환경 변수로 덮어쓸 수 있음
+import os
+
+# 마이크로 배칭 설정 - 동시에 들어온 요청을 모아 한 번의 배치 추론으로 처리
+BATCH_MAX_SIZE = int(os.getenv("YOLO_BATCH_MAX_SIZE", "8"))  # 한 배치에 담을 최대 이미지 수
+BATCH_MAX_WAIT_MS = float(os.getenv("YOLO_BATCH_MAX_WAIT_MS", "10"))  # 첫 요청 이후 배치를 모으는 최대 대기 시간(ms)
+BATCH_MAX_PAGES = int(os.getenv("YOLO_BATCH_MAX_PAGES", "50"))  # 다중 페이지 업로드(/yolo-batch) 한 요청의 최대 페이지 수
+BATCH_MAX_PAGE_BYTES = int(os.getenv("YOLO_BATCH_MAX_PAGE_BYTES", str(20 * 1024 * 1024)))  # 페이지(압축 해제 후) 한 장의 최대 크기
+
+# 추론 실행기 설정 - 블로킹 추론/디코딩/크롭 작업을 이벤트 루프 밖의 전용 풀에서 실행
+INFERENCE_MODE = os.getenv("YOLO_INFERENCE_MODE", "thread")  # "thread" 또는 "process" (가중치 공유 워커 프로세스 풀)
+INFERENCE_THREADS_PER_WORKER = int(os.getenv("YOLO_INFERENCE_THREADS_PER_WORKER", "0"))  # 프로세스 모드의 워커당 torch 스레드 수 (0: 코어 수 / 워커 수)
+INFERENCE_WORKERS = int(os.getenv("YOLO_INFERENCE_WORKERS", "4"))  # 풀의 워커 수
+INFERENCE_MAX_QUEUE_DEPTH = int(os.getenv("YOLO_INFERENCE_MAX_QUEUE_DEPTH", "64"))  # 동시에 처리/대기할 수 있는 최대 요청 수 (초과 시 503)
+
+# OCR 요청 설정
+OCR_MAX_CONCURRENCY = int(os.getenv("OCR_MAX_CONCURRENCY", "16"))  # OCR 서버(서버2/클로바)로 동시에 보낼 최대 요청 수
+OCR_CACHE_MAX_ENTRIES = int(os.getenv("OCR_CACHE_MAX_ENTRIES", "10000"))  # 크롭 유사 해시 기준 OCR 결과 캐시 최대 항목 수 (0이면 끔)
+OCR_CACHE_TTL = float(os.getenv("OCR_CACHE_TTL", str(24 * 60 * 60)))  # OCR 캐시 항목 유효 시간(초)
+OCR_CACHE_MAX_DISTANCE = int(os.getenv("OCR_CACHE_MAX_DISTANCE", "23"))  # 같은 크롭으로 볼 128비트 해시의 최대 해밍 거리
+OCR_CACHE_MAX_PROFILE_MSE = float(os.getenv("OCR_CACHE_MAX_PROFILE_MSE", "0.25"))  # 해시가 가까운 후보를 적중으로 볼 밝기 프로파일 MSE 상한
+
+# 공유 HTTP 커넥션 풀 설정 (OCR 서버, 클로바, 헬스 체크)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))  # 최대 동시 커넥션 수
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))  # 유지할 keep-alive 커넥션 수
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))  # keep-alive 유지 시간(초)
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))  # 연결 타임아웃(초)
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "45"))  # 응답 대기 타임아웃(초)
+HTTP_POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", "10"))  # 풀에서 커넥션을 기다리는 타임아웃(초)
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "false").lower() in ("1", "true", "yes")  # HTTP/2 사용 여부 (h2 패키지 필요)
+
+# URL 이미지 다운로드 설정 (/yolo-from-url)
+URL_FETCH_MAX_BYTES = int(os.getenv("URL_FETCH_MAX_BYTES", str(20 * 1024 * 1024)))  # 최대 다운로드 크기 (초과 시 413)
+URL_FETCH_TIMEOUT = float(os.getenv("URL_FETCH_TIMEOUT", "15"))  # 읽기/쓰기 타임아웃(초) - 청크 하나를 기다리는 시간
+URL_FETCH_TOTAL_TIMEOUT = float(os.getenv("URL_FETCH_TOTAL_TIMEOUT", "30"))  # 다운로드 전체 제한 시간(초, 초과 시 504)
+
+# 서버2 헬스 모니터 설정
+HEALTH_CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", "5"))  # 백그라운드 확인 주기(초)
+HEALTH_CHECK_TTL = float(os.getenv("HEALTH_CHECK_TTL", "15"))  # 캐시된 상태의 유효 시간(초)
+HEALTH_FAILURE_THRESHOLD = int(os.getenv("HEALTH_FAILURE_THRESHOLD", "3"))  # 회로 차단기를 여는 연속 실패 횟수
+HEALTH_RECOVERY_TIMEOUT = float(os.getenv("HEALTH_RECOVERY_TIMEOUT", "10"))  # 회로 차단기가 열린 뒤 즉시 거절하는 시간(초)
+
+# 확인용 결과 파일 저장 경로 (비어 있으면 저장하지 않음) - 예: yolov5/runs/detect
+DEBUG_DUMP_DIR = os.getenv("DEBUG_DUMP_DIR", "")
+
+# 모델 설정 - 가중치를 .onnx로 지정하면 ONNX Runtime으로 서빙 (export.py --include onnx --dynamic-batch로 내보낸 모델 권장)
+MODEL_WEIGHTS = os.getenv("YOLO_WEIGHTS", "")  # 비어 있으면 기본 .pt 가중치
+ORT_INTRA_OP_THREADS = int(os.getenv("YOLO_ORT_INTRA_OP_THREADS", "0"))  # 연산자 내부 스레드 수 (0: 물리 코어 수, 프로세스 모드는 워커당 스레드 수)
+ORT_INTER_OP_THREADS = int(os.getenv("YOLO_ORT_INTER_OP_THREADS", "0"))  # 연산자 간 스레드 수 (parallel 모드에서만 사용)
+ORT_EXECUTION_MODE = os.getenv("YOLO_ORT_EXECUTION_MODE", "sequential")  # "sequential" 또는 "parallel"
+ORT_GRAPH_OPTIMIZATION = os.getenv("YOLO_ORT_GRAPH_OPTIMIZATION", "all")  # "disable", "basic", "extended", "all"
+ORT_MEM_PATTERN = os.getenv("YOLO_ORT_MEM_PATTERN", "true").lower() in ("1", "true", "yes")  # 같은 입력 크기의 메모리 할당 계획 재사용
+ORT_CPU_MEM_ARENA = os.getenv("YOLO_ORT_CPU_MEM_ARENA", "true").lower() in ("1", "true", "yes")  # CPU 메모리 아레나 사용
+ORT_IO_BINDING = os.getenv("YOLO_ORT_IO_BINDING", "true").lower() in ("1", "true", "yes")  # 입출력 버퍼 바인딩 (출력 배열 재사용)
+# OpenVINO 설정 - 가중치를 *_openvino_model 디렉터리(또는 .xml)로 지정하면 사용 (export.py --include openvino)
+OV_DEVICE = os.getenv("YOLO_OV_DEVICE", "AUTO")  # "CPU", "GPU", "AUTO"
+OV_PERFORMANCE_HINT = os.getenv("YOLO_OV_PERFORMANCE_HINT", "THROUGHPUT")  # "THROUGHPUT", "LATENCY", "CUMULATIVE_THROUGHPUT"
+OV_NUM_REQUESTS = int(os.getenv("YOLO_OV_NUM_REQUESTS", "0"))  # AsyncInferQueue의 추론 요청 수 (0: 힌트 기준 최적값)
+OV_NUM_STREAMS = os.getenv("YOLO_OV_NUM_STREAMS", "")  # CPU 추론 스트림 수 (비어 있으면 힌트가 결정, 프로세스 모드는 워커당 1)
+OV_NUM_THREADS = int(os.getenv("YOLO_OV_NUM_THREADS", "0"))  # CPU 추론 스레드 수 (0: 전체 코어, 프로세스 모드는 워커당 스레드 수)
+OV_DYNAMIC_BATCH = os.getenv("YOLO_OV_DYNAMIC_BATCH", "true").lower() in ("1", "true", "yes")  # 배치 1 모델을 동적 배치로 변환
+
+# 업로드 이미지 디코딩 설정 - 탐지용 이미지는 긴 변이 이 값 이상이 되는 가장 작은 JPEG 축소 배율(1/2, 1/4, 1/8)로 디코딩
+INGEST_MAX_SIDE = int(os.getenv("YOLO_INGEST_MAX_SIDE", "1280"))
+
+# 결과 캐시 설정 - 같은 사진을 다시 올리거나 재시도할 때 파이프라인 전체를 다시 실행하지 않음
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))  # 메모리 LRU 최대 크기 (0이면 메모리 캐시 끔)
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", "")  # 디스크 캐시 경로 (비어 있으면 사용하지 않음)
+RESULT_CACHE_DISK_MAX_BYTES = int(os.getenv("RESULT_CACHE_DISK_MAX_BYTES", str(1024 * 1024 * 1024)))  # 디스크 캐시 최대 크기 (초과 시 오래 사용하지 않은 파일부터 삭제)
@@ -1,2 +1,3 @@
 from .imageRouter import imageRouter
 from .yoloRouter import yoloRouter
+from .metricsRouter import metricsRouter
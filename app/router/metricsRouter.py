@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Response
+
+from app.service import metrics
+
+metricsRouter = APIRouter()
+
+
+# Prometheus 수집용 API
+@metricsRouter.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return Response(content=metrics.REGISTRY.render(), media_type=metrics.Registry.CONTENT_TYPE)
@@ -1,15 +1,22 @@
 from fastapi import APIRouter, File, UploadFile, HTTPException
-import requests
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+import asyncio
+import functools
+import json
 import os, sys
+import zipfile
 from io import BytesIO
 from pathlib import Path
 import logging
-import json
-from PIL import Image
 
 from app.service.yoloService import YOLOv5Service
+from app.service.healthMonitor import HealthMonitor
+from app.service.boxMatcher import detection_boxes, match_yolo_with_clova, parse_clova_result
+from app.service.debugDump import DebugDumper
+from app.service.resultCache import ResultCache
 
-from app.config import apikey, serverURL
+from app.config import apikey, serverURL, serviceConfig
 
 # 로그 설정
 # logging.config.fileConfig('app/config/logging_config.ini')
@@ -38,6 +45,28 @@ SERVER2_OCR_MULTI_URL = serverURL.SERVER2_OCR_MULTI_URL    # 이민섭 ocr서버
 CLOVA_OCR_URL = serverURL.CLOVA_OCR_URL
 CLOVA_SECRET_KEY = apikey.CLOVA_OCR_API_KEY
 
+# 확인용 결과 파일 저장 (opt-in)
+debug_dumper = DebugDumper(serviceConfig.DEBUG_DUMP_DIR)
+
+# 업로드 내용 기반 결과 캐시 (single-flight) - 적중한 응답의 크롭 파일명/클로바 requestId는 처음 계산한 요청의 값
+result_cache = ResultCache(max_bytes=serviceConfig.RESULT_CACHE_MAX_BYTES, disk_dir=serviceConfig.RESULT_CACHE_DIR,
+                           disk_max_bytes=serviceConfig.RESULT_CACHE_DISK_MAX_BYTES)
+
+# 서버2 상태를 백그라운드에서 확인하고 캐시하는 모니터 (main.py의 startup에서 시작)
+server2_monitor = HealthMonitor(lambda: yolov5_service.is_server2_healthy(SERVER2_HEALTH_URL),
+                                interval=serviceConfig.HEALTH_CHECK_INTERVAL, ttl=serviceConfig.HEALTH_CHECK_TTL,
+                                failure_threshold=serviceConfig.HEALTH_FAILURE_THRESHOLD, recovery_timeout=serviceConfig.HEALTH_RECOVERY_TIMEOUT)
+
+
+async def ensure_server2_healthy():
+    # 캐시된 서버2 상태 확인 - 요청마다 헬스 체크를 보내지 않음
+    if not await server2_monitor.is_available():
+        if server2_monitor.circuit_open:
+            logger.error("Server2 circuit breaker is open")
+            raise HTTPException(status_code=503, detail="Server2 is not available", headers={"Retry-After": str(int(serviceConfig.HEALTH_RECOVERY_TIMEOUT))})
+        logger.error("Server2 is not healthy")
+        raise HTTPException(status_code=500, detail="Server2 is not healthy")
+
 # 식별자
 class Temp_id:
     def __init__(self):
@@ -48,96 +77,210 @@ class Temp_id:
 
 temp_id = Temp_id()
 
+def result_key(image_bytes, route, **config):
+    # 업로드 내용 + 라우트 + 모델/임계값 설정으로 결과 캐시 키 생성
+    return result_cache.make_key(image_bytes, route=route, **yolov5_service.cache_config(), **config)
+
+
+# 스트리밍 응답 형식 (?stream=ndjson 또는 ?stream=sse)
+STREAM_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+def check_stream_format(stream):
+    if stream is not None and stream not in STREAM_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"stream must be one of {sorted(STREAM_MEDIA_TYPES)}")
+
+def encode_event(event, data, stream):
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    if stream == "sse":
+        return f"event: {event}\ndata: {payload}\n\n"
+    return f'{{"event": "{event}", "data": {payload}}}\n'
+
+def detection_event(result, crops):
+    # NMS 직후 보내는 탐지 결과 - 클래스, 신뢰도, 원본 기준 박스와 카테고리별 크롭 파일명
+    return {
+        "count": len(result),
+        "detections": [
+            {"class_name": yolov5_service.class_names.get(cls, str(cls)), "confidence": round(conf, 4), "box": [round(v, 1) for v in xyxy]}
+            for xyxy, conf, cls in result
+        ],
+        "crops": {category: [name for name, _ in images] for category, images in crops.items()},
+    }
+
+def streaming_response(result, crops, ocr_results, to_event, stream):
+    # 탐지 결과를 먼저 보내고, OCR 결과는 완료되는 대로 하나씩 보냄
+    # 탐지까지는 응답 전에 끝나므로 디코딩/대기열/탐지 오류는 일반 HTTP 상태 코드로 반환되고,
+    # 스트림 도중의 OCR 오류는 error 이벤트로 전달됨
+    async def body():
+        yield encode_event("detections", detection_event(result, crops), stream)
+        try:
+            async for item in ocr_results:
+                yield encode_event("ocr", to_event(*item), stream)
+        except HTTPException as e:
+            yield encode_event("error", {"status_code": e.status_code, "detail": e.detail}, stream)
+            return
+        except Exception as e:
+            logger.error(f"OCR 스트리밍 중 오류 발생: {e}")
+            yield encode_event("error", {"status_code": 500, "detail": str(e)}, stream)
+            return
+        finally:
+            await ocr_results.aclose()  # 클라이언트 연결이 끊기면 남은 OCR 요청 취소
+        yield encode_event("done", {}, stream)
+
+    return StreamingResponse(body(), media_type=STREAM_MEDIA_TYPES[stream], headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+async def stream_server2_ocr(image_bytes, stream):
+    # /yolo, /yolo-from-url 스트리밍 모드 - 카테고리별 서버2 OCR 결과를 완료 순서대로 전송 (결과 캐시는 사용하지 않음)
+    file_id = temp_id.get_id()
+    result, crops = await yolov5_service.textDetectionBatched(image_bytes, file_id)
+    ocr_results = yolov5_service.iter_crops_to_ocr(crops, SERVER2_OCR_MULTI_URL)
+    return streaming_response(result, crops, ocr_results, lambda category, data: {"category": category, "result": data}, stream)
+
+
 # 파일을 직접 받아서 작업하는 API
 @yoloRouter.post("/yolo", response_model=dict)
-async def process_image(file: UploadFile = File(...)):
+async def process_image(file: UploadFile = File(...), stream: Optional[str] = None):
+    check_stream_format(stream)
     
-    # 서버2가 정상적으로 작동하는지 확인
-    if not await yolov5_service.is_server2_healthy(SERVER2_HEALTH_URL):
-        logger.error("Server2 is not healthy")
-        raise HTTPException(status_code=500, detail="Server2 is not healthy")
+    # 업로드 파일을 메모리에서 바로 처리 (임시 파일 없음)
+    image_bytes = await file.read()
     
-    # 임시 저장할 파일 경로
-    file_id = temp_id.get_id()
-    temp_file_path = await yolov5_service.save_temp_file(file, file_id)
-    logger.info(f"임시 파일 경로: {temp_file_path}")
+    # 스트리밍 모드 - 탐지 결과와 카테고리별 OCR 결과를 나오는 대로 전송
+    if stream:
+        await ensure_server2_healthy()
+        return await stream_server2_ocr(image_bytes, stream)
     
-    # yolo로 이미지 크롭 수행
-    textDetectionResult = yolov5_service.textDetection(temp_file_path, file_id)
-    logger.info(f"yolo로 이미지 크롭 수행 결과: {textDetectionResult}")
+    async def compute():
+        # 서버2가 정상적으로 작동하는지 확인 (캐시된 상태)
+        await ensure_server2_healthy()
+        
+        file_id = temp_id.get_id()
+        
+        # yolo로 이미지 크롭 수행
+        textDetectionResult, crops = await yolov5_service.textDetectionBatched(image_bytes, file_id)
+        logger.info(f"yolo로 이미지 크롭 수행 결과: {len(textDetectionResult)}개 탐지")
+
+        # 크롭된 이미지 버퍼들을 OCR 서버로 전송, 결과 반환
+        return await yolov5_service.send_crops_to_ocr(crops, SERVER2_OCR_MULTI_URL)
     
-    # 임시 파일 삭제
-    os.remove(temp_file_path)
-    logger.info("임시 파일을 성공적으로 삭제했습니다")
-
-    # 크롭된 이미지들을 OCR 서버로 전송, 파일 삭제, 결과 반환
-    dir_path = Path("yolov5") / "runs" / "detect" / file_id / "crops" # 크롭된 이미지 경로
-    remove_folder_path = Path("yolov5") / "runs" / "detect" / file_id
-    return await yolov5_service.send_cropped_images_to_ocr(dir_path, remove_folder_path, SERVER2_OCR_MULTI_URL)
+    # 같은 이미지의 결과가 있거나 처리 중이면 재사용
+    return await result_cache.get_or_compute(result_key(image_bytes, "yolo", conf_thres=0.6, ocr_url=SERVER2_OCR_MULTI_URL), compute)
     # return {"message": "success"}
 
 
 # URL로 이미지를 받아서 작업하는 API
 @yoloRouter.post("/yolo-from-url", response_model=dict)
-async def process_image_from_url(image_url: str):
-    # 서버2가 정상적으로 작동하는지 확인
-    if not await yolov5_service.is_server2_healthy(SERVER2_HEALTH_URL):
-        logger.error("Server2 is not healthy")
-        raise HTTPException(status_code=500, detail="Server2 is not healthy")
-
-    # 몽고아이디
-    file_id = temp_id.get_id()
+async def process_image_from_url(image_url: str, stream: Optional[str] = None):
+    check_stream_format(stream)
 
-    # 이미지를 받아서 BytesIO 객체로 변환
-    try:
-        response = requests.get(image_url)
-        response.raise_for_status()
-    except requests.RequestException as e:
-        raise HTTPException(status_code=400, detail=str(e))
-
-    image_bytes = BytesIO(response.content)
+    # 이미지를 공유 커넥션 풀로 스트리밍 다운로드 (크기 제한, 이벤트 루프를 막지 않음)
+    image_bytes = await yolov5_service.fetch_image(image_url)
+    
+    # 스트리밍 모드 - 탐지 결과와 카테고리별 OCR 결과를 나오는 대로 전송
+    if stream:
+        await ensure_server2_healthy()
+        return await stream_server2_ocr(image_bytes, stream)
     
-    # 임시 저장할 파일 경로
-    temp_image_path = f"temp_{image_url.split('/')[-1]}"
-    logger.info(f"임시 파일 경로: {temp_image_path}")
+    async def compute():
+        # 서버2가 정상적으로 작동하는지 확인 (캐시된 상태) - 캐시 적중 시에는 확인하지 않음
+        await ensure_server2_healthy()
+        
+        # 몽고아이디
+        file_id = temp_id.get_id()
+        
+        # yolo로 이미지 크롭 수행 (임시 파일 없이 메모리에서 처리)
+        textDetectionResult, crops = await yolov5_service.textDetectionBatched(image_bytes, file_id)
+        logger.info(f"yolo로 이미지 크롭 수행 결과: {len(textDetectionResult)}개 탐지")
 
-    with open(temp_image_path, 'wb') as image_file:
-        image_file.write(image_bytes.read())
+        # 크롭된 이미지 버퍼들을 OCR 서버로 전송
+        return await yolov5_service.send_crops_to_ocr(crops, SERVER2_OCR_MULTI_URL)
     
-    # yolo로 이미지 크롭 수행
-    yolov5_service.textDetection(temp_image_path, file_id)
+    # 같은 이미지의 결과가 있거나 처리 중이면 재사용 (URL이 달라도 내용이 같으면 재사용)
+    return await result_cache.get_or_compute(result_key(image_bytes, "yolo", conf_thres=0.6, ocr_url=SERVER2_OCR_MULTI_URL), compute)
+
+
+# 다중 페이지 업로드 - 압축 파일 안에서 읽을 이미지 확장자
+PAGE_IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp", ".webp", ".tif", ".tiff"}
+
+def read_pages(uploads):
+    # [(파일명, 바이트)] 업로드 목록을 페이지 목록으로 펼침 - zip 파일은 안의 이미지들을 파일명 순서로 추가
+    pages = []
+    def add_page(filename, read):
+        if len(pages) >= serviceConfig.BATCH_MAX_PAGES:
+            raise HTTPException(status_code=413, detail=f"Too many pages (max {serviceConfig.BATCH_MAX_PAGES})")
+        pages.append((filename, read()))
+
+    for filename, data in uploads:
+        if not zipfile.is_zipfile(BytesIO(data)):
+            add_page(filename, lambda: data)
+            continue
+        with zipfile.ZipFile(BytesIO(data)) as archive:
+            members = sorted((info for info in archive.infolist()
+                              if not info.is_dir() and Path(info.filename).suffix.lower() in PAGE_IMAGE_SUFFIXES),
+                             key=lambda info: info.filename)
+            for info in members:
+                if info.file_size > serviceConfig.BATCH_MAX_PAGE_BYTES:
+                    raise HTTPException(status_code=413, detail=f"{info.filename} is larger than {serviceConfig.BATCH_MAX_PAGE_BYTES} bytes")
+                add_page(info.filename, functools.partial(archive.read, info))
+    return pages
+
+
+# 여러 페이지(이미지 여러 장 또는 zip)를 한 번에 받아서 작업하는 API
+@yoloRouter.post("/yolo-batch", response_model=dict)
+async def process_images(files: List[UploadFile] = File(...)):
+    # 서버2가 정상적으로 작동하는지 확인 (요청당 한 번)
+    await ensure_server2_healthy()
+
+    uploads = [(file.filename, await file.read()) for file in files]
+    pages = await asyncio.to_thread(read_pages, uploads)
+    if not pages:
+        raise HTTPException(status_code=400, detail="No images in upload")
     
-    # 임시 파일 삭제
-    os.remove(temp_image_path)
-    logger.info("임시 파일을 성공적으로 삭제했습니다 - 욜로 크롭 수행 종료")
-
-    # 크롭된 이미지들을 OCR 서버로 전송
-    dir_path = Path("yolov5") / "runs" / "detect" / file_id / "crops" # 크롭된 이미지 경로
-    remove_folder_path = Path("yolov5") / "runs" / "detect" / file_id
-    return await yolov5_service.send_cropped_images_to_ocr(dir_path, remove_folder_path, SERVER2_OCR_MULTI_URL)
+    # 모든 페이지를 배치 추론 (BATCH_MAX_SIZE장씩 한 번의 forward/NMS)
+    file_ids = [temp_id.get_id() for _ in pages]
+    detections = await yolov5_service.textDetectionPages([data for _, data in pages], file_ids)
+    logger.info(f"yolo로 {len(pages)}페이지 크롭 수행 결과: {sum(len(result) for result, _ in detections)}개 탐지")
+
+    # 모든 페이지의 크롭을 한 번에 동시 전송 (동시 요청 수는 ocr_semaphore로 제한)
+    ocr_results = await yolov5_service.gather_or_cancel(
+        yolov5_service.send_crops_to_ocr(crops, SERVER2_OCR_MULTI_URL) for _, crops in detections
+    )
+    
+    # 페이지 번호(업로드 순서, zip은 파일명 순서) 기준 결과
+    return {
+        "pages": {
+            index: {"file_name": filename, "result": result}
+            for index, ((filename, _), result) in enumerate(zip(pages, ocr_results))
+        }
+    }
 
 
 # 클로바 OCR 서버로 이미지를 받아서 작업하는 API
 @yoloRouter.post("/yolo_clova", response_model=dict)
-async def use_clovaOCR(file: UploadFile = File(...)):
+async def use_clovaOCR(file: UploadFile = File(...), stream: Optional[str] = None):
+    check_stream_format(stream)
     
-    # 임시 저장할 파일 경로
-    file_id = temp_id.get_id()
-    temp_file_path = await yolov5_service.save_temp_file(file, file_id)
-    logger.info(f"임시 파일 경로: {temp_file_path}")
+    # 업로드 파일을 메모리에서 바로 처리 (임시 파일 없음)
+    image_bytes = await file.read()
+    
+    # 스트리밍 모드 - 탐지 결과와 크롭별 클로바 OCR 결과를 나오는 대로 전송 (결과 캐시는 사용하지 않음)
+    if stream:
+        result, crops = await yolov5_service.textDetectionBatched(image_bytes, temp_id.get_id())
+        ocr_results = yolov5_service.iter_crops_to_clovaOCR(crops, ocr_url=CLOVA_OCR_URL, api_secret_key=CLOVA_SECRET_KEY)
+        return streaming_response(result, crops, ocr_results,
+                                  lambda category, name, data: {"category": category, "file_name": name, "result": data}, stream)
     
-    # yolo로 이미지 크롭 수행
-    textDetectionResult = yolov5_service.textDetection(temp_file_path, file_id)
-    logger.info(f"yolo로 이미지 크롭 수행 결과: {textDetectionResult}")
+    async def compute():
+        file_id = temp_id.get_id()
+        
+        # yolo로 이미지 크롭 수행
+        textDetectionResult, crops = await yolov5_service.textDetectionBatched(image_bytes, file_id)
+        logger.info(f"yolo로 이미지 크롭 수행 결과: {len(textDetectionResult)}개 탐지")
+
+        # 크롭된 이미지 버퍼들을 클로바 OCR로 전송, 결과 반환
+        return await yolov5_service.send_crops_to_clovaOCR(crops, ocr_url=CLOVA_OCR_URL, api_secret_key=CLOVA_SECRET_KEY)
     
-    # 임시 파일 삭제
-    os.remove(temp_file_path)
-    logger.info("임시 파일을 성공적으로 삭제했습니다")
-
-    # 크롭된 이미지들을 OCR 서버로 전송, 파일 삭제, 결과 반환
-    dir_path = Path("yolov5") / "runs" / "detect" / file_id / "crops" # 크롭된 이미지 경로
-    remove_folder_path = Path("yolov5") / "runs" / "detect" / file_id
-    return await yolov5_service.send_cropped_images_to_clovaOCR(dir_path=dir_path, remove_folder_path=remove_folder_path, ocr_url=CLOVA_OCR_URL,  api_secret_key=CLOVA_SECRET_KEY)
+    # 같은 이미지의 결과가 있거나 처리 중이면 재사용
+    return await result_cache.get_or_compute(result_key(image_bytes, "yolo_clova", conf_thres=0.6, ocr_url=CLOVA_OCR_URL), compute)
     # return {"message": "success"} 
 
 
@@ -146,27 +289,42 @@ async def use_clovaOCR(file: UploadFile = File(...)):
 @yoloRouter.post("/yolo_clova_once", response_model=dict)
 async def use_clovaOCR(file: UploadFile = File(...)):
     
-    # 임시 저장할 파일 경로
-    file_id = temp_id.get_id()
-    temp_file_path = await yolov5_service.save_temp_file(file, file_id)
-    logger.info(f"임시 파일 경로: {temp_file_path}")
-    
-    # yolo로 이미지 크롭 수행\
-    try:
-        yolov5_service.textDetection(image_path=temp_file_path, file_id=file_id, save_csv=True, save_txt=True, save_crop=False, conf_thres=0.3)
+    # 업로드 파일을 메모리에서 바로 처리 (임시 파일, 라벨 txt, 클로바 JSON 파일 없음)
+    image_bytes = await file.read()
     
-    except Exception as e:
-        logger.error(f"yolo로 이미지 크롭 수행 중 오류 발생: {e}")
-        raise HTTPException(status_code=500, detail="yolo로 이미지 크롭 수행 중 오류 발생")
+    # 같은 이미지의 결과가 있거나 처리 중이면 재사용
+    key = result_key(image_bytes, "yolo_clova_once", conf_thres=0.3, overlap_threshold=0.5, ocr_url=CLOVA_OCR_URL)
+    return await result_cache.get_or_compute(key, lambda: yolo_clova_once(image_bytes))
 
-        
-    # # 클로바 OCR 서버로 전송
-    try:
-        clova_result = await yolov5_service.send_original_image_to_clovaOCR(img_path=temp_file_path, ocr_url=CLOVA_OCR_URL,  api_secret_key=CLOVA_SECRET_KEY)
-        logger.info(f"클로바 OCR 서버로 이미지 전송 성공")
-    except Exception as e:
-        logger.error(f"클로바 OCR 서버로 이미지 전송 중 오류 발생: {e}")
-        raise HTTPException(status_code=500, detail="클로바 OCR 서버로 이미지 전송 중 오류 발생")
+
+# /yolo_clova_once 파이프라인 - YOLO 탐지 결과와 클로바 OCR 전체 결과를 매칭
+async def yolo_clova_once(image_bytes):
+    file_id = temp_id.get_id()
+    
+    # yolo로 텍스트 영역 탐지 (크롭 없이 절대 좌표 결과만 사용)
+    async def detect():
+        try:
+            detection_result, _ = await yolov5_service.textDetectionBatched(image_bytes, file_id, conf_thres=0.3, save_crop=False)
+            return detection_result
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"yolo로 이미지 크롭 수행 중 오류 발생: {e}")
+            raise HTTPException(status_code=500, detail="yolo로 이미지 크롭 수행 중 오류 발생")
+
+    # 클로바 OCR 서버로 전송
+    async def clova_ocr():
+        try:
+            clova_result = await yolov5_service.send_image_bytes_to_clovaOCR(f"{file_id}.jpg", image_bytes, ocr_url=CLOVA_OCR_URL, api_secret_key=CLOVA_SECRET_KEY)
+            logger.info(f"클로바 OCR 서버로 이미지 전송 성공")
+            return clova_result
+        except Exception as e:
+            logger.error(f"클로바 OCR 서버로 이미지 전송 중 오류 발생: {e}")
+            raise HTTPException(status_code=500, detail="클로바 OCR 서버로 이미지 전송 중 오류 발생")
+
+    # 로컬 추론과 클로바 OCR 요청은 서로 독립적이므로 동시에 실행 - 지연 시간이 합이 아닌 max(탐지, OCR)
+    # 하나가 실패하면 나머지는 취소됨
+    detection_result, clova_result = await yolov5_service.gather_or_cancel([detect(), clova_ocr()])
     
     # 전체적인 내용을 original_content에 저장
     original_content = ""
@@ -175,118 +333,15 @@ async def use_clovaOCR(file: UploadFile = File(...)):
             for field in image_data.get('fields', []):
                 original_content += field.get('inferText', '') + " "
     
-    # 확인용 파일 저장
-    write_path = Path("yolov5") / "runs" / "detect" / file_id / "clova_result" / f"{file_id}.json"
-    write_path.parent.mkdir(parents=True, exist_ok=True)  # 상위 디렉토리까지 생성
-
-    with open(write_path, 'w', encoding='utf-8') as f:
-        json.dump(clova_result, f, ensure_ascii=False, indent=4)  # JSON으로 변환 후 저장
-    logger.info(f"클로바 OCR 결과 저장 완료: {write_path}")
-    
-    # 이미지 파일의 크기 대입
-    with Image.open(temp_file_path) as img:
-        image_width, image_height = img.size
-
-    # YOLO 텍스트 파일을 읽어 상대 좌표를 절대 좌표로 변환
-    def parse_yolo_txt(yolo_txt_path):
-        yolo_boxes = []
-        with open(yolo_txt_path, 'r') as f:
-            for line in f:
-                data = line.strip().split()
-                class_id = int(data[0])
-                center_x = float(data[1]) * image_width
-                center_y = float(data[2]) * image_height
-                width = float(data[3]) * image_width
-                height = float(data[4]) * image_height
-
-                # YOLO의 (center_x, center_y, width, height)를 (x_min, y_min, x_max, y_max)로 변환
-                x_min = center_x - width / 2
-                y_min = center_y - height / 2
-                x_max = center_x + width / 2
-                y_max = center_y + height / 2
-                yolo_boxes.append({"class_id": class_id, "bbox": (x_min, y_min, x_max, y_max)})
-        return yolo_boxes
-
-    # 클로바 OCR JSON 파일을 읽어와 텍스트 영역을 반환
-    def parse_clova_json(clova_json_path):
-        with open(clova_json_path, 'r', encoding='utf-8') as f:
-            clova_data = json.load(f)
-        clova_boxes = []
-        for image in clova_data.get("images", []):
-            for field in image.get("fields", []):
-                vertices = field["boundingPoly"]["vertices"]
-                x_min = vertices[0]["x"]
-                y_min = vertices[0]["y"]
-                x_max = vertices[2]["x"]
-                y_max = vertices[2]["y"]
-                infer_text = field["inferText"]
-                clova_boxes.append({"bbox": (x_min, y_min, x_max, y_max), "text": infer_text})
-        return clova_boxes
-
-    # 두 박스의 IoU를 계산해 겹침 비율 반환
-    def calculate_iou(box1, box2):
-        x1, y1, x2, y2 = box1
-        x3, y3, x4, y4 = box2
-
-        # 교집합 좌표 계산
-        inter_x1 = max(x1, x3)
-        inter_y1 = max(y1, y3)
-        inter_x2 = min(x2, x4)
-        inter_y2 = min(y2, y4)
-
-        # 교집합 넓이 계산
-        inter_area = max(0, inter_x2 - inter_x1) * max(0, inter_y2 - inter_y1)
-        
-        # 각 박스 넓이 계산
-        box1_area = (x2 - x1) * (y2 - y1)
-        box2_area = (x4 - x3) * (y4 - y3)
-
-        # IoU 계산
-        return inter_area / box2_area if box2_area else 0
-
-    # YOLO 박스와 클로바 텍스트 영역을 비교해 N% 이상 겹칠 경우 포함
-    def match_yolo_with_clova(yolo_boxes, clova_boxes, overlap_threshold=0.5):
-        result = {}
-        for yolo_box in yolo_boxes:
-            class_id = yolo_box["class_id"]
-            yolo_bbox = yolo_box["bbox"]
-            included_texts = []
-
-            for clova_box in clova_boxes:
-                clova_bbox = clova_box["bbox"]
-                infer_text = clova_box["text"]
-
-                # 겹치는 비율 계산
-                overlap_ratio = calculate_iou(yolo_bbox, clova_bbox)
-
-                # 겹치는 비율이 설정된 threshold 이상인 경우 텍스트 포함
-                if overlap_ratio >= overlap_threshold:
-                    included_texts.append(infer_text)
-
-            # 텍스트들을 문장 형태로 결합하여 저장
-            if included_texts:
-                class_name = yolov5_service.class_names.get(class_id, f"unknown_class_{class_id}")
-                if class_name not in result:
-                    result[class_name] = {}
-
-                # 텍스트를 문장 형태로 결합하여 저장
-                combined_text = ' '.join(included_texts)
-                # "texts_1", "texts_2" 형태로 저장
-                text_entry_key = f"texts_{len(result[class_name]) + 1}"
-                result[class_name][text_entry_key] = combined_text
-
-        return result
-
+    # 확인용 파일 저장 (DEBUG_DUMP_DIR 설정 시에만, 백그라운드에서 저장)
+    debug_dumper.dump(file_id, result=detection_result, clova_result=clova_result)
     
-    # 파일 경로 설정
-    yolo_txt_path = Path("yolov5") / "runs" / "detect" / file_id / "labels" / f"{file_id}.txt"
-    clova_json_path = Path("yolov5") / "runs" / "detect" / file_id / "clova_result" / f"{file_id}.json"
     N = 0.5
     
-    # YOLO, 클로바 OCR 데이터 파싱 및 매칭 수행
-    yolo_boxes = parse_yolo_txt(yolo_txt_path)
-    clova_boxes = parse_clova_json(clova_json_path)
-    matched_data = match_yolo_with_clova(yolo_boxes, clova_boxes, overlap_threshold=N)
+    # YOLO, 클로바 OCR 결과 매칭 수행 (메모리의 결과 객체 사용)
+    yolo_boxes = detection_boxes(detection_result)
+    clova_boxes = parse_clova_result(clova_result)
+    matched_data = match_yolo_with_clova(yolo_boxes, clova_boxes, yolov5_service.class_names, overlap_threshold=N)
     
     result_data = {"original_content": original_content}
     result_data.update(matched_data)
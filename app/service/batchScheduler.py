@@ -0,0 +1,112 @@
+import asyncio
+import functools
+import logging
+
+from app.service import metrics
+
+
+class BatchScheduler:
+    # 동시에 들어온 탐지 요청을 최대 max_batch_size개 / max_wait_ms 동안 모아 한 번의 배치 추론으로 처리하고
+    # 결과를 기다리던 코루틴들에게 나눠주는 스케줄러
+    def __init__(self, detect_batch, max_batch_size=8, max_wait_ms=10, executor=None):
+        # detect_batch(images, conf_thres=conf_thres_list) -> 이미지별 결과 리스트
+        # executor: 배치 추론을 실행할 InferenceExecutor (없으면 이벤트 루프의 기본 스레드 풀)
+        self.detect_batch = detect_batch
+        self.executor = executor
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.logger = logging.getLogger(__name__)
+        self.queue = None
+        self.workers = []
+
+    def start(self):
+        # 현재 이벤트 루프에서 배치 워커 시작 (이미 실행 중이면 무시)
+        # 실행기가 동시에 처리할 수 있는 배치 수(프로세스 모드의 워커 수)만큼 워커 코루틴을 띄움
+        if not self.workers or all(worker.done() for worker in self.workers):
+            concurrency = self.executor.concurrency if self.executor is not None else 1
+            self.queue = asyncio.Queue()
+            self.workers = [asyncio.get_running_loop().create_task(self.run()) for _ in range(concurrency)]
+            self.logger.info(f"배치 스케줄러 시작 - 최대 배치: {self.max_batch_size}, 최대 대기: {self.max_wait * 1000:.0f}ms, 동시 배치: {concurrency}")
+
+    async def stop(self):
+        # 워커 종료, 대기 중인 요청은 취소
+        for worker in self.workers:
+            worker.cancel()
+        for worker in self.workers:
+            try:
+                await worker
+            except asyncio.CancelledError:
+                pass
+        self.workers = []
+        while self.queue is not None and not self.queue.empty():
+            _, _, future = self.queue.get_nowait()
+            if not future.done():
+                future.cancel()
+        self.logger.info("배치 스케줄러 종료")
+
+    async def submit(self, image, conf_thres):
+        # 요청을 큐에 넣고 배치 추론 결과를 기다림
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((image, conf_thres, future))
+        return await future
+
+    async def collect(self):
+        # 첫 요청이 들어오면 max_wait 동안 또는 배치가 찰 때까지 추가 요청을 모음
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return [item for item in batch if not item[2].cancelled()]  # 이미 취소된 요청 제외
+
+    async def infer(self, images, conf_thres):
+        # 추론은 이벤트 루프를 막지 않도록 풀에서 실행
+        if self.executor is not None:
+            return await self.executor.run(self.detect_batch, images, conf_thres=conf_thres)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(self.detect_batch, images, conf_thres=conf_thres))
+
+    async def run_one(self, image, conf_thres, future):
+        # 실패한 배치의 요청 하나를 단독으로 다시 실행 - 원인이 된 요청만 예외를 받음
+        try:
+            result, = await self.infer([image], [conf_thres])
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(result)
+
+    async def run(self):
+        while True:
+            batch = await self.collect()
+            if not batch:
+                continue
+            images = [image for image, _, _ in batch]
+            conf_thres = [conf for _, conf, _ in batch]
+            try:
+                results = await self.infer(images, conf_thres)
+            except Exception as e:
+                self.logger.error(f"배치 추론 중 에러 발생 (배치 크기: {len(batch)}): {e}")
+                if len(batch) == 1:
+                    _, _, future = batch[0]
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    for item in batch:
+                        await self.run_one(*item)
+                continue
+            self.logger.info(f"배치 추론 완료 - 배치 크기: {len(batch)}")
+            metrics.BATCH_SIZE.observe(len(batch))
+            for stage, seconds in getattr(results[0], "timings", {}).items() if results else ():
+                metrics.STAGE_SECONDS.labels(stage).observe(seconds)
+            for (_, _, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
@@ -0,0 +1,87 @@
+import numpy as np
+
+from yolov5 import detection  # noqa: F401 - yolov5 루트를 sys.path에 추가 (utils.metrics 임포트용)
+from utils.metrics import bbox_ioa
+
+
+# 클로바 필드 수가 이 값 이상이면 x축 정렬 스윕으로 후보를 먼저 거른 뒤 겹침 비율 계산
+PREFILTER_MIN_FIELDS = 256
+
+
+def overlap_matrix(yolo_xyxy, clova_xyxy):
+    # (N, 4) YOLO 박스와 (M, 4) 클로바 박스의 (N, M) 겹침 비율 행렬 (교집합 / 클로바 박스 넓이)
+    # utils.metrics.bbox_ioa에 (4, N, 1) 형태로 넘겨 브로드캐스팅으로 한 번에 계산
+    yolo_xyxy = np.asarray(yolo_xyxy, dtype=np.float64).reshape(-1, 4)
+    clova_xyxy = np.asarray(clova_xyxy, dtype=np.float64).reshape(-1, 4)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ioa = bbox_ioa(yolo_xyxy.T[..., None], clova_xyxy, eps=0)
+    return np.nan_to_num(ioa, nan=0.0, posinf=0.0, neginf=0.0)  # 넓이가 0인 클로바 박스는 0
+
+
+def sweep_candidates(yolo_xyxy, clova_xyxy):
+    # x축 정렬 스윕 - YOLO 박스마다 x 범위가 겹치는 클로바 박스 인덱스만 원래 순서대로 반환
+    order = np.argsort(clova_xyxy[:, 0], kind="stable")
+    x1_sorted = clova_xyxy[order, 0]
+    candidates = []
+    for x1, _, x2, _ in yolo_xyxy:
+        idx = order[:np.searchsorted(x1_sorted, x2, side="right")]  # 클로바 x_min <= YOLO x_max
+        idx = idx[clova_xyxy[idx, 2] >= x1]  # 클로바 x_max >= YOLO x_min
+        candidates.append(np.sort(idx))
+    return candidates
+
+
+def match_yolo_with_clova(yolo_boxes, clova_boxes, class_names, overlap_threshold=0.5, prefilter=None):
+    # YOLO 박스와 클로바 텍스트 영역을 비교해 클로바 박스가 N% 이상 YOLO 박스 안에 들어오면 해당 텍스트 포함
+    #   yolo_boxes:  [{"class_id": int, "bbox": (x_min, y_min, x_max, y_max)}, ...]
+    #   clova_boxes: [{"bbox": (x_min, y_min, x_max, y_max), "text": str}, ...]
+    #   prefilter:   None이면 클로바 필드 수가 PREFILTER_MIN_FIELDS 이상일 때만 스윕 사전 필터 사용
+    # 반환값: {class_name: {"texts_1": "...", "texts_2": "..."}}
+    result = {}
+    if not yolo_boxes or not clova_boxes:
+        return result
+
+    yolo_xyxy = np.array([box["bbox"] for box in yolo_boxes], dtype=np.float64)
+    clova_xyxy = np.array([box["bbox"] for box in clova_boxes], dtype=np.float64)
+    texts = [box["text"] for box in clova_boxes]
+
+    if prefilter is None:
+        prefilter = len(clova_boxes) >= PREFILTER_MIN_FIELDS
+    if prefilter:
+        matches = []
+        for yolo_bbox, idx in zip(yolo_xyxy, sweep_candidates(yolo_xyxy, clova_xyxy)):
+            ioa = overlap_matrix(yolo_bbox, clova_xyxy[idx])[0]
+            matches.append(idx[ioa >= overlap_threshold])
+    else:
+        mask = overlap_matrix(yolo_xyxy, clova_xyxy) >= overlap_threshold
+        matches = [np.flatnonzero(row) for row in mask]
+
+    for yolo_box, idx in zip(yolo_boxes, matches):
+        # 텍스트들을 문장 형태로 결합하여 저장 (클로바 결과 순서 유지)
+        if len(idx):
+            class_id = yolo_box["class_id"]
+            class_name = class_names.get(class_id, f"unknown_class_{class_id}")
+            entries = result.setdefault(class_name, {})
+            # "texts_1", "texts_2" 형태로 저장
+            entries[f"texts_{len(entries) + 1}"] = ' '.join(texts[i] for i in idx)
+
+    return result
+
+
+def detection_boxes(result):
+    # detection.DetectionResult(원본 해상도 절대 좌표 xyxy, 읽기 순서)를 매칭용 박스 목록으로 변환
+    return [{"class_id": cls, "bbox": tuple(xyxy), "conf": conf} for xyxy, conf, cls in result]
+
+
+def parse_clova_result(clova_data):
+    # 클로바 OCR V2 응답(dict)에서 텍스트 영역 목록을 반환
+    clova_boxes = []
+    for image in (clova_data or {}).get("images", []):
+        for field in image.get("fields", []):
+            vertices = field["boundingPoly"]["vertices"]
+            x_min = vertices[0]["x"]
+            y_min = vertices[0]["y"]
+            x_max = vertices[2]["x"]
+            y_max = vertices[2]["y"]
+            infer_text = field["inferText"]
+            clova_boxes.append({"bbox": (x_min, y_min, x_max, y_max), "text": infer_text})
+    return clova_boxes
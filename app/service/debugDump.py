@@ -0,0 +1,45 @@
+import asyncio
+import json
+import logging
+from pathlib import Path
+
+
+class DebugDumper:
+    # 확인용 결과 파일(클로바 응답 JSON, YOLO 라벨 txt)을 요청 경로와 분리해 백그라운드 스레드에서 저장
+    # root가 비어 있으면 비활성화 (기본값) - 요청 처리 결과에는 영향을 주지 않음
+    def __init__(self, root=None):
+        self.root = Path(root) if root else None
+        self.tasks = set()  # 실행 중인 저장 작업 (GC 방지)
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def enabled(self):
+        return self.root is not None
+
+    def dump(self, file_id, result=None, clova_result=None):
+        # 저장 작업을 예약만 하고 바로 반환
+        if not self.enabled:
+            return
+        task = asyncio.get_running_loop().create_task(asyncio.to_thread(self.write, file_id, result, clova_result))
+        self.tasks.add(task)
+        task.add_done_callback(self.done)
+
+    def done(self, task):
+        self.tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.logger.warning(f"확인용 파일 저장 실패: {task.exception()}")
+
+    def write(self, file_id, result=None, clova_result=None):
+        save_dir = self.root / file_id
+        if result is not None:
+            # YOLO 라벨 형식(class x_center y_center width height, 정규화 좌표)으로 저장
+            (save_dir / "labels").mkdir(parents=True, exist_ok=True)
+            h, w = result.shape
+            with open(save_dir / "labels" / f"{file_id}.txt", "w") as f:
+                for (x1, y1, x2, y2), conf, cls in result:
+                    f.write(f"{cls} {(x1 + x2) / 2 / w:g} {(y1 + y2) / 2 / h:g} {(x2 - x1) / w:g} {(y2 - y1) / h:g}\n")
+        if clova_result is not None:
+            (save_dir / "clova_result").mkdir(parents=True, exist_ok=True)
+            with open(save_dir / "clova_result" / f"{file_id}.json", "w", encoding="utf-8") as f:
+                json.dump(clova_result, f, ensure_ascii=False, indent=4)  # JSON으로 변환 후 저장
+        self.logger.info(f"확인용 파일 저장 완료: {save_dir}")
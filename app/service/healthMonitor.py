@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import time
+
+
+class HealthMonitor:
+    # 서버2 상태를 백그라운드에서 주기적으로 확인하고 결과를 캐시하는 모니터
+    # 라우터는 요청마다 헬스 체크를 보내지 않고 캐시된 상태만 읽음
+    #   - 캐시된 결과가 ttl보다 오래되면 상태를 알 수 없는 것으로 보고 요청 경로에서 한 번 직접 확인
+    #   - 연속 failure_threshold번 실패하면 회로 차단기가 열려(open) 요청을 즉시 거절하고,
+    #     recovery_timeout이 지나면 반열림(half-open) 상태에서 한 요청만 직접 확인해 성공하면 닫고(closed)
+    #     실패하면 다시 열어 recovery_timeout 동안 거절 (확인 중에 들어온 다른 요청은 즉시 거절)
+    def __init__(self, probe, interval=5.0, ttl=15.0, failure_threshold=3, recovery_timeout=10.0, name="server2"):
+        self.probe = probe  # async () -> bool
+        self.interval = interval
+        self.ttl = ttl
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.recovery_timeout = recovery_timeout
+        self.name = name
+        self.logger = logging.getLogger(__name__)
+        self.healthy = False
+        self.checked_at = 0.0  # 마지막 확인 시각 (monotonic)
+        self.consecutive_failures = 0
+        self.opened_at = None  # 회로 차단기가 열린 시각
+        self.task = None
+        self.lock = None
+
+    @property
+    def circuit_open(self):
+        return self.opened_at is not None
+
+    async def check(self):
+        # 한 번 확인하고 상태/회로 차단기 갱신
+        try:
+            healthy = bool(await self.probe())
+        except Exception as e:
+            self.logger.error(f"{self.name} 상태 확인 중 에러 발생: {e}")
+            healthy = False
+        if healthy != self.healthy or not self.checked_at:
+            log = self.logger.info if healthy else self.logger.error
+            log(f"{self.name} 상태: {'정상' if healthy else '비정상'}")
+        self.healthy = healthy
+        self.checked_at = time.monotonic()
+        if healthy:
+            if self.circuit_open:
+                self.logger.info(f"{self.name} 회로 차단기 닫힘 - 서버 정상화")
+            self.consecutive_failures = 0
+            self.opened_at = None
+        else:
+            self.consecutive_failures += 1
+            if not self.circuit_open and self.consecutive_failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self.logger.error(f"{self.name} 회로 차단기 열림 - 연속 {self.consecutive_failures}회 실패")
+        return healthy
+
+    async def run(self):
+        # 백그라운드 확인 루프
+        while True:
+            await self.check()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.lock = asyncio.Lock()
+            self.task = asyncio.get_running_loop().create_task(self.run())
+            self.logger.info(f"{self.name} 헬스 모니터 시작 - 주기: {self.interval}초, TTL: {self.ttl}초")
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+            self.logger.info(f"{self.name} 헬스 모니터 종료")
+
+    async def trial(self):
+        # half-open 확인 - 락을 잡은 한 요청만 서버2를 직접 확인하고 결과로 회로 차단기를 닫거나 다시 염
+        if self.lock.locked():
+            return False
+        async with self.lock:
+            if not self.circuit_open:  # 기다리는 사이 백그라운드 확인으로 닫힘
+                return self.healthy
+            if time.monotonic() - self.opened_at < self.recovery_timeout:  # 다른 확인이 방금 실패해 다시 열림
+                return False
+            self.logger.info(f"{self.name} 회로 차단기 반열림 - 확인 요청 전송")
+            if not await self.check():
+                self.opened_at = time.monotonic()
+                self.logger.error(f"{self.name} 회로 차단기 다시 열림 - 반열림 확인 실패")
+            return self.healthy
+
+    async def is_available(self):
+        # 요청 경로에서 호출 - 캐시된 상태를 바로 반환
+        now = time.monotonic()
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+        if self.circuit_open:
+            # 복구 대기 시간이 지나기 전까지는 확인 없이 즉시 실패, 지나면 한 요청만 통과시켜 확인
+            if now - self.opened_at < self.recovery_timeout:
+                return False
+            return await self.trial()
+        if now - self.checked_at <= self.ttl:
+            return self.healthy
+        # 캐시가 만료됨 (모니터 미실행/지연) - 동시에 여러 요청이 확인하지 않도록 한 번만 확인
+        async with self.lock:
+            if time.monotonic() - self.checked_at > self.ttl:
+                await self.check()
+        return self.healthy
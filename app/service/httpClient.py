@@ -0,0 +1,42 @@
+import importlib.util
+import logging
+
+import httpx
+
+
+class HttpClientManager:
+    # 애플리케이션 전역에서 공유하는 httpx.AsyncClient 관리자
+    # FastAPI 시작 시 생성하고 종료 시 닫아서, OCR 서버/클로바/헬스 체크 요청이 keep-alive 커넥션(과 TLS 세션)을 재사용하게 함
+    def __init__(self, max_connections=100, max_keepalive_connections=20, keepalive_expiry=30.0,
+                 connect_timeout=5.0, read_timeout=45.0, write_timeout=45.0, pool_timeout=10.0, http2=False):
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive_connections,
+                                   keepalive_expiry=keepalive_expiry)
+        self.timeout = httpx.Timeout(connect=connect_timeout, read=read_timeout, write=write_timeout, pool=pool_timeout)
+        self.http2 = http2
+        self.logger = logging.getLogger(__name__)
+        self._client = None
+
+    async def startup(self):
+        # 공유 클라이언트 생성 (이미 있으면 무시)
+        if self._client is not None and not self._client.is_closed:
+            return
+        http2 = self.http2
+        if http2 and importlib.util.find_spec("h2") is None:  # HTTP/2는 h2 패키지가 필요 (pip install httpx[http2])
+            self.logger.warning("h2 패키지가 없어 HTTP/1.1로 연결합니다")
+            http2 = False
+        self._client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout, http2=http2)
+        self.logger.info(f"공유 HTTP 클라이언트 생성 - 최대 커넥션: {self.limits.max_connections}, "
+                         f"keep-alive: {self.limits.max_keepalive_connections}, HTTP/2: {http2}")
+
+    async def shutdown(self):
+        # 공유 클라이언트 종료 (커넥션 풀 정리)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self.logger.info("공유 HTTP 클라이언트 종료")
+
+    async def get_client(self) -> httpx.AsyncClient:
+        # 공유 클라이언트 반환 - startup 이전에 호출되면(스크립트/테스트 등) 여기서 생성
+        if self._client is None or self._client.is_closed:
+            await self.startup()
+        return self._client
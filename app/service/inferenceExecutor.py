@@ -0,0 +1,129 @@
+import asyncio
+import contextlib
+import functools
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import torch
+
+
+class InferenceQueueFull(Exception):
+    # 처리/대기 중인 요청 수가 max_queue_depth에 도달해 새 요청을 받을 수 없음
+    pass
+
+
+def worker_threads(max_workers, threads_per_worker=0):
+    # 프로세스 모드의 워커당 intra-op 스레드 수 (0: 코어 수 / 워커 수)
+    return int(threads_per_worker) or max(1, (os.cpu_count() or 1) // max(1, int(max_workers)))
+
+
+def init_worker(num_threads, load_model=None):
+    # 추론 워커 프로세스 초기화 - 워커당 intra-op 스레드 수를 고정해 워커 수 × 스레드 수가 코어 수를 넘지 않게 함
+    torch.set_num_threads(num_threads)
+    with contextlib.suppress(RuntimeError):  # 이미 병렬 작업이 시작된 경우 변경 불가
+        torch.set_num_interop_threads(1)
+    if load_model is not None:
+        from yolov5 import detection
+
+        # fork된 워커는 부모의 공유 메모리 모델을 그대로 사용하고, spawn된 워커(Windows)는 여기서 직접 로드
+        load_model(warmup=False)
+        # 부모는 추론하지 않으므로 워밍업(첫 forward)은 워커마다 자기 스레드 수로 수행
+        detection.model_registry.warmup()
+    logging.getLogger(__name__).info(f"추론 워커 프로세스 시작 - pid: {os.getpid()}, 스레드: {num_threads}")
+
+
+class InferenceExecutor:
+    # 블로킹 작업(디코딩, 모델 추론, 크롭 인코딩)을 이벤트 루프 밖의 제한된 풀에서 실행하고,
+    # 동시에 받을 수 있는 요청 수를 제한해 과부하 시 큐에 쌓지 않고 바로 거절(backpressure)
+    #   mode="thread":  한 프로세스 안의 스레드 풀 (torch가 모든 코어를 사용)
+    #   mode="process": 워커 프로세스 풀 - 가중치는 부모에서 한 번 로드해 공유 메모리로 공유하고
+    #                   워커마다 threads_per_worker개의 intra-op 스레드만 사용
+    #                   디코딩/크롭은 부모의 스레드 풀(run_local)에서 실행하고 워커에는 축소 이미지만 보냄
+    def __init__(self, max_workers=4, max_queue_depth=64, mode="thread", threads_per_worker=0, load_model=None):
+        self.mode = mode
+        self.max_workers = max(1, int(max_workers))
+        self.max_queue_depth = max(1, int(max_queue_depth))
+        self.threads_per_worker = worker_threads(self.max_workers, threads_per_worker)
+        self.load_model = load_model  # 워커에서 호출할 picklable한 모델 로드 함수
+        self.depth = 0  # 현재 처리/대기 중인 요청 수
+        self.executor = None
+        self.logger = logging.getLogger(__name__)
+        if mode not in ("thread", "process"):
+            raise ValueError(f"지원하지 않는 추론 실행 모드: {mode}")
+        if mode == "thread":
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+            self.local_executor = self.executor
+        else:
+            self.local_executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ingest")
+        self.logger.info(f"추론 실행기 생성 - 모드: {mode}, 워커: {self.max_workers}, 최대 대기 요청: {self.max_queue_depth}")
+
+    @property
+    def concurrency(self):
+        # 동시에 실행할 수 있는 배치 추론 수 - 스레드 모드는 torch가 코어를 모두 쓰므로 1, 프로세스 모드는 워커 수
+        return self.max_workers if self.mode == "process" else 1
+
+    def start(self):
+        # 프로세스 모드: 모델을 로드해 공유 메모리로 옮긴 뒤 워커를 fork (fork가 없는 OS는 spawn 후 워커별 로드)
+        # GNU OpenMP(libgomp)는 부모가 스레드 풀을 쓴 뒤 fork하면 자식에서 멈출 수 있으므로, fork 전까지 부모는
+        # 단일 스레드로 가중치 로드/퓨즈만 하고 추론(워밍업)은 하지 않음
+        if self.mode != "process" or self.executor is not None:
+            return
+        from yolov5 import detection
+
+        num_threads = torch.get_num_threads()
+        torch.set_num_threads(1)
+        try:
+            if self.load_model is not None:
+                model, _ = self.load_model(warmup=False)
+                if not model.pt:
+                    # ONNX Runtime/OpenVINO 세션은 내부 스레드 풀 때문에 fork 후 재사용할 수 없으므로 워커마다 새로 로드
+                    detection.model_registry.clear()
+            detection.model_registry.share_memory()
+            method = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context(method),
+                initializer=init_worker,
+                initargs=(self.threads_per_worker, self.load_model),
+            )
+            for future in [self.executor.submit(os.getpid) for _ in range(self.max_workers)]:  # 워커를 미리 띄움
+                future.result()
+        finally:
+            torch.set_num_threads(num_threads)
+        self.logger.info(f"추론 워커 프로세스 {self.max_workers}개 시작 ({method}) - 워커당 스레드: {self.threads_per_worker}")
+
+    @contextlib.asynccontextmanager
+    async def reserve(self):
+        # 요청 단위 입장 제어 - 한도를 넘으면 InferenceQueueFull 발생
+        if self.depth >= self.max_queue_depth:
+            self.logger.warning(f"추론 대기열이 가득 참 - 현재 {self.depth}/{self.max_queue_depth}")
+            raise InferenceQueueFull(f"inference queue is full ({self.depth}/{self.max_queue_depth})")
+        self.depth += 1
+        try:
+            yield
+        finally:
+            self.depth -= 1
+
+    async def run(self, fn, *args, **kwargs):
+        # fn(*args, **kwargs)를 풀에서 실행하고 결과를 기다림 (이벤트 루프는 다른 요청을 계속 처리)
+        # 프로세스 모드에서는 fn과 인자가 picklable해야 함 (모듈 수준 함수 / functools.partial)
+        self.start()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+
+    async def run_local(self, fn, *args, **kwargs):
+        # fn을 이 프로세스의 스레드 풀에서 실행 (디코딩/크롭처럼 업로드 바이트나 원본 이미지가 필요한 작업)
+        # 프로세스 모드에서도 인자를 pickle해 워커로 보내지 않음
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.local_executor, functools.partial(fn, *args, **kwargs))
+
+    def shutdown(self, wait=True):
+        if self.executor is not None:
+            self.executor.shutdown(wait=wait)
+            self.executor = None
+        if self.local_executor is not None:
+            self.local_executor.shutdown(wait=wait)
+            self.local_executor = None
+        self.logger.info("추론 실행기 종료")
@@ -0,0 +1,220 @@
+import abc
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Prometheus 텍스트 노출 형식(0.0.4)을 직접 만드는 최소 구현 - prometheus_client 의존성 없이 /metrics 제공
+#   Counter: 누적 값, Gauge: 현재 값 (set_function으로 수집 시점에 계산 가능), Histogram: 누적 버킷 + 합 + 개수
+#   라벨은 생성 시 이름 목록을 정하고 labels(값...)으로 자식 시계열을 얻음
+# prometheus_client를 쓰지 않는 이유
+#   - 필요한 것은 위 세 종류와 텍스트 형식뿐이고, 메서드 이름(labels/inc/set/set_function/observe/time)을 같게 맞춰
+#     나중에 prometheus_client로 바꿔도 호출하는 쪽은 고치지 않아도 됨
+#   - 수집은 API 프로세스 한 곳에서만 함 (프로세스 모드의 추론 워커는 단계별 시간을 결과와 함께 돌려주고
+#     배치 스케줄러가 기록) - prometheus_client의 멀티프로세스 모드(PROMETHEUS_MULTIPROC_DIR)가 필요 없음
+#   - 고정 버전 목록(requirements.txt)과 도커 이미지에 의존성을 늘리지 않음
+#   출력 형식은 app/test/service/test_metrics.py에서 확인
+
+def format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric(abc.ABC):
+    # 메트릭 공통 부분 - 종류별 자식 시계열(new_child)과 노출할 샘플(samples)은 하위 클래스가 구현
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.children = {}
+        self.lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def labels(self, *values):
+        values = tuple(str(value) for value in values)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+        with self.lock:
+            child = self.children.get(values)
+            if child is None:
+                child = self.children[values] = self.new_child()
+        return child
+
+    @abc.abstractmethod
+    def new_child(self):
+        # labels(...)마다 만드는 자식 시계열
+        ...
+
+    @abc.abstractmethod
+    def samples(self):
+        # (접미사, 라벨 값, 추가 라벨, 값) 목록
+        ...
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, values, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{format_labels(self.labelnames, values, extra)} {format_value(value)}")
+        return "\n".join(lines)
+
+
+class CounterChild:
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def new_child(self):
+        return CounterChild()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def samples(self):
+        return [("_total", values, (), child.value) for values, child in sorted(self.children.items())]
+
+
+class GaugeChild:
+    def __init__(self):
+        self.value = 0.0
+        self.function = None
+        self.lock = threading.Lock()
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set_function(self, function):
+        # 수집 시점에 function()의 값을 사용 (대기열 길이처럼 다른 객체가 가진 값)
+        self.function = function
+
+    def get(self):
+        return self.function() if self.function is not None else self.value
+
+    @contextmanager
+    def track_inprogress(self):
+        self.inc()
+        try:
+            yield
+        finally:
+            self.dec()
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def new_child(self):
+        return GaugeChild()
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def set_function(self, function):
+        self.labels().set_function(function)
+
+    def samples(self):
+        return [("", values, (), child.get()) for values, child in sorted(self.children.items())]
+
+
+class HistogramChild:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(float(b) for b in buckets if b != float("inf"))) + (float("inf"),)
+        super().__init__(name, documentation, labelnames, registry)
+
+    def new_child(self):
+        return HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def samples(self):
+        samples = []
+        for values, child in sorted(self.children.items()):
+            with child.lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                samples.append(("_bucket", values, (("le", format_value(bound)),), cumulative))
+            samples.append(("_sum", values, (), total))
+            samples.append(("_count", values, (), cumulative))
+        return samples
+
+
+class Registry:
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+
+    def render(self):
+        return "\n".join(metric.render() for metric in self.metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+# 파이프라인 단계별 소요 시간
+#   ingest: 업로드 디코딩, preprocess/inference/nms: 배치 추론 내부 (배치 단위),
+#   detect: 배치 대기 + 배치 추론, crop: 크롭 JPEG 생성, ocr: OCR 요청 1건 왕복, fetch: URL 이미지 다운로드
+STAGE_SECONDS = Histogram("yolo_stage_duration_seconds", "Duration of each pipeline stage.", ["stage"])
+REQUEST_SECONDS = Histogram("yolo_http_request_duration_seconds", "HTTP request latency by route and status code.", ["route", "status"])
+INFLIGHT_REQUESTS = Gauge("yolo_http_requests_in_flight", "HTTP requests currently being processed.", ["route"])
+QUEUE_DEPTH = Gauge("yolo_queue_depth", "Current depth of the internal queues.", ["queue"])
+BATCH_SIZE = Histogram("yolo_batch_size", "Number of images per batched forward pass.", buckets=(1, 2, 4, 8, 16, 32, 64))
+OCR_REQUESTS = Counter("yolo_ocr_requests", "OCR calls by backend and outcome (success, error, cache_hit).", ["backend", "outcome"])
+MODEL_LOAD_SECONDS = Gauge("yolo_model_load_seconds", "Time spent loading, fusing and warming up the model at startup.")
@@ -0,0 +1,139 @@
+import copy
+import itertools
+import logging
+import time
+from collections import OrderedDict, namedtuple
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+# 크롭 한 장의 캐시 키 - bits: 128비트 차이 해시(int), profile: 정규화한 열 방향 밝기 프로파일, aspect: 가로/세로 비율
+CropSignature = namedtuple("CropSignature", ["bits", "profile", "aspect"])
+
+
+def popcount(x: int) -> int:
+    return bin(x).count("1")
+
+
+class OcrCache:
+    # 거의 같은 크롭 이미지의 OCR 결과를 재사용하는 캐시
+    #   - 같은 교재 문장을 여러 사용자가 각자 찍어 올린 경우처럼 재인코딩/박스 위치/밝기가 조금씩 다른 크롭도 적중
+    #   - 해시: 흑백 변환 -> (hash_width + 1) x hash_height 로 축소 -> 가로로 이웃한 칸의 밝기 비교 비트열 (64 x 2 = 128비트)
+    #     문장 크롭은 가로로 길어서 세로는 2칸만 사용 - 몇 픽셀의 세로 이동에도 비트가 크게 바뀌지 않음
+    #   - 검색: 해밍 거리 max_distance 이내의 항목을 다중 인덱스 해싱으로 찾음
+    #     해시를 16비트 블록 8개로 나눠 블록별로 색인하고, 전체 거리가 max_distance 이하이면 어느 한 블록은
+    #     block_radius 비트 이하로 다르므로(비둘기집 원리) 블록마다 그 범위의 값만 조회
+    #   - 확인: 해시가 가까운 후보도 가로세로 비율과 열 방향 밝기 프로파일(profile_width칸) MSE가 기준 이내일 때만 적중
+    #     (해시만으로는 배치가 비슷한 다른 문장을 구분하지 못하는 경우를 걸러냄)
+    #   - 기본 기준값은 테스트 노트 이미지(app/test/notes)의 문장 크롭에 재인코딩(q70~95), 박스 ±4px, 밝기/대비 ±10~15%,
+    #     0.8~1.2배 축소/확대, ±0.6도 회전을 준 변형으로 맞춤: 같은 문장 적중률 약 86%, 다른 문장/문장 일부 오적중 0건
+    #   - 크기 제한(max_entries) LRU + TTL 만료
+    blocks = 8
+    block_bits = 16
+
+    def __init__(self, max_entries=10000, ttl=24 * 60 * 60, max_distance=23, max_profile_mse=0.25, max_aspect_diff=0.3,
+                 hash_width=64, hash_height=2, profile_width=64):
+        if hash_width * hash_height != self.blocks * self.block_bits:
+            raise ValueError(f"해시 크기는 {self.blocks * self.block_bits}비트여야 함: {hash_width} x {hash_height}")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self.max_profile_mse = max_profile_mse
+        self.max_aspect_diff = max_aspect_diff  # |log(비율1 / 비율2)| 허용값
+        self.hash_width = hash_width
+        self.hash_height = hash_height
+        self.profile_width = profile_width
+        # 블록마다 조회할 XOR 마스크 - 전체 거리 d 이하이면 어느 블록은 d // blocks 비트 이하로 다름
+        self.block_radius = max_distance // self.blocks
+        self.block_masks = [sum(1 << i for i in bits) for k in range(self.block_radius + 1)
+                            for bits in itertools.combinations(range(self.block_bits), k)]
+        self.entries = OrderedDict()  # entry_id -> (namespace, signature, value, expires_at)
+        self.index = {}  # namespace -> 블록별 {블록 값: {entry_id}}
+        self.next_id = 0
+        self.hits = 0
+        self.misses = 0
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def crop_hash(self, data: bytes):
+        # 크롭 JPEG 바이트의 CropSignature, 디코딩할 수 없으면 None (캐시하지 않고 그대로 전송)
+        try:
+            with Image.open(BytesIO(data)) as img:
+                width, height = img.size
+                img.draft("L", (self.hash_width * 2, self.hash_height * 8))  # JPEG은 축소 디코딩
+                gray = img.convert("L")
+                small = np.asarray(gray.resize((self.hash_width + 1, self.hash_height), Image.BOX), dtype=np.float32)
+                profile = np.asarray(gray.resize((self.profile_width, 1), Image.BOX), dtype=np.float32).ravel()
+        except Exception as exc:
+            self.logger.warning(f"크롭 해시 계산 실패: {exc}")
+            return None
+        bits = int.from_bytes(np.packbits(small[:, 1:] > small[:, :-1]).tobytes(), "big")
+        profile = (profile - profile.mean()) / (profile.std() + 1e-6)
+        return CropSignature(bits, profile, width / max(height, 1))
+
+    def crop_hashes(self, images: list) -> list:
+        # [(파일명, 바이트)] 목록의 해시 목록
+        return [self.crop_hash(data) for _, data in images]
+
+    def split(self, bits: int) -> list:
+        # 128비트 해시를 블록 값 목록으로 나눔
+        mask = (1 << self.block_bits) - 1
+        return [(bits >> (j * self.block_bits)) & mask for j in range(self.blocks)]
+
+    def candidates(self, namespace: str, bits: int) -> set:
+        # 해밍 거리 max_distance 이내일 수 있는 항목 id (블록별 block_radius 이내 값의 색인 조회)
+        found = set()
+        for index, block in zip(self.index.get(namespace, ()), self.split(bits)):
+            for mask in self.block_masks:
+                ids = index.get(block ^ mask)
+                if ids:
+                    found |= ids
+        return found
+
+    def matches(self, a: CropSignature, b: CropSignature) -> bool:
+        # 해시가 가까운 후보를 비율과 밝기 프로파일로 한 번 더 확인
+        if abs(np.log(a.aspect / b.aspect)) > self.max_aspect_diff:
+            return False
+        return float(np.mean((a.profile - b.profile) ** 2)) <= self.max_profile_mse
+
+    def remove(self, entry_id):
+        namespace, signature, _, _ = self.entries.pop(entry_id)
+        for index, block in zip(self.index[namespace], self.split(signature.bits)):
+            index[block].discard(entry_id)
+            if not index[block]:
+                del index[block]
+
+    def get(self, namespace: str, signature):
+        if not self.enabled or signature is None:
+            return None
+        now = time.monotonic()
+        best_id, best_distance = None, None
+        for entry_id in self.candidates(namespace, signature.bits):
+            _, cached, _, expires_at = self.entries[entry_id]
+            if expires_at < now:
+                self.remove(entry_id)
+                continue
+            distance = popcount(cached.bits ^ signature.bits)
+            if distance <= self.max_distance and (best_distance is None or distance < best_distance) and self.matches(cached, signature):
+                best_id, best_distance = entry_id, distance
+        if best_id is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(best_id)
+        self.hits += 1
+        return copy.deepcopy(self.entries[best_id][2])
+
+    def put(self, namespace: str, signature, value):
+        if not self.enabled or signature is None:
+            return
+        entry_id, self.next_id = self.next_id, self.next_id + 1
+        self.entries[entry_id] = (namespace, signature, copy.deepcopy(value), time.monotonic() + self.ttl)
+        indexes = self.index.setdefault(namespace, [{} for _ in range(self.blocks)])
+        for index, block in zip(indexes, self.split(signature.bits)):
+            index.setdefault(block, set()).add(entry_id)
+        while len(self.entries) > self.max_entries:
+            self.remove(next(iter(self.entries)))
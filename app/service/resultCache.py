@@ -0,0 +1,176 @@
+import asyncio
+import copy
+import functools
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+
+class ResultCache:
+    # 업로드 내용 해시 + 모델/임계값 설정을 키로 하는 응답 캐시
+    #   - 메모리 LRU: JSON 직렬화 크기 합이 max_bytes를 넘으면 오래된 항목부터 제거
+    #   - 디스크(선택): disk_dir이 있으면 메모리에서 빠진 결과도 JSON 파일로 재사용
+    #     파일 크기 합이 disk_max_bytes를 넘으면 마지막 사용 시각(mtime, 적중 시 갱신)이 오래된 파일부터 삭제
+    #     여러 프로세스가 같은 디렉터리를 쓰므로 크기 합은 저장할 때마다 추정하고, 한도를 넘으면 다시 스캔해서 정리
+    #   - single-flight: 같은 키의 요청이 동시에 들어오면 한 번만 계산하고 결과를 함께 받음
+    #   - 저장된 객체는 공유하지 않고 요청마다 복사본을 반환 (한 요청이 응답을 고쳐도 캐시/다른 요청에 영향 없음)
+    #   - 적중한 응답은 처음 계산한 요청의 것이므로 요청마다 달라지는 값(file_id로 만든 크롭 파일명,
+    #     클로바 requestId 등)도 처음 요청의 값 그대로임 - 키에 포함되지 않은 요청별 값에 의존하는 응답은 캐시하지 않아야 함
+    def __init__(self, max_bytes=64 * 1024 * 1024, disk_dir=None, disk_max_bytes=1024 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.disk_max_bytes = disk_max_bytes
+        self.disk_bytes = None  # 디스크 캐시 크기 합 추정값 (None: 아직 스캔하지 않음)
+        self.disk_lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> (value, size)
+        self.total_bytes = 0
+        self.inflight = {}  # key -> asyncio.Task
+        self.hits = 0
+        self.misses = 0
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0 or self.disk_dir is not None
+
+    @staticmethod
+    def make_key(data: bytes, **config) -> str:
+        # 업로드 바이트와 결과에 영향을 주는 설정(라우트, 가중치, 임계값 등)으로 키 생성
+        h = hashlib.sha256(data)
+        h.update(json.dumps(config, sort_keys=True, default=str).encode())
+        return h.hexdigest()
+
+    def get(self, key):
+        # 저장된 결과의 복사본 (없으면 None)
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        self.entries.move_to_end(key)
+        return copy.deepcopy(entry[0])
+
+    def put(self, key, value):
+        size = len(json.dumps(value, ensure_ascii=False, default=str).encode())
+        if size > self.max_bytes:
+            return
+        if key in self.entries:
+            self.total_bytes -= self.entries.pop(key)[1]
+        self.entries[key] = (value, size)
+        self.total_bytes += size
+        while self.total_bytes > self.max_bytes:
+            _, (_, evicted_size) = self.entries.popitem(last=False)
+            self.total_bytes -= evicted_size
+
+    def disk_path(self, key) -> Path:
+        return self.disk_dir / key[:2] / f"{key}.json"
+
+    def load_disk(self, key):
+        if self.disk_dir is None:
+            return None
+        path = self.disk_path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path)  # LRU 정리 기준인 마지막 사용 시각 갱신
+            return value
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"디스크 캐시 읽기 실패 - {path}: {e}")
+            return None
+
+    def store_disk(self, key, value):
+        if self.disk_dir is None:
+            return
+        path = self.disk_path(key)
+        tmp_path = None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # 임시 파일 이름은 쓰는 쪽마다 달라야 같은 키를 동시에 저장하는 다른 프로세스와 겹치지 않음
+            with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=path.parent, suffix=".tmp", delete=False) as f:
+                tmp_path = Path(f.name)
+                json.dump(value, f, ensure_ascii=False)
+            size = tmp_path.stat().st_size
+            tmp_path.replace(path)  # 원자적 교체 - 다른 프로세스가 쓰다 만 파일을 읽지 않음
+        except OSError as e:
+            self.logger.warning(f"디스크 캐시 저장 실패 - {path}: {e}")
+            if tmp_path is not None:
+                tmp_path.unlink(missing_ok=True)
+            return
+        with self.disk_lock:
+            if self.disk_bytes is not None:
+                self.disk_bytes += size
+            if self.disk_bytes is None or self.disk_bytes > self.disk_max_bytes:
+                self.sweep_disk()
+
+    def sweep_disk(self, stale_tmp_seconds=60 * 60):
+        # 디스크 캐시를 스캔해 크기 합을 다시 구하고, 한도를 넘으면 오래 사용하지 않은 파일부터 90%까지 삭제
+        # 중단된 저장이 남긴 오래된 임시 파일도 함께 삭제 (disk_lock 안에서 호출)
+        files, now = [], time.time()
+        for file in self.disk_dir.glob("*/*"):
+            try:
+                stat = file.stat()
+            except FileNotFoundError:  # 다른 프로세스가 방금 삭제/교체함
+                continue
+            if file.suffix == ".tmp":
+                if now - stat.st_mtime > stale_tmp_seconds:
+                    file.unlink(missing_ok=True)
+            elif file.suffix == ".json":
+                files.append((stat.st_mtime, stat.st_size, file))
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        if total > self.disk_max_bytes:
+            for _, size, file in sorted(files, key=lambda x: x[0]):
+                if total <= self.disk_max_bytes * 0.9:
+                    break
+                try:
+                    file.unlink()
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    self.logger.warning(f"디스크 캐시 삭제 실패 - {file}: {e}")
+                    continue
+                total -= size
+                removed += 1
+            self.logger.info(f"디스크 캐시 정리 - {removed}개 삭제, 남은 크기: {total} bytes")
+        self.disk_bytes = total
+
+    async def get_or_compute(self, key, compute):
+        # 캐시된 결과를 반환하거나, compute()를 한 번만 실행해 결과를 저장하고 반환
+        # compute는 별도 태스크로 실행되어 처음 요청한 클라이언트가 끊겨도 기다리는 다른 요청은 결과를 받음
+        if not self.enabled:
+            return await compute()
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            self.logger.info(f"결과 캐시 적중 - 키: {key[:12]}")
+            return value
+        task = self.inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(self.compute(key, compute))
+            self.inflight[key] = task
+            task.add_done_callback(functools.partial(self.finish, key))
+        else:
+            self.logger.info(f"진행 중인 동일 요청에 합류 - 키: {key[:12]}")
+        return copy.deepcopy(await asyncio.shield(task))  # 함께 기다린 요청들과 메모리 캐시가 같은 객체를 공유하지 않도록 복사
+
+    def finish(self, key, task):
+        if self.inflight.get(key) is task:
+            del self.inflight[key]
+        if not task.cancelled():
+            task.exception()  # 기다리던 요청이 모두 취소된 경우에도 예외를 확인 처리
+
+    async def compute(self, key, compute):
+        value = await asyncio.to_thread(self.load_disk, key)
+        if value is None:
+            value = await compute()
+            await asyncio.to_thread(self.store_disk, key, value)
+        if self.max_bytes > 0:
+            self.put(key, value)
+        return value
@@ -1,12 +1,16 @@
+import asyncio
+import functools
 import logging
-import os, sys
-import shutil
-from pathlib import Path
 import httpx
 from fastapi import HTTPException
 from yolov5 import detection
+from app.config import serviceConfig
+from app.service.batchScheduler import BatchScheduler
+from app.service.httpClient import HttpClientManager
+from app.service.inferenceExecutor import InferenceExecutor, InferenceQueueFull, worker_threads
+from app.service.ocrCache import OcrCache
+from app.service import metrics
 
-import requests
 import uuid
 import time
 import json
@@ -16,230 +20,354 @@ import json
 logging.config.fileConfig('app/config/logging_config.ini')
 
 class YOLOv5Service:
-    def __init__(self):
-        self.detection = detection.run
+    def __init__(self, weights=None, device="", half=False, imgsz=(640, 640)):
+        self.model_registry = detection.model_registry  # 모든 서비스 인스턴스가 공유하는 상주 모델 저장소
+        self.weights = weights or serviceConfig.MODEL_WEIGHTS or detection.DEFAULT_WEIGHTS
+        self.device = device
+        self.half = half
+        self.imgsz = imgsz
+        self.backend_options = self.make_backend_options(self.weights, mode=serviceConfig.INFERENCE_MODE,
+                                                         threads_per_worker=worker_threads(serviceConfig.INFERENCE_WORKERS, serviceConfig.INFERENCE_THREADS_PER_WORKER))
         self.logger = logging.getLogger(__name__)
+        # 모델 설정을 묶은 picklable 함수들 - 프로세스 모드의 워커에서도 그대로 호출 가능
+        model_kwargs = dict(weights=self.weights, device=device, half=half, imgsz=imgsz, backend_options=self.backend_options)
+        self.detect_batch = functools.partial(detection.detect_batch, **model_kwargs)
+        self.inference_executor = InferenceExecutor(max_workers=serviceConfig.INFERENCE_WORKERS, max_queue_depth=serviceConfig.INFERENCE_MAX_QUEUE_DEPTH,
+                                                    mode=serviceConfig.INFERENCE_MODE, threads_per_worker=serviceConfig.INFERENCE_THREADS_PER_WORKER,
+                                                    load_model=functools.partial(detection.load_model, **model_kwargs))
+        self.batch_scheduler = BatchScheduler(self.detect_batch, max_batch_size=serviceConfig.BATCH_MAX_SIZE, max_wait_ms=serviceConfig.BATCH_MAX_WAIT_MS,
+                                              executor=self.inference_executor)
+        # 애플리케이션 수명 동안 공유하는 HTTP 커넥션 풀 (main.py의 startup/shutdown에서 열고 닫음)
+        self.http_client = HttpClientManager(max_connections=serviceConfig.HTTP_MAX_CONNECTIONS, max_keepalive_connections=serviceConfig.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                                             keepalive_expiry=serviceConfig.HTTP_KEEPALIVE_EXPIRY, connect_timeout=serviceConfig.HTTP_CONNECT_TIMEOUT,
+                                             read_timeout=serviceConfig.HTTP_READ_TIMEOUT, write_timeout=serviceConfig.HTTP_READ_TIMEOUT,
+                                             pool_timeout=serviceConfig.HTTP_POOL_TIMEOUT, http2=serviceConfig.HTTP2_ENABLED)
+        self.ocr_semaphore = asyncio.Semaphore(serviceConfig.OCR_MAX_CONCURRENCY)  # OCR 서버 동시 요청 수 제한
+        self.ocr_cache = OcrCache(max_entries=serviceConfig.OCR_CACHE_MAX_ENTRIES, ttl=serviceConfig.OCR_CACHE_TTL, max_distance=serviceConfig.OCR_CACHE_MAX_DISTANCE,
+                                  max_profile_mse=serviceConfig.OCR_CACHE_MAX_PROFILE_MSE)  # 거의 같은 크롭 단위 OCR 결과 캐시
+        # /metrics 수집 시점의 대기열 길이
+        metrics.QUEUE_DEPTH.labels("inference").set_function(lambda: self.inference_executor.depth)
+        metrics.QUEUE_DEPTH.labels("batch").set_function(lambda: self.batch_scheduler.queue.qsize() if self.batch_scheduler.queue is not None else 0)
         self.logger.info("YOLOv5Service 인스턴스 생성됨")
         self.class_names = {0: "circled_text", 1: "underlined_text", }
 
-    def textDetection(self, image_path, file_id, save_csv=False, save_txt=False, save_crop=True, conf_thres=0.6):
-        self.logger.info(f"textDetection 함수 실행 - 이미지 경로: {image_path}, 파일 아이디: {file_id}")
-        # 크롭된 이미지들이 경로에 저장됨
+    @staticmethod
+    def make_backend_options(weights, mode="thread", threads_per_worker=0):
+        # 내보낸 가중치 형식별 런타임 설정 - .onnx는 ONNX Runtime 세션, OpenVINO는 비동기 추론 큐 (.pt 등은 None)
+        # 프로세스 모드에서는 워커마다 세션을 만들므로 스레드 수를 정하지 않으면 워커 수 × 코어 수로 과다 구독됨
+        weights = str(weights).rstrip("/\\")
+        if weights.endswith(".onnx"):
+            intra_op_threads, inter_op_threads = serviceConfig.ORT_INTRA_OP_THREADS, serviceConfig.ORT_INTER_OP_THREADS
+            if mode == "process" and not intra_op_threads:  # 기본값(물리 코어 전체) 대신 워커당 스레드 수로 고정
+                intra_op_threads, inter_op_threads = threads_per_worker, 1
+            return dict(intra_op_threads=intra_op_threads, inter_op_threads=inter_op_threads,
+                        execution_mode=serviceConfig.ORT_EXECUTION_MODE, graph_optimization=serviceConfig.ORT_GRAPH_OPTIMIZATION,
+                        enable_mem_pattern=serviceConfig.ORT_MEM_PATTERN, enable_cpu_mem_arena=serviceConfig.ORT_CPU_MEM_ARENA,
+                        io_binding=serviceConfig.ORT_IO_BINDING)
+        if weights.endswith((".xml", "_openvino_model")):
+            num_streams, num_threads = serviceConfig.OV_NUM_STREAMS, serviceConfig.OV_NUM_THREADS
+            if mode == "process":
+                # THROUGHPUT 힌트는 소켓 전체 코어에 맞춰 스트림을 만듦 - 워커 풀이 이미 워커 수만큼 병렬로 실행하므로
+                # 워커마다 워커당 스레드 수 안에서 스트림 하나만 사용 (환경 변수로 지정한 값은 그대로 사용)
+                num_streams, num_threads = num_streams or 1, num_threads or threads_per_worker
+            return dict(device=serviceConfig.OV_DEVICE, performance_hint=serviceConfig.OV_PERFORMANCE_HINT, num_requests=serviceConfig.OV_NUM_REQUESTS,
+                        num_streams=num_streams, num_threads=num_threads, dynamic_batch=serviceConfig.OV_DYNAMIC_BATCH)
+        return None
+
+    def load_model(self):
+        # 스레드 모드: 모델을 로드/퓨즈/워밍업하여 레지스트리에 상주시킴 (이미 로드된 경우 그대로 사용)
+        # 프로세스 모드: 부모는 추론하지 않고 워커 풀을 시작 (가중치 로드/공유 후 fork, 워밍업은 워커에서)
+        start_time = time.time()
+        if self.inference_executor.mode == "process":
+            self.inference_executor.start()
+        else:
+            self.model_registry.get(self.weights, device=self.device, half=self.half, imgsz=self.imgsz, backend_options=self.backend_options)
+        metrics.MODEL_LOAD_SECONDS.set(time.time() - start_time)
+        self.logger.info(f"모델 로드 완료 - 가중치: {self.weights} (소요시간: {time.time() - start_time:.2f}초)")
+
+    def cache_config(self) -> dict:
+        # 결과 캐시 키에 포함할 모델/전처리 설정 - 값이 바뀌면 이전 결과를 재사용하지 않음
+        return dict(weights=str(self.weights), device=self.device, half=self.half, imgsz=self.imgsz, ingest_max_side=serviceConfig.INGEST_MAX_SIDE)
+
+    async def textDetectionBatched(self, image, file_id, conf_thres=0.6, save_crop=True):
+        # 업로드 바이트(또는 디코딩된 ndarray) 한 장의 탐지 결과와 크롭 이미지(메모리 버퍼)를 반환 - 동시 요청들과 묶어서 배치 추론 수행
+        # save_crop=False이면 크롭 없이 탐지 결과만 반환 (crops는 빈 dict)
+        # 디코딩/크롭은 실행기의 스레드 풀, 추론은 실행기(스레드/프로세스)에서 실행되어 이벤트 루프를 막지 않음
+        self.logger.info(f"textDetectionBatched 함수 실행 - 파일 아이디: {file_id}")
+        (result, crops), = await self.textDetectionPages([image], [file_id], conf_thres=conf_thres, save_crop=save_crop)
+        return result, crops
+
+    async def textDetectionPages(self, images: list, file_ids: list, conf_thres=0.6, save_crop=True) -> list:
+        # 여러 페이지를 한 요청으로 처리 - 페이지별 (탐지 결과, 크롭) 리스트를 입력 순서대로 반환
+        # 모든 페이지를 동시에 배치 스케줄러에 넣으므로 BATCH_MAX_SIZE 단위로 묶여 한 번의 forward/NMS로 처리됨
+        # 입장 제어(reserve)는 요청 단위로 한 번만 수행
+        async def ingest(index, image):
+            try:
+                with metrics.STAGE_SECONDS.labels("ingest").time():
+                    return await self.inference_executor.run_local(detection.ingest_image, image, max_side=serviceConfig.INGEST_MAX_SIDE)
+            except ValueError as e:
+                if len(images) == 1:
+                    raise
+                raise ValueError(f"page {index}: {e}") from e
+
+        async def detect(image, file_id):
+            with metrics.STAGE_SECONDS.labels("detect").time():  # 배치 대기 + 배치 추론
+                result = await self.batch_scheduler.submit(image, conf_thres)
+            if not save_crop:
+                return result, {}
+            with metrics.STAGE_SECONDS.labels("crop").time():
+                crops = await self.inference_executor.run_local(detection.crop_detections, image, result, file_id)
+            return result, crops
+
         try:
-            start_time = time.time()
-            self.detection(source=image_path, file_id=file_id, save_csv=save_csv, save_txt=save_txt, save_crop=save_crop, conf_thres=conf_thres)
-            end_time = time.time()
-            self.logger.info("textDetection 함수 실행 성공 - 소요시간: {:.2f}초".format(end_time - start_time))
+            async with self.inference_executor.reserve():
+                start_time = time.time()
+                images = await self.gather_or_cancel(ingest(index, image) for index, image in enumerate(images))
+                pages = await self.gather_or_cancel(detect(image, file_id) for image, file_id in zip(images, file_ids))
+                end_time = time.time()
+                self.logger.info("textDetectionPages 함수 실행 성공 - {}페이지, 탐지 {}개, 소요시간: {:.2f}초".format(
+                    len(pages), sum(len(result) for result, _ in pages), end_time - start_time))
+        except InferenceQueueFull as e:
+            raise HTTPException(status_code=503, detail=f"서버가 처리할 수 있는 요청 수를 초과했습니다: {e}", headers={"Retry-After": "1"})
+        except ValueError as e:
+            self.logger.error(f"이미지 디코딩 실패: {e}")
+            raise HTTPException(status_code=400, detail=f"이미지 디코딩 실패: {e}")
         except Exception as e:
             self.logger.error(f"yolov5 detection 함수 실행 중 에러 발생: {e}")
             raise HTTPException(status_code=500, detail=f"yolov5 detection 함수 실행 중 에러 발생: {e}")
+        return pages
 
     async def is_server2_healthy(self, health_url):
-        self.logger.info(f"서버 상태 확인 - URL: {health_url}")
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(health_url, timeout=5)
-                if response.status_code == 200 and response.json().get("status") == "ok":
-                    self.logger.info("서버2 상태: 정상")
-                    return True
-            except httpx.RequestError:
-                self.logger.error("서버2 상태: 비정상")
-                return False
+        # 헬스 모니터가 주기적으로 호출하므로 확인마다 DEBUG로만 남기고, 상태 변화는 HealthMonitor가 INFO/ERROR로 기록
+        self.logger.debug(f"서버 상태 확인 - URL: {health_url}")
+        client = await self.http_client.get_client()
+        try:
+            response = await client.get(health_url, timeout=5)
+            if response.status_code == 200 and response.json().get("status") == "ok":
+                self.logger.debug("서버2 상태: 정상")
+                return True
+        except httpx.RequestError as e:
+            self.logger.debug(f"서버2 상태: 비정상 - {e}")
+            return False
         return False
 
-    async def save_temp_file(self, file, file_id) -> Path:
-        
-        # temp_images 폴더 경로 생성
-        temp_images_dir = Path("temp_images")
-        temp_images_dir.mkdir(parents=True, exist_ok=True)
-        
-        # 파일 저장 경로 설정
-        temp_file_path = temp_images_dir / f"{file_id}.jpg"
-        
-        with open(temp_file_path, "wb") as buffer:
-            buffer.write(await file.read())
-            
-        self.logger.info(f"임시 파일 저장 - 경로: {temp_file_path}")
-        return temp_file_path
-        
-        
-        # temp_file_path = f"{file_id}.jpg"
-        # with open(temp_file_path, "wb") as buffer:
-        #     buffer.write(await file.read())
-        # self.logger.info(f"임시 파일 저장 - 경로: {temp_file_path}")
-        # return temp_file_path
+    async def fetch_image(self, image_url: str) -> bytes:
+        # URL의 이미지를 공유 커넥션 풀로 스트리밍 다운로드해서 바이트로 반환 (파일로 저장하지 않음)
+        # 크기가 URL_FETCH_MAX_BYTES를 넘으면 받는 도중에 끊고 413, 전체 다운로드가 URL_FETCH_TOTAL_TIMEOUT을 넘으면 504,
+        # 그 외 요청 실패는 400 (httpx 타임아웃은 청크 사이 대기 시간에만 적용되므로 전체 기한은 따로 검사)
+        max_bytes = serviceConfig.URL_FETCH_MAX_BYTES
+        if not image_url.lower().startswith(("http://", "https://")):
+            raise HTTPException(status_code=400, detail=f"Unsupported URL scheme: {image_url}")
 
-    async def send_cropped_images_to_ocr(self, dir_path: Path, remove_folder_path: Path, ocr_url: str) -> dict:
-        
-        categorized_data = {}
-        
-        # 크롭된 이미지들의 루트 폴더에서 하위 객체 폴더들 속 파일들에 대해 OCR 서버로 요청을 보내고 결과값을 반환
-        for category_dir in dir_path.iterdir():
-            if category_dir.is_dir():  # 하위 디렉토리만 처리
-                self.logger.info(f"처리 중인 카테고리 디렉토리: {category_dir}")
-
-                files_data = []
-                open_files = []
-
-                # 하위 디렉토리 내 이미지 파일들을 처리
-                for file_path in category_dir.glob("*.jpg"):
-                    f = open(file_path, "rb")
-                    files_data.append(('files', (file_path.name, f, 'image/jpeg')))
-                    open_files.append(f)
-
-                # 크롭된 이미지 파일이 없는 경우
-                if not files_data:
-                    # 파일 객체 닫기
-                    for f in open_files:
-                        f.close()
-                    self.logger.info(f"카테고리 '{category_dir}' 에 이미지 파일이 없습니다.")
-                    continue
-
-                # OCR 서버로 전송
-                self.logger.info(f"{category_dir} 디렉토리의 이미지를 OCR 서버로 전송")
-                async with httpx.AsyncClient() as client:
-                    try:
-                        timeout_limit = 45
-                        response = await client.post(url=ocr_url, files=files_data, timeout=timeout_limit)
-                        response.raise_for_status()
-                        result_texts = response.json()
-
-                        # 파일 이름 기준으로 정렬
-                        sorted_keys = sorted(result_texts.keys())
-                        sorted_data = {key: result_texts[key] for key in sorted_keys}
-                        self.logger.info(f"{category_dir} 디렉토리의 OCR 결과: {sorted_data}")
-
-                        # 보낸 파일과 받은 파일 비교
-                        sent_file_names = [file_data[1][0] for file_data in files_data]
-                        received_file_names = list(result_texts.keys())
-                        missing_files = set(sent_file_names) - set(received_file_names)
-
-                        if missing_files:
-                            self.logger.warning(f"카테고리 '{category_dir}' 에서 누락된 파일: {missing_files}")
-                        else:
-                            self.logger.info(f"카테고리 '{category_dir}' 의 모든 파일이 성공적으로 처리되었습니다.")
-                        
-                        # 결과값 저장
-                        categorized_data[category_dir.name] = sorted_data
-                        self.logger.info(f"카테고리 '{category_dir}' 의 OCR 결과값 추가 성공")
-
-                    except httpx.TimeoutException:
-                        self.logger.error("Request timeout while requesting server2")
-                        raise HTTPException(status_code=504, detail=f"Server2 did not respond in time. timeout limit is {timeout_limit} seconds.")
-                    except httpx.RequestError as exc:
-                        self.logger.error(f"Request error while requesting server2: {exc}")
-                        raise HTTPException(status_code=500, detail=f"Error while requesting server2: {exc}")
-                    except httpx.HTTPStatusError as exc:
-                        self.logger.error(f"HTTP error response from server2: {exc.response.text}")
-                        raise HTTPException(status_code=exc.response.status_code, detail=f"Error response from server2: {exc.response.text}")
-                    except Exception as exc:
-                        self.logger.error(f"Unexpected error: {exc}")
-                        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {exc}")
-
-                    finally:
-                        # 파일 객체 닫기
-                        for f in open_files:
-                            f.close()
-                        # # 카테고리 폴더 삭제
-                        # if os.path.exists(category_dir):
-                        #     shutil.rmtree(category_dir)
-                        #     self.logger.info(f"폴더 '{category_dir}' 가 성공적으로 삭제되었습니다.")
-        
-        # file_id에 대한 디렉토리 삭제
-        if os.path.exists(remove_folder_path):
-            shutil.rmtree(remove_folder_path)
-            self.logger.info(f"폴더 '{remove_folder_path}' 및 가 성공적으로 삭제되었습니다.")
-        
-        return categorized_data
+        client = await self.http_client.get_client()
+        timeout = httpx.Timeout(serviceConfig.URL_FETCH_TIMEOUT, connect=serviceConfig.HTTP_CONNECT_TIMEOUT, pool=serviceConfig.HTTP_POOL_TIMEOUT)
+        start_time = time.time()
 
+        async def download():
+            async with client.stream("GET", image_url, timeout=timeout, follow_redirects=True) as response:
+                response.raise_for_status()
+                content_length = response.headers.get("content-length")
+                if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"Image is larger than {max_bytes} bytes")
+                buffer = bytearray()
+                async for chunk in response.aiter_bytes():
+                    buffer += chunk
+                    if len(buffer) > max_bytes:
+                        raise HTTPException(status_code=413, detail=f"Image is larger than {max_bytes} bytes")
+                return buffer
 
+        try:
+            buffer = await asyncio.wait_for(download(), timeout=serviceConfig.URL_FETCH_TOTAL_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.logger.error(f"이미지 다운로드 시간 초과 - URL: {image_url}, 제한: {serviceConfig.URL_FETCH_TOTAL_TIMEOUT}초")
+            raise HTTPException(status_code=504, detail=f"Image download did not finish within {serviceConfig.URL_FETCH_TOTAL_TIMEOUT} seconds")
+        except httpx.HTTPError as exc:
+            self.logger.error(f"이미지 다운로드 실패 - URL: {image_url}, 에러: {exc}")
+            raise HTTPException(status_code=400, detail=f"Error while downloading image: {exc}")
+        metrics.STAGE_SECONDS.labels("fetch").observe(time.time() - start_time)
+        self.logger.info(f"이미지 다운로드 완료 - URL: {image_url}, 크기: {len(buffer)} bytes (소요시간: {time.time() - start_time:.2f}초)")
+        return bytes(buffer)
 
+    @staticmethod
+    async def gather_or_cancel(coroutines) -> list:
+        # 코루틴들을 동시에 실행하고 결과를 순서대로 반환, 하나라도 실패하면 나머지를 취소하고 예외 전달
+        tasks = [asyncio.ensure_future(coroutine) for coroutine in coroutines]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
 
-    # 클로바 OCR API 사용
-    async def send_cropped_images_to_clovaOCR(self, dir_path: Path, remove_folder_path: Path, ocr_url: str, api_secret_key: str) -> dict:
-        self.logger.info(f"send_cropped_images_to_clovaOCR 함수 실행 - 이미지 경로: {dir_path}, 삭제할 폴더 경로: {remove_folder_path}, OCR 서버 URL: {ocr_url})")
+    @staticmethod
+    async def as_completed_or_cancel(coroutines):
+        # 코루틴들을 동시에 실행하고 완료되는 순서대로 결과를 내보냄
+        # 하나라도 실패하거나 소비자가 중간에 멈추면(스트리밍 클라이언트 연결 종료 등) 나머지를 취소
+        tasks = [asyncio.ensure_future(coroutine) for coroutine in coroutines]
+        try:
+            for future in asyncio.as_completed(tasks):
+                yield await future
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
 
-        categorized_data = {}
-        
-        # 클로바 OCR 요청 URL 및 비밀 키
-        api_url = ocr_url
-        secret_key = api_secret_key
+    async def iter_crops_to_ocr(self, crops: dict, ocr_url: str):
+        # send_crops_to_ocr와 같은 요청을 보내되, 카테고리별 결과를 완료되는 순서대로 (카테고리, 결과)로 내보냄
+        client = await self.http_client.get_client()
+        hashes = await self.crop_hashes(crops)
+
+        async def send(category, images):
+            return category, await self.send_category_to_ocr(client, category, images, ocr_url, hashes.get(category))
+
+        async for category, data in self.as_completed_or_cancel(send(category, images) for category, images in crops.items()):
+            if data is not None:
+                yield category, data
+
+    async def send_crops_to_ocr(self, crops: dict, ocr_url: str) -> dict:
+        # 카테고리별 크롭 이미지 버퍼({카테고리: [(파일명, 바이트)]})를 카테고리마다 동시에 OCR 서버로 보내고 결과값을 반환
+        # 애플리케이션 공유 커넥션 풀을 사용하며, 동시 요청 수는 ocr_semaphore로 제한
+        client = await self.http_client.get_client()
+        hashes = await self.crop_hashes(crops)
+        results = await self.gather_or_cancel(
+            self.send_category_to_ocr(client, category, images, ocr_url, hashes.get(category)) for category, images in crops.items()
+        )
+        return {category: data for category, data in zip(crops, results) if data is not None}
+
+    async def crop_hashes(self, crops: dict) -> dict:
+        # 카테고리별 크롭 이미지의 OCR 캐시 키 ({카테고리: [CropSignature]}) - 디코딩이 필요하므로 스레드에서 계산
+        if not self.ocr_cache.enabled:
+            return {}
+        return await asyncio.to_thread(lambda: {category: self.ocr_cache.crop_hashes(images) for category, images in crops.items()})
+
+    async def send_category_to_ocr(self, client: httpx.AsyncClient, category: str, images: list, ocr_url: str, hashes: list = None):
         
-        # 크롭된 이미지 파일들을 클로바 OCR로 전송
-        for category_dir in (d for d in dir_path.iterdir() if d.is_dir() and os.listdir(d)):
-            self.logger.info(f"처리 중인 카테고리 디렉토리: {category_dir}")
-            
-            responses = []
-            
-            # 카테고리별 이미지 파일 처리
-            for file_path in category_dir.glob("*.jpg"):
-                image_file = file_path
-                
-                # 클로바 OCR 요청 JSON
-                request_json = {
-                    'images': [
-                        {
-                            'format': 'jpg',
-                            'name': image_file.name,
-                        }
-                    ],
-                    'requestId': str(uuid.uuid4()),
-                    'version': 'V2',
-                    'timestamp': int(round(time.time() * 1000))
-                }
+        # 크롭된 이미지 파일이 없는 경우
+        if not images:
+            self.logger.info(f"카테고리 '{category}' 에 이미지 파일이 없습니다.")
+            return None
 
-                # 요청 데이터 생성
-                payload = {'message': json.dumps(request_json).encode('UTF-8')}
-                files = [('file', open(image_file, 'rb'))]
-                
-                # 헤더에 비밀 키 추가
-                headers = {
-                    'X-OCR-SECRET': secret_key
-                }
+        # OCR 캐시에 있는 크롭은 캐시 결과를 쓰고, 없는 크롭만 전송
+        hashes = hashes or [None] * len(images)
+        cached_texts = {}
+        files_data, sent_hashes = [], {}
+        for (name, data), crop_hash in zip(images, hashes):
+            cached = self.ocr_cache.get(ocr_url, crop_hash)
+            if cached is not None:
+                cached_texts[name] = cached
+                metrics.OCR_REQUESTS.labels("server2", "cache_hit").inc()
+            else:
+                files_data.append(('files', (name, data, 'image/jpeg')))
+                sent_hashes[name] = crop_hash
 
-                # 요청 보내기
-                try:
-                    response = requests.post(api_url, headers=headers, data=payload, files=files)
-                    response.raise_for_status()  # 요청이 실패하면 HTTPError 발생
-                    responses.append(response.json())  # 응답을 JSON으로 변환하여 저장
-                    self.logger.info(f"클로바 OCR 요청 성공 - 파일: {image_file}")
-                
-                except requests.exceptions.RequestException as exc:
-                    self.logger.error(f"Request error while requesting Clova OCR API: {exc}")
-                    raise HTTPException(status_code=500, detail=f"Error while requesting Clova OCR API: {exc}")
-                
-                finally:
-                    # 파일 닫기
-                    files[0][1].close()
+        if not files_data:
+            self.logger.info(f"카테고리 '{category}' 의 모든 크롭이 OCR 캐시에 있습니다.")
+            return {key: cached_texts[key] for key in sorted(cached_texts)}
+
+        # OCR 서버로 전송
+        self.logger.info(f"{category} 카테고리의 이미지를 OCR 서버로 전송")
+        timeout_limit = 45
+        try:
+            async with self.ocr_semaphore:
+                with metrics.STAGE_SECONDS.labels("ocr").time():
+                    response = await client.post(url=ocr_url, files=files_data, timeout=timeout_limit)
+            response.raise_for_status()
+            result_texts = response.json()
+            metrics.OCR_REQUESTS.labels("server2", "success").inc()
+            for name, crop_hash in sent_hashes.items():
+                if name in result_texts:
+                    self.ocr_cache.put(ocr_url, crop_hash, result_texts[name])
+            result_texts.update(cached_texts)
+
+            # 파일 이름 기준으로 정렬
+            sorted_keys = sorted(result_texts.keys())
+            sorted_data = {key: result_texts[key] for key in sorted_keys}
+            self.logger.info(f"{category} 카테고리의 OCR 결과: {sorted_data}")
+
+            # 보낸 파일과 받은 파일 비교
+            sent_file_names = [file_data[1][0] for file_data in files_data]
+            received_file_names = list(result_texts.keys())
+            missing_files = set(sent_file_names) - set(received_file_names)
+
+            if missing_files:
+                self.logger.warning(f"카테고리 '{category}' 에서 누락된 파일: {missing_files}")
+            else:
+                self.logger.info(f"카테고리 '{category}' 의 모든 파일이 성공적으로 처리되었습니다.")
             
-            categorized_data[category_dir.name] = responses  # 카테고리별로 응답 저장
-            self.logger.info(f"카테고리 '{category_dir}' 의 OCR 결과값 추가 성공")
+            self.logger.info(f"카테고리 '{category}' 의 OCR 결과값 추가 성공")
+            return sorted_data
 
-        # 임시 파일 삭제
-        if os.path.exists(remove_folder_path):
-            shutil.rmtree(remove_folder_path)
-            self.logger.info(f"폴더 '{remove_folder_path}' 가 성공적으로 삭제되었습니다.")
-        
+        except httpx.TimeoutException:
+            metrics.OCR_REQUESTS.labels("server2", "error").inc()
+            self.logger.error("Request timeout while requesting server2")
+            raise HTTPException(status_code=504, detail=f"Server2 did not respond in time. timeout limit is {timeout_limit} seconds.")
+        except httpx.RequestError as exc:
+            metrics.OCR_REQUESTS.labels("server2", "error").inc()
+            self.logger.error(f"Request error while requesting server2: {exc}")
+            raise HTTPException(status_code=500, detail=f"Error while requesting server2: {exc}")
+        except httpx.HTTPStatusError as exc:
+            metrics.OCR_REQUESTS.labels("server2", "error").inc()
+            self.logger.error(f"HTTP error response from server2: {exc.response.text}")
+            raise HTTPException(status_code=exc.response.status_code, detail=f"Error response from server2: {exc.response.text}")
+        except Exception as exc:
+            metrics.OCR_REQUESTS.labels("server2", "error").inc()
+            self.logger.error(f"Unexpected error: {exc}")
+            raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {exc}")
+
+
+
+
+    async def send_crops_to_clovaOCR(self, crops: dict, ocr_url: str, api_secret_key: str) -> dict:
+        # 모든 카테고리의 모든 크롭 이미지를 동시에 클로바 OCR로 보내고, 카테고리별로 보낸 순서대로 응답을 모아 반환
+        client = await self.http_client.get_client()
+        hashes = await self.crop_hashes(crops)
+        tasks = [(category, self.send_cached_crop_to_clovaOCR(client, name, data, crop_hash, ocr_url, api_secret_key))
+                 for category, images in crops.items()
+                 for (name, data), crop_hash in zip(images, hashes.get(category) or [None] * len(images))]
+        responses = await self.gather_or_cancel(task for _, task in tasks)
+
+        categorized_data = {}
+        for (category, _), response in zip(tasks, responses):
+            categorized_data.setdefault(category, []).append(response)  # 카테고리별로 응답 저장
+        for category in categorized_data:
+            self.logger.info(f"카테고리 '{category}' 의 OCR 결과값 추가 성공")
         return categorized_data
 
+    async def iter_crops_to_clovaOCR(self, crops: dict, ocr_url: str, api_secret_key: str):
+        # send_crops_to_clovaOCR와 같은 요청을 보내되, 크롭별 응답을 완료되는 순서대로 (카테고리, 파일명, 응답)으로 내보냄
+        client = await self.http_client.get_client()
+        hashes = await self.crop_hashes(crops)
 
-    # 클로바 OCR API 한 번만 사용
-    async def send_original_image_to_clovaOCR(self, img_path: Path, ocr_url: str, api_secret_key: str) -> dict:
-        
-        self.logger.info(f"send_original_image_to_clovaOCR 함수 실행 - 이미지 경로: {img_path}, OCR 서버 URL: {ocr_url})")
-        
-        # 클로바 OCR 요청 URL 및 비밀 키
-        api_url = ocr_url
-        secret_key = api_secret_key
-        
-        image_file = img_path
+        async def send(category, name, data, crop_hash):
+            return category, name, await self.send_cached_crop_to_clovaOCR(client, name, data, crop_hash, ocr_url, api_secret_key)
+
+        async for result in self.as_completed_or_cancel(
+                send(category, name, data, crop_hash)
+                for category, images in crops.items()
+                for (name, data), crop_hash in zip(images, hashes.get(category) or [None] * len(images))):
+            yield result
+
+    async def send_cached_crop_to_clovaOCR(self, client: httpx.AsyncClient, name: str, data: bytes, crop_hash, ocr_url: str, api_secret_key: str) -> dict:
+        # OCR 캐시에 같은 크롭의 응답이 있으면 이미지 이름만 바꿔서 반환하고, 없으면 클로바로 전송 후 저장
+        cached = self.ocr_cache.get(ocr_url, crop_hash)
+        if cached is not None:
+            for image in cached.get('images', []):
+                image['name'] = name
+            metrics.OCR_REQUESTS.labels("clova", "cache_hit").inc()
+            return cached
+        response = await self.send_crop_to_clovaOCR(client, name, data, ocr_url, api_secret_key)
+        self.ocr_cache.put(ocr_url, crop_hash, response)
+        return response
+
+    async def send_crop_to_clovaOCR(self, client: httpx.AsyncClient, name: str, data: bytes, ocr_url: str, api_secret_key: str) -> dict:
         
         # 클로바 OCR 요청 JSON
         request_json = {
             'images': [
                 {
                     'format': 'jpg',
-                    'name': image_file.name,
+                    'name': name,
                 }
             ],
             'requestId': str(uuid.uuid4()),
@@ -249,28 +377,32 @@ class YOLOv5Service:
 
         # 요청 데이터 생성
         payload = {'message': json.dumps(request_json).encode('UTF-8')}
-        files = [('file', open(image_file, 'rb'))]
+        files = [('file', (name, data, 'image/jpeg'))]
         
         # 헤더에 비밀 키 추가
         headers = {
-            'X-OCR-SECRET': secret_key
+            'X-OCR-SECRET': api_secret_key
         }
 
-        clova_ocr_result = None
-        
         # 요청 보내기
         try:
-            response = requests.post(api_url, headers=headers, data=payload, files=files)
-            response.raise_for_status()  # 요청이 실패하면 HTTPError 발생
-            clova_ocr_result = response.json()  # 응답을 JSON으로 변환하여 저장
-            self.logger.info(f"클로바 OCR 성공 - 파일: {image_file}")
+            async with self.ocr_semaphore:
+                with metrics.STAGE_SECONDS.labels("ocr").time():
+                    response = await client.post(ocr_url, headers=headers, data=payload, files=files)
+            response.raise_for_status()  # 요청이 실패하면 HTTPStatusError 발생
+            metrics.OCR_REQUESTS.labels("clova", "success").inc()
+            self.logger.info(f"클로바 OCR 요청 성공 - 파일: {name}")
+            return response.json()  # 응답을 JSON으로 변환하여 반환
         
-        except requests.exceptions.RequestException as exc:
+        except httpx.HTTPError as exc:
+            metrics.OCR_REQUESTS.labels("clova", "error").inc()
             self.logger.error(f"Request error while requesting Clova OCR API: {exc}")
             raise HTTPException(status_code=500, detail=f"Error while requesting Clova OCR API: {exc}")
-        
-        finally:
-            # 파일 닫기
-            files[0][1].close()
-        
+
+
+    async def send_image_bytes_to_clovaOCR(self, name: str, data: bytes, ocr_url: str, api_secret_key: str) -> dict:
+        # 메모리의 이미지 한 장을 클로바 OCR로 보내고 응답(dict)을 반환 (공유 커넥션 풀 사용)
+        client = await self.http_client.get_client()
+        clova_ocr_result = await self.send_crop_to_clovaOCR(client, name, data, ocr_url, api_secret_key)
+        self.logger.info(f"클로바 OCR 성공 - 파일: {name}")
         return clova_ocr_result
@@ -0,0 +1,235 @@
+# 엔드 투 엔드 부하 테스트 - OCR 대역 서버와 앱을 띄우고 /api/yolo/* 에 목표 RPS 또는 동시성으로 요청을 보낸 뒤
+# 처리량, 지연 시간 p50/p95/p99, 상태 코드별 오류율과 앱의 단계별 평균 소요 시간(/metrics)을 보고함
+#
+# 실행 (저장소 루트에서):
+#   python -m app.test.load.loadTest --route yolo --concurrency 16 --duration 60
+#   python -m app.test.load.loadTest --route yolo_clova_once --rps 20 --duration 60 --latency-ms 800 --error-rate 0.02
+#   python -m app.test.load.loadTest --route yolo-from-url --rps 10   # 이미지는 대역 서버가 제공 (/images/<이름>)
+#   python -m app.test.load.loadTest --route yolo --concurrency 32 --app-env YOLO_INFERENCE_MODE=process YOLO_INFERENCE_WORKERS=4
+#   python -m app.test.load.loadTest --base-url http://127.0.0.1:8001 --no-start   # 이미 실행 중인 앱 대상
+#
+# 같은 이미지를 반복해서 보내므로 기본적으로 앱의 결과 캐시와 OCR 캐시를 끈 상태로 실행함 (--keep-caches로 유지)
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[3]  # 저장소 루트
+NOTE_IMAGE = ROOT / "app/test/notes/testimage.png"
+ROUTES = ("yolo", "yolo-from-url", "yolo_clova", "yolo_clova_once", "yolo-batch")
+
+
+def start_process(module, *args, env=None):
+    return subprocess.Popen([sys.executable, "-m", module, *map(str, args)], cwd=ROOT, env={**os.environ, **(env or {})})
+
+
+async def wait_ready(url, process=None, timeout=180.0):
+    # url이 200을 반환할 때까지 대기 (모델 로드 시간 포함)
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process is not None and process.poll() is not None:
+                raise RuntimeError(f"process exited with code {process.returncode} before {url} was ready")
+            try:
+                if (await client.get(url, timeout=2)).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.5)
+    raise TimeoutError(f"{url} was not ready after {timeout}s")
+
+
+def request_kwargs(route, image_bytes, filename, pages, image_url=None):
+    if route == "yolo-from-url":
+        return {"params": {"image_url": image_url}}
+    if route == "yolo-batch":
+        return {"files": [("files", (f"{i}_{filename}", image_bytes, "image/png")) for i in range(pages)]}
+    return {"files": {"file": (filename, image_bytes, "image/png")}}
+
+
+async def send(client, url, kwargs, started, records):
+    # started: 예정된 시작 시각 (오픈 루프에서는 밀린 대기 시간까지 지연으로 포함)
+    try:
+        response = await client.post(url, **kwargs)
+        status = response.status_code
+    except httpx.TimeoutException:
+        status = "timeout"
+    except httpx.HTTPError as exc:
+        status = type(exc).__name__
+    records.append((status, time.perf_counter() - started))
+
+
+async def closed_loop(client, url, kwargs, concurrency, duration, records):
+    # 동시성 고정: 워커마다 응답을 받으면 바로 다음 요청
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            await send(client, url, kwargs, time.perf_counter(), records)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def open_loop(client, url, kwargs, rps, duration, records):
+    # 목표 RPS 고정: 응답과 상관없이 1/rps 간격으로 요청 시작
+    start = time.perf_counter()
+    tasks = []
+    for i in range(int(rps * duration)):
+        scheduled = start + i / rps
+        await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+        tasks.append(asyncio.create_task(send(client, url, kwargs, scheduled, records)))
+    await asyncio.gather(*tasks)
+
+
+def summarize(records, elapsed):
+    statuses = Counter(status for status, _ in records)
+    ok = np.array([latency for status, latency in records if status == 200]) * 1000
+    all_ms = np.array([latency for _, latency in records]) * 1000
+
+    def percentiles(values):
+        if not len(values):
+            return {}
+        return {f"p{p}_ms": float(np.percentile(values, p)) for p in (50, 95, 99)} | {"mean_ms": float(values.mean()), "max_ms": float(values.max())}
+
+    return {
+        "requests": len(records),
+        "elapsed_s": elapsed,
+        "throughput_rps": len(ok) / elapsed if elapsed else 0.0,
+        "error_rate": 1 - len(ok) / len(records) if records else 0.0,
+        "status_counts": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+        "latency_ok": percentiles(ok),
+        "latency_all": percentiles(all_ms),
+    }
+
+
+def stage_totals(metrics_text):
+    # /metrics의 yolo_stage_duration_seconds에서 단계별 (합계 초, 호출 수)
+    totals = {}
+    for line in metrics_text.splitlines():
+        for index, suffix in enumerate(("_sum", "_count")):
+            prefix = f"yolo_stage_duration_seconds{suffix}{{stage=\""
+            if line.startswith(prefix):
+                stage, value = line[len(prefix):].split("\"}", 1)
+                totals.setdefault(stage, [0.0, 0.0])[index] = float(value)
+    return totals
+
+
+def stage_means(before, after):
+    # 두 시점 사이(측정 구간)의 단계별 호출 수와 평균 소요 시간(ms)
+    means = {}
+    for stage, (total, count) in sorted(after.items()):
+        prev_total, prev_count = before.get(stage, (0.0, 0.0))
+        if count > prev_count:
+            means[stage] = {"count": int(count - prev_count), "mean_ms": (total - prev_total) / (count - prev_count) * 1000}
+    return means
+
+
+async def run_load(opt):
+    url = f"{opt.base_url}/api/yolo/{opt.route}"
+    image_path = Path(opt.image)
+    image_url = opt.image_url or f"http://127.0.0.1:{opt.stub_port}/images/{image_path.name}"
+    kwargs = request_kwargs(opt.route, image_path.read_bytes(), image_path.name, opt.pages, image_url)
+    if opt.rps:
+        # 오픈 루프는 응답이 늦어지면 동시 요청 수가 늘어나야 하므로 커넥션 수를 제한하지 않음
+        # (제한하면 요청이 클라이언트 풀에서 대기해 앱이 아닌 부하 발생기의 지연을 측정하게 됨)
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    else:
+        limits = httpx.Limits(max_connections=max(opt.concurrency, 1), max_keepalive_connections=max(opt.concurrency, 1))
+    async with httpx.AsyncClient(timeout=opt.timeout, limits=limits) as client:
+        if opt.warmup:
+            await closed_loop(client, url, kwargs, opt.concurrency, opt.warmup, [])
+        before = stage_totals((await client.get(f"{opt.base_url}/metrics")).text)
+        records = []
+        start = time.perf_counter()
+        if opt.rps:
+            await open_loop(client, url, kwargs, opt.rps, opt.duration, records)
+        else:
+            await closed_loop(client, url, kwargs, opt.concurrency, opt.duration, records)
+        elapsed = time.perf_counter() - start
+        after = stage_totals((await client.get(f"{opt.base_url}/metrics")).text)
+
+    report = summarize(records, elapsed)
+    report["config"] = {key: str(value) if isinstance(value, Path) else value for key, value in vars(opt).items()}
+    report["app_stages"] = stage_means(before, after)  # 워밍업을 제외한 측정 구간의 단계별 평균
+    return report
+
+
+def print_report(report):
+    print(f"\n{report['config']['route']} - {report['requests']} requests in {report['elapsed_s']:.1f}s")
+    print(f"throughput: {report['throughput_rps']:.2f} req/s, error rate: {report['error_rate'] * 100:.2f}%  {report['status_counts']}")
+    for name in ("latency_ok", "latency_all"):
+        stats = report[name]
+        if stats:
+            print(f"{name:<12} p50 {stats['p50_ms']:8.1f} ms  p95 {stats['p95_ms']:8.1f} ms  p99 {stats['p99_ms']:8.1f} ms  max {stats['max_ms']:8.1f} ms")
+    for stage, stats in report["app_stages"].items():
+        print(f"  stage {stage:<12} {stats['count']:>7} calls  mean {stats['mean_ms']:8.1f} ms")
+
+
+async def main(opt):
+    processes = []
+    try:
+        if not opt.no_start:
+            stub_port, app_port = opt.stub_port, int(opt.base_url.rsplit(":", 1)[1])
+            stub_url = f"http://127.0.0.1:{stub_port}"
+            stub = start_process("app.test.load.stubServers", "--port", stub_port, "--latency-ms", opt.latency_ms,
+                                 "--jitter-ms", opt.jitter_ms, "--error-rate", opt.error_rate,
+                                 "--ocr-latency-per-file-ms", opt.ocr_latency_per_file_ms, "--image", opt.image)
+            processes.append(stub)
+            await wait_ready(f"{stub_url}/api/test/health", stub)
+
+            env = {} if opt.keep_caches else {"RESULT_CACHE_MAX_BYTES": "0", "RESULT_CACHE_DIR": "", "OCR_CACHE_MAX_ENTRIES": "0"}
+            env.update(item.split("=", 1) for item in opt.app_env)
+            app = start_process("app.test.load.runApp", "--port", app_port, "--stub-url", stub_url, env=env)
+            processes.append(app)
+            await wait_ready(f"{opt.base_url}/metrics", app, timeout=opt.startup_timeout)
+
+        report = await run_load(opt)
+        print_report(report)
+        if opt.json:
+            Path(opt.json).parent.mkdir(parents=True, exist_ok=True)
+            Path(opt.json).write_text(json.dumps(report, indent=2, ensure_ascii=False))
+            print(f"결과 저장: {opt.json}")
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def parse_opt():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--route", default="yolo", choices=ROUTES, help="/api/yolo/<route> to load")
+    parser.add_argument("--image", default=NOTE_IMAGE, help="image to upload")
+    parser.add_argument("--image-url", default="", help="image URL for yolo-from-url (default: the image served by the stub server)")
+    parser.add_argument("--pages", type=int, default=5, help="pages per request for yolo-batch")
+    parser.add_argument("--rps", type=float, default=0.0, help="open-loop target requests/sec (0: closed loop)")
+    parser.add_argument("--concurrency", type=int, default=8, help="closed-loop concurrency / connection limit (no limit with --rps)")
+    parser.add_argument("--duration", type=float, default=30.0, help="measurement seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="warmup seconds (not reported)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request timeout seconds")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8001", help="app base URL")
+    parser.add_argument("--no-start", action="store_true", help="use an already running app instead of starting stubs + app")
+    parser.add_argument("--stub-port", type=int, default=9001)
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="stub OCR mean latency")
+    parser.add_argument("--jitter-ms", type=float, default=50.0, help="stub OCR latency jitter")
+    parser.add_argument("--ocr-latency-per-file-ms", type=float, default=20.0, help="stub ocr-multi extra latency per file")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="stub OCR 500 probability")
+    parser.add_argument("--app-env", nargs="*", default=[], help="KEY=VALUE settings for the app, e.g. YOLO_INFERENCE_WORKERS=2")
+    parser.add_argument("--keep-caches", action="store_true", help="keep the result / OCR caches enabled")
+    parser.add_argument("--startup-timeout", type=float, default=180.0, help="seconds to wait for the app to load the model")
+    parser.add_argument("--json", default="", help="write the report to this JSON file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_opt()))
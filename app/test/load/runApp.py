@@ -0,0 +1,40 @@
+# 부하 테스트용 앱 실행 - 서버2/클로바 주소를 대역 서버(stubServers)로 바꿔서 main:app을 실행
+# app/config/serverURL.py, apikey.py(비공개 설정)가 없어도 실행되도록 같은 이름의 설정 모듈을 만들어 등록함
+# 실행: python -m app.test.load.runApp --port 8001 --stub-url http://127.0.0.1:9001
+import argparse
+import sys
+import types
+
+import uvicorn
+
+
+def use_stub_servers(stub_url, api_key="stub-key"):
+    # import app.config.serverURL / apikey 가 대역 서버 주소를 가리키는 모듈을 반환하도록 등록
+    import app.config
+
+    server_url = types.ModuleType("app.config.serverURL")
+    server_url.SERVER2_HEALTH_URL = f"{stub_url}/api/test/health"
+    server_url.SERVER2_OCR_MULTI_URL = f"{stub_url}/api/ocr/ocr-multi"
+    server_url.CLOVA_OCR_URL = f"{stub_url}/clova/general"
+    apikey = types.ModuleType("app.config.apikey")
+    apikey.CLOVA_OCR_API_KEY = api_key
+
+    for name, module in (("serverURL", server_url), ("apikey", apikey)):
+        sys.modules[f"app.config.{name}"] = module
+        setattr(app.config, name, module)
+
+
+def parse_opt():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--stub-url", default="http://127.0.0.1:9001", help="stubServers base URL")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    opt = parse_opt()
+    use_stub_servers(opt.stub_url.rstrip("/"))
+    from main import app  # 설정 모듈을 등록한 뒤에 import
+
+    uvicorn.run(app, host=opt.host, port=opt.port, log_level="warning")
@@ -0,0 +1,132 @@
+# 부하 테스트용 OCR 대역 서버 - 서버2(헬스 체크, ocr-multi)와 클로바 OCR V2의 응답 형식을 흉내냄
+# 실행: python -m app.test.load.stubServers --port 9001 --latency-ms 300 --jitter-ms 100 --error-rate 0.01
+#   GET  /api/test/health    -> {"status": "ok"}
+#   POST /api/ocr/ocr-multi  -> {파일명: 텍스트} (files 필드의 파일마다 하나)
+#   POST /clova/general      -> 클로바 V2 응답 (images[].fields[].inferText / boundingPoly)
+#   GET  /images/<이름>      -> --image 파일 바이트 (/yolo-from-url 부하 테스트가 내려받는 이미지, 지연 없음)
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from io import BytesIO
+from pathlib import Path
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+from PIL import Image
+
+NOTE_IMAGE = Path(__file__).resolve().parents[1] / "notes" / "testimage.png"
+
+
+def create_app(latency_ms=200.0, jitter_ms=50.0, error_rate=0.0, ocr_latency_per_file_ms=20.0, seed=None, image_path=NOTE_IMAGE):
+    # latency_ms ± jitter_ms 만큼 기다린 뒤 응답, error_rate 확률로 500 응답
+    # ocr-multi는 파일 하나당 ocr_latency_per_file_ms를 더 기다림 (카테고리 크기에 비례하는 지연)
+    stub_app = FastAPI()
+    rng = random.Random(seed)
+    stats = {"health": 0, "ocr_multi": 0, "clova": 0, "images": 0, "errors": 0}
+    image_bytes = Path(image_path).read_bytes()
+    with Image.open(BytesIO(image_bytes)) as img:
+        image_type = Image.MIME.get(img.format, "application/octet-stream")
+
+    async def delay(extra_ms=0.0):
+        await asyncio.sleep(max(0.0, latency_ms + extra_ms + rng.uniform(-jitter_ms, jitter_ms)) / 1000)
+
+    def failed():
+        if rng.random() < error_rate:
+            stats["errors"] += 1
+            return JSONResponse(status_code=500, content={"detail": "stub error"})
+        return None
+
+    @stub_app.get("/api/test/health")
+    async def health():
+        stats["health"] += 1
+        return {"status": "ok"}
+
+    @stub_app.post("/api/ocr/ocr-multi")
+    async def ocr_multi(request: Request):
+        stats["ocr_multi"] += 1
+        form = await request.form()
+        files = form.getlist("files")
+        await delay(ocr_latency_per_file_ms * len(files))
+        return failed() or {file.filename: f"stub text {file.filename}" for file in files}
+
+    @stub_app.post("/clova/general")
+    async def clova(request: Request):
+        stats["clova"] += 1
+        form = await request.form()
+        message = json.loads(form["message"])
+        upload = form["file"]
+        data = await upload.read()
+        await delay()
+        error = failed()
+        if error is not None:
+            return error
+        with Image.open(BytesIO(data)) as img:
+            width, height = img.size
+        return {
+            "version": "V2",
+            "requestId": message.get("requestId", str(uuid.uuid4())),
+            "timestamp": int(time.time() * 1000),
+            "images": [
+                {
+                    "uid": uuid.uuid4().hex,
+                    "name": image.get("name", upload.filename),
+                    "inferResult": "SUCCESS",
+                    "message": "SUCCESS",
+                    "validationResult": {"result": "NO_REQUESTED"},
+                    "fields": text_line_fields(width, height),
+                }
+                for image in message.get("images", [{}])
+            ],
+        }
+
+    @stub_app.get("/images/{name}")
+    async def image(name: str):
+        stats["images"] += 1
+        return Response(content=image_bytes, media_type=image_type)
+
+    @stub_app.get("/stats")
+    async def get_stats():
+        return stats
+
+    return stub_app
+
+
+def text_line_fields(width, height, line_height=36, words_per_line=6):
+    # 이미지 전체를 줄/단어 격자로 덮는 필드 목록 - YOLO 박스와의 매칭(/yolo_clova_once)이 실제처럼 동작하도록
+    fields = []
+    word_width = width / words_per_line
+    for top in range(0, max(1, height - line_height + 1), line_height):
+        for i in range(words_per_line):
+            left, right, bottom = i * word_width, (i + 1) * word_width, top + line_height
+            fields.append({
+                "valueType": "ALL",
+                "inferText": f"w{top // line_height}_{i}",
+                "inferConfidence": 0.99,
+                "type": "NORMAL",
+                "lineBreak": i == words_per_line - 1,
+                "boundingPoly": {"vertices": [{"x": left, "y": top}, {"x": right, "y": top}, {"x": right, "y": bottom}, {"x": left, "y": bottom}]},
+            })
+    return fields
+
+
+def parse_opt():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9001)
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="mean response latency")
+    parser.add_argument("--jitter-ms", type=float, default=50.0, help="uniform latency jitter (+/-)")
+    parser.add_argument("--ocr-latency-per-file-ms", type=float, default=20.0, help="extra ocr-multi latency per file")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability of a 500 response")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--image", default=NOTE_IMAGE, help="image served at /images/<name>")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    opt = parse_opt()
+    uvicorn.run(create_app(opt.latency_ms, opt.jitter_ms, opt.error_rate, opt.ocr_latency_per_file_ms, opt.seed, opt.image),
+                host=opt.host, port=opt.port, log_level="warning")
@@ -0,0 +1,99 @@
+# BatchScheduler 단위 테스트 - 배치 묶기, 대기 시간 초과 시 배치 실행, 실패 격리
+import asyncio
+
+import pytest
+
+from app.service.batchScheduler import BatchScheduler
+
+
+class FakeDetector:
+    # detect_batch 대역 - 호출된 배치를 기록하고 이미지 값을 그대로 결과로 돌려줌
+    def __init__(self, fail_on=None):
+        self.calls = []
+        self.fail_on = fail_on
+
+    def __call__(self, images, conf_thres):
+        self.calls.append(list(images))
+        if self.fail_on in images:
+            raise ValueError(f"bad image {self.fail_on}")
+        return [f"result-{image}-{conf}" for image, conf in zip(images, conf_thres)]
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_concurrent_requests_share_one_batch():
+    detector = FakeDetector()
+
+    async def main():
+        scheduler = BatchScheduler(detector, max_batch_size=4, max_wait_ms=50)
+        try:
+            return await asyncio.gather(*(scheduler.submit(i, 0.5) for i in range(4)))
+        finally:
+            await scheduler.stop()
+
+    assert run(main()) == [f"result-{i}-0.5" for i in range(4)]
+    assert detector.calls == [[0, 1, 2, 3]]
+
+
+def test_full_batch_runs_without_waiting():
+    detector = FakeDetector()
+
+    async def main():
+        scheduler = BatchScheduler(detector, max_batch_size=2, max_wait_ms=10_000)
+        try:
+            return await asyncio.wait_for(asyncio.gather(scheduler.submit("a", 0.1), scheduler.submit("b", 0.2)), timeout=2)
+        finally:
+            await scheduler.stop()
+
+    assert run(main()) == ["result-a-0.1", "result-b-0.2"]
+    assert detector.calls == [["a", "b"]]
+
+
+def test_partial_batch_flushes_after_max_wait():
+    detector = FakeDetector()
+
+    async def main():
+        scheduler = BatchScheduler(detector, max_batch_size=8, max_wait_ms=20)
+        try:
+            first = await asyncio.wait_for(scheduler.submit("a", 0.5), timeout=2)
+            await asyncio.sleep(0.05)
+            second = await asyncio.wait_for(scheduler.submit("b", 0.5), timeout=2)
+            return first, second
+        finally:
+            await scheduler.stop()
+
+    assert run(main()) == ("result-a-0.5", "result-b-0.5")
+    assert detector.calls == [["a"], ["b"]]
+
+
+def test_failure_reaches_only_the_failing_member():
+    detector = FakeDetector(fail_on="bad")
+
+    async def main():
+        scheduler = BatchScheduler(detector, max_batch_size=3, max_wait_ms=50)
+        try:
+            return await asyncio.gather(*(scheduler.submit(x, 0.5) for x in ("a", "bad", "c")), return_exceptions=True)
+        finally:
+            await scheduler.stop()
+
+    good, bad, other = run(main())
+    assert good == "result-a-0.5" and other == "result-c-0.5"
+    assert isinstance(bad, ValueError)
+    assert detector.calls[0] == ["a", "bad", "c"]  # 배치 한 번 + 요청별 재실행
+
+
+def test_single_request_failure_is_not_retried():
+    detector = FakeDetector(fail_on="bad")
+
+    async def main():
+        scheduler = BatchScheduler(detector, max_batch_size=4, max_wait_ms=1)
+        try:
+            with pytest.raises(ValueError):
+                await scheduler.submit("bad", 0.5)
+        finally:
+            await scheduler.stop()
+
+    run(main())
+    assert detector.calls == [["bad"]]
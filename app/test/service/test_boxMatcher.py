@@ -0,0 +1,79 @@
+# boxMatcher 단위 테스트 - 벡터화한 매칭이 이전 이중 루프(calculate_iou)와 같은 결과를 내는지 확인
+import random
+
+import pytest
+
+pytest.importorskip("torch")  # boxMatcher가 yolov5 utils.metrics를 사용
+
+from app.service.boxMatcher import match_yolo_with_clova, parse_clova_result  # noqa: E402
+
+CLASS_NAMES = {0: "title", 1: "sentence"}
+
+
+def calculate_iou(box1, box2):
+    # 이전 라우터 구현 - 교집합 / 클로바 박스 넓이
+    x1, y1, x2, y2 = box1
+    x3, y3, x4, y4 = box2
+    inter_area = max(0, min(x2, x4) - max(x1, x3)) * max(0, min(y2, y4) - max(y1, y3))
+    box2_area = (x4 - x3) * (y4 - y3)
+    return inter_area / box2_area if box2_area else 0
+
+
+def reference_match(yolo_boxes, clova_boxes, class_names, overlap_threshold=0.5):
+    # 이전 라우터의 이중 루프 구현
+    result = {}
+    for yolo_box in yolo_boxes:
+        included_texts = [clova_box["text"] for clova_box in clova_boxes
+                          if calculate_iou(yolo_box["bbox"], clova_box["bbox"]) >= overlap_threshold]
+        if included_texts:
+            class_id = yolo_box["class_id"]
+            entries = result.setdefault(class_names.get(class_id, f"unknown_class_{class_id}"), {})
+            entries[f"texts_{len(entries) + 1}"] = ' '.join(included_texts)
+    return result
+
+
+def random_boxes(rng, n, size=1000, max_side=300):
+    boxes = []
+    for _ in range(n):
+        x1, y1 = rng.randrange(size), rng.randrange(size)
+        boxes.append((x1, y1, x1 + rng.randrange(0, max_side), y1 + rng.randrange(0, max_side)))
+    return boxes
+
+
+def test_overlapping_and_disjoint_boxes():
+    yolo_boxes = [{"class_id": 0, "bbox": (0, 0, 100, 50)},
+                  {"class_id": 1, "bbox": (0, 60, 200, 100)},
+                  {"class_id": 1, "bbox": (500, 500, 600, 600)},  # 겹치는 클로바 박스 없음
+                  {"class_id": 7, "bbox": (0, 0, 200, 100)}]  # 이름 없는 클래스
+    clova_boxes = [{"bbox": (10, 10, 90, 40), "text": "Hello"},  # 완전히 포함
+                   {"bbox": (50, 10, 150, 40), "text": "world"},  # 절반만 겹침 (임계값과 같음)
+                   {"bbox": (120, 60, 300, 100), "text": "partly"},  # 절반 미만
+                   {"bbox": (20, 65, 120, 95), "text": "inside"},
+                   {"bbox": (700, 700, 700, 720), "text": "empty"}]  # 넓이 0
+    expected = reference_match(yolo_boxes, clova_boxes, CLASS_NAMES)
+    assert expected == {"title": {"texts_1": "Hello world"},
+                        "sentence": {"texts_1": "inside"},
+                        "unknown_class_7": {"texts_1": "Hello world inside"}}
+    for prefilter in (False, True):
+        assert match_yolo_with_clova(yolo_boxes, clova_boxes, CLASS_NAMES, prefilter=prefilter) == expected
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("prefilter", [None, False, True])
+def test_matches_reference_loop_on_random_pages(seed, prefilter):
+    rng = random.Random(seed)
+    yolo_boxes = [{"class_id": rng.randrange(3), "bbox": bbox} for bbox in random_boxes(rng, 30, max_side=400)]
+    clova_boxes = [{"bbox": bbox, "text": f"w{i}"} for i, bbox in enumerate(random_boxes(rng, 300, max_side=80))]
+    for threshold in (0.3, 0.5, 1.0):
+        assert match_yolo_with_clova(yolo_boxes, clova_boxes, CLASS_NAMES, overlap_threshold=threshold, prefilter=prefilter) == \
+            reference_match(yolo_boxes, clova_boxes, CLASS_NAMES, overlap_threshold=threshold)
+
+
+def test_empty_inputs():
+    yolo_boxes = [{"class_id": 0, "bbox": (0, 0, 100, 100)}]
+    clova_boxes = [{"bbox": (10, 10, 20, 20), "text": "x"}]
+    assert match_yolo_with_clova([], clova_boxes, CLASS_NAMES) == {}
+    assert match_yolo_with_clova(yolo_boxes, [], CLASS_NAMES) == {}
+    assert match_yolo_with_clova([], [], CLASS_NAMES) == {}
+    assert parse_clova_result(None) == []
+    assert parse_clova_result({"images": [{"fields": []}]}) == []
@@ -0,0 +1,136 @@
+# HealthMonitor 회로 차단기 단위 테스트 - closed -> open -> half-open(확인 한 번) -> closed/open 전이
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.service import healthMonitor
+from app.service.healthMonitor import HealthMonitor
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeProbe:
+    # 서버2 헬스 체크 대역 - 정해둔 결과를 돌려주고 호출 횟수를 기록
+    def __init__(self, healthy=True, delay=0.0):
+        self.healthy = healthy
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return self.healthy
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    # 이벤트 루프도 time.monotonic을 쓰므로 모듈의 time만 바꿔치기
+    monkeypatch.setattr(healthMonitor, "time", SimpleNamespace(monotonic=clock))
+    return clock
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def make_open_monitor(probe, clock, failure_threshold=3):
+    monitor = HealthMonitor(probe, ttl=15.0, failure_threshold=failure_threshold, recovery_timeout=10.0)
+    probe.healthy = False
+    for _ in range(failure_threshold):
+        run(monitor.check())
+    assert monitor.circuit_open
+    return monitor
+
+
+def test_circuit_opens_after_consecutive_failures(clock):
+    probe = FakeProbe(healthy=False)
+    monitor = HealthMonitor(probe, failure_threshold=3)
+    run(monitor.check())
+    run(monitor.check())
+    assert not monitor.circuit_open
+    run(monitor.check())
+    assert monitor.circuit_open
+
+
+def test_success_resets_failure_count(clock):
+    probe = FakeProbe(healthy=False)
+    monitor = HealthMonitor(probe, failure_threshold=3)
+    run(monitor.check())
+    run(monitor.check())
+    probe.healthy = True
+    run(monitor.check())
+    probe.healthy = False
+    run(monitor.check())
+    run(monitor.check())
+    assert not monitor.circuit_open and monitor.consecutive_failures == 2
+
+
+def test_probe_exception_counts_as_failure(clock):
+    async def probe():
+        raise ConnectionError("down")
+
+    monitor = HealthMonitor(probe, failure_threshold=1)
+    assert run(monitor.check()) is False
+    assert monitor.circuit_open
+
+
+def test_open_circuit_rejects_without_probing(clock):
+    probe = FakeProbe()
+    monitor = make_open_monitor(probe, clock)
+    calls = probe.calls
+    clock.now += 9.9
+    assert run(monitor.is_available()) is False
+    assert probe.calls == calls
+
+
+def test_half_open_sends_one_trial_and_closes_on_success(clock):
+    probe = FakeProbe(delay=0.05)
+    monitor = make_open_monitor(probe, clock)
+    calls = probe.calls
+    probe.healthy = True
+    clock.now += 10.0
+
+    async def main():
+        return await asyncio.gather(*(monitor.is_available() for _ in range(5)))
+
+    results = run(main())
+    assert probe.calls == calls + 1  # 반열림 상태에서는 한 요청만 확인
+    assert results.count(True) == 1 and results.count(False) == 4
+    assert not monitor.circuit_open
+    assert run(monitor.is_available()) is True
+
+
+def test_half_open_reopens_on_trial_failure(clock):
+    probe = FakeProbe()
+    monitor = make_open_monitor(probe, clock)
+    calls = probe.calls
+    clock.now += 10.0
+    assert run(monitor.is_available()) is False
+    assert probe.calls == calls + 1
+    assert monitor.circuit_open and monitor.opened_at == clock.now
+    # 다시 열린 뒤에는 recovery_timeout 동안 확인 없이 거절
+    clock.now += 5.0
+    assert run(monitor.is_available()) is False
+    assert probe.calls == calls + 1
+
+
+def test_cached_state_is_used_within_ttl(clock):
+    probe = FakeProbe(healthy=True)
+    monitor = HealthMonitor(probe, ttl=15.0)
+    assert run(monitor.is_available()) is True  # 아직 확인한 적이 없어 직접 확인
+    assert probe.calls == 1
+    clock.now += 15.0
+    assert run(monitor.is_available()) is True
+    assert probe.calls == 1
+    clock.now += 0.1
+    assert run(monitor.is_available()) is True
+    assert probe.calls == 2
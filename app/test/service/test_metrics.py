@@ -0,0 +1,85 @@
+# metrics 단위 테스트 - Prometheus 텍스트 노출 형식(0.0.4) 출력 확인
+import pytest
+
+from app.service.metrics import Counter, Gauge, Histogram, Registry
+
+
+@pytest.fixture
+def registry():
+    return Registry()
+
+
+def test_counter_renders_total_per_label(registry):
+    counter = Counter("ocr_requests", "OCR calls.", ["backend", "outcome"], registry=registry)
+    counter.labels("server2", "success").inc()
+    counter.labels("server2", "success").inc(2)
+    counter.labels("clova", "error").inc()
+    assert registry.render() == (
+        "# HELP ocr_requests OCR calls.\n"
+        "# TYPE ocr_requests counter\n"
+        'ocr_requests_total{backend="clova",outcome="error"} 1.0\n'
+        'ocr_requests_total{backend="server2",outcome="success"} 3.0\n'
+    )
+
+
+def test_gauge_set_inc_and_function(registry):
+    gauge = Gauge("queue_depth", "Queue depth.", ["queue"], registry=registry)
+    depth = [3]
+    gauge.labels("batch").set_function(lambda: depth[0])
+    gauge.labels("inference").inc(2)
+    gauge.labels("inference").dec()
+    depth[0] = 5  # 수집 시점의 값을 사용
+    assert registry.render().splitlines()[2:] == ['queue_depth{queue="batch"} 5', 'queue_depth{queue="inference"} 1.0']
+    with gauge.labels("inference").track_inprogress():
+        assert gauge.labels("inference").get() == 2.0
+    assert gauge.labels("inference").get() == 1.0
+
+
+def test_unlabelled_gauge(registry):
+    gauge = Gauge("model_load_seconds", "Model load time.", registry=registry)
+    gauge.set(1.5)
+    assert registry.render().splitlines()[2] == "model_load_seconds 1.5"
+
+
+def test_histogram_renders_cumulative_buckets(registry):
+    histogram = Histogram("stage_seconds", "Stage duration.", ["stage"], buckets=(0.5, 0.1, 1.0), registry=registry)
+    for value in (0.05, 0.1, 0.3, 2.0):
+        histogram.labels("ocr").observe(value)
+    assert registry.render() == (
+        "# HELP stage_seconds Stage duration.\n"
+        "# TYPE stage_seconds histogram\n"
+        'stage_seconds_bucket{stage="ocr",le="0.1"} 2\n'  # 경계값(le)과 같은 값은 그 버킷에 포함
+        'stage_seconds_bucket{stage="ocr",le="0.5"} 3\n'
+        'stage_seconds_bucket{stage="ocr",le="1.0"} 3\n'
+        'stage_seconds_bucket{stage="ocr",le="+Inf"} 4\n'
+        'stage_seconds_sum{stage="ocr"} 2.45\n'
+        'stage_seconds_count{stage="ocr"} 4\n'
+    )
+
+
+def test_histogram_time_observes_elapsed_seconds(registry):
+    histogram = Histogram("batch_seconds", "Batch time.", registry=registry)
+    with histogram.time():
+        pass
+    child = histogram.labels()
+    assert sum(child.counts) == 1 and 0 <= child.sum < 1
+
+
+def test_label_values_are_escaped(registry):
+    counter = Counter("requests", "Requests.", ["route"], registry=registry)
+    counter.labels('a"b\\c\nd').inc()
+    assert registry.render().splitlines()[2] == 'requests_total{route="a\\"b\\\\c\\nd"} 1.0'
+
+
+def test_wrong_label_count_is_rejected(registry):
+    counter = Counter("requests", "Requests.", ["route", "status"], registry=registry)
+    with pytest.raises(ValueError):
+        counter.labels("/api/yolo")
+
+
+def test_registry_renders_metrics_in_registration_order(registry):
+    Counter("first", "First.", registry=registry).inc()
+    Gauge("second", "Second.", registry=registry).set(2)
+    lines = registry.render().splitlines()
+    assert [line for line in lines if line.startswith("# TYPE")] == ["# TYPE first counter", "# TYPE second gauge"]
+    assert Registry.CONTENT_TYPE == "text/plain; version=0.0.4; charset=utf-8"
@@ -0,0 +1,112 @@
+# OcrCache 단위 테스트 - 다중 인덱스 dHash 조회: 재인코딩한 크롭은 적중, 비율/밝기 프로파일이 다른 크롭은 실패
+import random
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.service.ocrCache import CropSignature, OcrCache
+
+NOTE_IMAGE = Path(__file__).resolve().parents[1] / "notes" / "testimage.png"
+# 테스트 노트 이미지의 문장 줄 (y_min, y_max) - 글자는 x 169~740 범위
+LINES = [(405, 426), (430, 449), (455, 470), (480, 495), (505, 519), (530, 544)]
+
+
+@pytest.fixture(scope="module")
+def page():
+    with Image.open(NOTE_IMAGE) as img:
+        return img.convert("RGB")
+
+
+def crop_bytes(page, box, quality=95, scale=2):
+    # 문장 박스를 잘라 확대한 JPEG 바이트 (크롭 전송 경로와 같은 형식)
+    crop = page.crop(box)
+    crop = crop.resize((crop.width * scale, crop.height * scale), Image.BICUBIC)
+    buffer = BytesIO()
+    crop.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def line_box(line, x_min=165, x_max=745):
+    y_min, y_max = line
+    return (x_min, y_min - 4, x_max, y_max + 4)
+
+
+@pytest.mark.parametrize("quality", [90, 80, 70])
+def test_reencoded_crop_hits(page, quality):
+    cache = OcrCache()
+    for i, line in enumerate(LINES):
+        cache.put("ocr", cache.crop_hash(crop_bytes(page, line_box(line))), {"text": f"line {i}"})
+    for i, line in enumerate(LINES):
+        assert cache.get("ocr", cache.crop_hash(crop_bytes(page, line_box(line), quality=quality))) == {"text": f"line {i}"}
+    assert cache.hits == len(LINES) and cache.misses == 0
+
+
+def test_different_aspect_ratio_misses(page):
+    cache = OcrCache()
+    cache.put("ocr", cache.crop_hash(crop_bytes(page, line_box(LINES[0]))), {"text": "line 0"})
+    half = cache.crop_hash(crop_bytes(page, line_box(LINES[0], x_max=455)))  # 같은 줄의 앞 절반
+    assert cache.get("ocr", half) is None
+
+
+def test_different_line_misses(page):
+    cache = OcrCache()
+    for i, line in enumerate(LINES[::2]):
+        cache.put("ocr", cache.crop_hash(crop_bytes(page, line_box(line))), {"text": f"line {i}"})
+    for line in LINES[1::2]:
+        assert cache.get("ocr", cache.crop_hash(crop_bytes(page, line_box(line), quality=80))) is None
+    assert cache.hits == 0
+
+
+def test_matching_profile_is_required():
+    cache = OcrCache()
+    profile = np.linspace(-1.5, 1.5, cache.profile_width, dtype=np.float32)
+    stored = CropSignature(random.Random(0).getrandbits(128), profile, 20.0)
+    cache.put("ocr", stored, "value")
+    assert cache.get("ocr", stored._replace(profile=profile[::-1].copy())) is None  # 해시는 같지만 밝기 분포가 반대
+    assert cache.get("ocr", stored._replace(aspect=10.0)) is None
+    assert cache.get("ocr", stored) == "value"
+
+
+def test_multi_index_finds_every_hash_within_max_distance():
+    cache = OcrCache()
+    rng = random.Random(1)
+    profile = np.zeros(cache.profile_width, dtype=np.float32)
+    bits = rng.getrandbits(128)
+    cache.put("ocr", CropSignature(bits, profile, 20.0), "value")
+    for distance in (0, 1, cache.max_distance // 2, cache.max_distance):
+        for _ in range(20):
+            flipped = sum(1 << i for i in rng.sample(range(128), distance))
+            assert cache.get("ocr", CropSignature(bits ^ flipped, profile, 20.0)) == "value"
+    far = sum(1 << i for i in rng.sample(range(128), cache.max_distance + 1))
+    assert cache.get("ocr", CropSignature(bits ^ far, profile, 20.0)) is None
+
+
+def test_namespaces_are_separate_and_values_are_copies(page):
+    cache = OcrCache()
+    signature = cache.crop_hash(crop_bytes(page, line_box(LINES[0])))
+    cache.put("clova", signature, {"texts": ["a"]})
+    assert cache.get("server2", signature) is None
+    hit = cache.get("clova", signature)
+    hit["texts"].append("changed")
+    assert cache.get("clova", signature) == {"texts": ["a"]}
+
+
+def test_lru_eviction_removes_index_entries():
+    cache = OcrCache(max_entries=2)
+    profile = np.zeros(cache.profile_width, dtype=np.float32)
+    signatures = [CropSignature(random.Random(i).getrandbits(128), profile, 20.0) for i in range(3)]
+    for i, signature in enumerate(signatures):
+        cache.put("ocr", signature, i)
+    assert cache.get("ocr", signatures[0]) is None
+    assert cache.get("ocr", signatures[2]) == 2
+    assert all(entry_ids <= set(cache.entries) for index in cache.index["ocr"] for entry_ids in index.values())
+
+
+def test_undecodable_crop_is_not_cached():
+    cache = OcrCache()
+    assert cache.crop_hash(b"not an image") is None
+    cache.put("ocr", None, "value")
+    assert cache.get("ocr", None) is None and not cache.entries
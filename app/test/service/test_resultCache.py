@@ -0,0 +1,148 @@
+# ResultCache 단위 테스트 - single-flight, 실패 후 inflight 정리, 메모리 LRU(바이트), 디스크 정리, 복사본 반환
+import asyncio
+import json
+import os
+import time
+
+from app.service.resultCache import ResultCache
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def size_of(value):
+    return len(json.dumps(value, ensure_ascii=False, default=str).encode())
+
+
+def test_concurrent_requests_compute_once():
+    cache = ResultCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"texts": ["a"]}
+
+    async def main():
+        return await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(5)))
+
+    results = run(main())
+    assert len(calls) == 1
+    assert results == [{"texts": ["a"]}] * 5
+    assert cache.misses == 1 and cache.hits == 0
+    assert not cache.inflight
+    assert run(cache.get_or_compute("k", compute)) == {"texts": ["a"]}
+    assert len(calls) == 1 and cache.hits == 1
+
+
+def test_failure_clears_inflight_and_is_not_cached():
+    cache = ResultCache()
+    calls = []
+
+    async def failing():
+        calls.append("fail")
+        await asyncio.sleep(0.01)
+        raise RuntimeError("server2 down")
+
+    async def succeeding():
+        calls.append("ok")
+        return {"ok": True}
+
+    async def main():
+        results = await asyncio.gather(*(cache.get_or_compute("k", failing) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert not cache.inflight
+        return await cache.get_or_compute("k", succeeding)
+
+    assert run(main()) == {"ok": True}
+    assert calls == ["fail", "ok"]
+
+
+def test_returns_copies_of_the_stored_result():
+    cache = ResultCache()
+
+    async def compute():
+        return {"crops": ["No_1_file_0.jpg"]}
+
+    async def main():
+        return await asyncio.gather(cache.get_or_compute("k", compute), cache.get_or_compute("k", compute))
+
+    first, second = run(main())
+    first["crops"].append("changed")
+    assert second == {"crops": ["No_1_file_0.jpg"]}
+    hit = cache.get("k")
+    assert hit == {"crops": ["No_1_file_0.jpg"]}
+    hit["crops"].clear()
+    assert cache.get("k") == {"crops": ["No_1_file_0.jpg"]}
+
+
+def test_memory_lru_evicts_by_bytes():
+    value = {"text": "x" * 100}
+    cache = ResultCache(max_bytes=size_of(value) * 3)
+    for key in ("a", "b", "c"):
+        cache.put(key, value)
+    cache.get("a")  # a를 최근 사용으로
+    cache.put("d", value)
+    assert list(cache.entries) == ["c", "a", "d"]
+    assert cache.total_bytes == size_of(value) * 3
+    cache.put("big", {"text": "x" * 1000})  # 한도보다 큰 결과는 저장하지 않음
+    assert "big" not in cache.entries and cache.total_bytes == size_of(value) * 3
+
+
+def test_disk_tier_reuses_results_after_memory_eviction(tmp_path):
+    cache = ResultCache(max_bytes=0, disk_dir=tmp_path)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return {"text": "한글"}
+
+    assert run(cache.get_or_compute("ab" * 32, compute)) == {"text": "한글"}
+    assert run(cache.get_or_compute("ab" * 32, compute)) == {"text": "한글"}
+    assert len(calls) == 1
+    assert cache.disk_path("ab" * 32).exists()
+
+
+def test_disk_sweep_removes_least_recently_used_files(tmp_path):
+    value = {"text": "x" * 100}
+    file_size = size_of(value)
+    cache = ResultCache(max_bytes=0, disk_dir=tmp_path, disk_max_bytes=file_size * 10)
+    keys = [f"{i:02d}" * 32 for i in range(10)]
+    now = time.time()
+    for age, key in enumerate(keys):  # keys[0]이 가장 오래 사용하지 않은 파일
+        cache.store_disk(key, value)
+        os.utime(cache.disk_path(key), (now - 1000 + age, now - 1000 + age))
+    assert cache.disk_bytes == file_size * 10
+    assert all(cache.disk_path(key).exists() for key in keys)
+
+    cache.store_disk("ff" * 32, value)  # 한도를 넘으면 90%까지 오래된 파일부터 삭제
+    remaining = [key for key in keys if cache.disk_path(key).exists()]
+    assert remaining == keys[2:]
+    assert cache.disk_path("ff" * 32).exists()
+    assert cache.disk_bytes == file_size * 9
+
+
+def test_disk_sweep_removes_stale_temp_files(tmp_path):
+    cache = ResultCache(max_bytes=0, disk_dir=tmp_path)
+    (tmp_path / "ab").mkdir()
+    stale, fresh = tmp_path / "ab" / "stale.tmp", tmp_path / "ab" / "fresh.tmp"
+    stale.write_text("{")
+    fresh.write_text("{")
+    old = time.time() - 2 * 60 * 60
+    os.utime(stale, (old, old))
+    cache.sweep_disk()
+    assert not stale.exists() and fresh.exists()
+
+
+def test_disabled_cache_always_computes():
+    cache = ResultCache(max_bytes=0)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return {}
+
+    run(cache.get_or_compute("k", compute))
+    run(cache.get_or_compute("k", compute))
+    assert len(calls) == 2
@@ -1,11 +1,12 @@
 # 실행 명령어 uvicorn main:app --reload --port=8001
 # 포트번호 : 8000번
 # api list : localhost:8001/docs
-from fastapi import FastAPI
-from app.router import imageRouter, yoloRouter
+from fastapi import FastAPI, Request
+from app.router import imageRouter, yoloRouter, metricsRouter
+from app.service import metrics
 
 import logging.config
-from app.service.yoloService import YOLOv5Service
+from app.router.yoloRouter import yolov5_service, server2_monitor
 import os
 import shutil
 import time
@@ -25,6 +26,25 @@ app = FastAPI()
 logger = logging.getLogger(__name__)
 
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    # 라우트별 처리 중 요청 수와 지연 시간 기록 (스트리밍 응답은 헤더를 보낸 시점까지)
+    # 처리 중 요청 수는 라우팅 전이므로 등록된 경로 집합으로, 지연 시간은 라우팅 후 매칭된 라우트(scope["route"])로 라벨을 정함
+    # 등록되지 않은 경로는 하나로 묶어서 시계열 수가 늘어나지 않게 함
+    path = request.url.path
+    inflight = metrics.INFLIGHT_REQUESTS.labels(path if path in ROUTE_PATHS else "other")
+    status = 500
+    start_time = time.perf_counter()
+    with inflight.track_inprogress():
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            route = getattr(request.scope.get("route"), "path", "other")
+            metrics.REQUEST_SECONDS.labels(route, status).observe(time.perf_counter() - start_time)
+
+
 @app.on_event("startup")
 async def startup_event():
     
@@ -34,23 +54,43 @@ async def startup_event():
     # 모델 초기화
     initialize_models()
     
+    # 공유 HTTP 커넥션 풀 생성
+    await yolov5_service.http_client.startup()
+    
+    # 서버2 헬스 모니터 시작
+    server2_monitor.start()
+    
     # 데이터베이스 초기화
     initialize_database()
     
     logger.info("서버가 초기화되었습니다.")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    
+    # 서버2 헬스 모니터 종료
+    await server2_monitor.stop()
+    
+    # 배치 스케줄러 및 추론 실행기 종료
+    await yolov5_service.batch_scheduler.stop()
+    yolov5_service.inference_executor.shutdown(wait=False)
+    
+    # 공유 HTTP 커넥션 풀 종료
+    await yolov5_service.http_client.shutdown()
+    
+    logger.info("서버가 종료되었습니다.")
+
+
 def initialize_models():
-    # Yolo 모델 초기화 코드 구현
-    yolov5_service = YOLOv5Service()
-    test_image_path = Path("yolov5") / "data" / "images" / "bus.jpg" # 테스트 이미지 경로
+    # Yolo 모델 초기화 - 가중치를 한 번만 로드/퓨즈/워밍업하여 레지스트리에 상주시킴
     try:
         start_time = time.time()
-        yolov5_service.textDetection(image_path=test_image_path, file_id="test_image", save_csv=False, save_txt=False, save_crop=False)
+        yolov5_service.load_model()  # 프로세스 모드: 공유 메모리 가중치로 워커 fork
         end_time = time.time()
-        logger.info(f"YOLO로 테스트 이미지 {test_image_path} 처리 완료 (소요시간: {end_time - start_time:.2f}초)")
+        logger.info(f"YOLO 모델 {yolov5_service.weights} 로드 완료 (소요시간: {end_time - start_time:.2f}초)")
     except Exception as e:
-        logger.error(f"테스트 이미지 처리 중 오류 발생: {e}")
+        logger.error(f"모델 로드 중 오류 발생: {e}")
     
     logger.info("모델이 초기화되었습니다.")
 
@@ -69,8 +109,7 @@ def initialize_database():
     
     # 데이터베이스 초기화 코드 구현
     runs_dir = "yolov5/runs/detect"
-    temp_dir = "temp_images"
-    directories_to_clear = [runs_dir, temp_dir]
+    directories_to_clear = [runs_dir]
 
     for directory in directories_to_clear:
         if os.path.exists(directory):
@@ -86,3 +125,7 @@ def initialize_database():
 # 라우터 정의
 app.include_router(imageRouter, prefix="/api/image")
 app.include_router(yoloRouter, prefix="/api/yolo")
+app.include_router(metricsRouter)
+
+# 메트릭 라벨에 쓰는 등록된 라우트 경로 (요청마다 라우트 목록을 훑지 않음)
+ROUTE_PATHS = frozenset(getattr(route, "path", None) for route in app.routes)
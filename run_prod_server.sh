@@ -4,6 +4,15 @@ set -x  # 명령어 실행을 로깅하여 보여줍니다.
 # 시작 로그
 echo "Starting script execution."
 
+# 추론 실행 모드 설정
+# - thread : 한 프로세스의 스레드 풀에서 추론 (torch가 모든 코어 사용)
+# - process: 가중치를 공유 메모리로 공유하는 워커 프로세스 풀에서 추론
+#            워커 수 × 워커당 스레드 수가 코어 수와 같도록 설정 (스레드 수 0이면 자동 계산)
+# uvicorn --workers N 대신 이 모드를 사용해야 가중치가 N번 로드되지 않음
+export YOLO_INFERENCE_MODE=${YOLO_INFERENCE_MODE:-thread}
+export YOLO_INFERENCE_WORKERS=${YOLO_INFERENCE_WORKERS:-4}
+export YOLO_INFERENCE_THREADS_PER_WORKER=${YOLO_INFERENCE_THREADS_PER_WORKER:-0}
+
 # uvicorn 실행
 echo "** uvicorn 서버 실행 시작 **"
 uvicorn main:app --host 0.0.0.0 --port 8001
@@ -0,0 +1,276 @@
+# YOLOv5 🚀 by Ultralytics, AGPL-3.0 license
+"""
+Micro-benchmark the stages of the detection hot path on fixed synthetic and real note images.
+
+Stages: letterbox, preprocess (letterbox + tensor), forward (DetectMultiBackend on CPU, needs --weights), NMS,
+scale_boxes, reading order (reading_order vs the old sorted(det, key=itemgetter(1, 0))), save_one_box, crop_detections
+(crop + JPEG encode) and Annotator drawing. Each stage runs at several image sizes and detection counts and reports
+ops/sec, latency and Python-level allocations (tracemalloc: numpy/PIL buffers are traced, torch's CPU allocator is not).
+
+Usage:
+    $ python benchmark_detection.py                                          # all stages, default weights
+    $ python benchmark_detection.py --stages nms reading_order --counts 10 1000
+    $ python benchmark_detection.py --json runs/bench/after.json --compare runs/bench/before.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from operator import itemgetter
+from pathlib import Path
+
+import numpy as np
+import torch
+
+FILE = Path(__file__).resolve()
+ROOT = FILE.parents[0]  # YOLOv5 root directory
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))  # add ROOT to PATH
+
+from ultralytics.utils.plotting import Annotator, colors, save_one_box
+
+from detection import DEFAULT_WEIGHTS, DetectionResult, crop_detections, model_registry, reading_order
+from utils.augmentations import letterbox
+from utils.general import LOGGER, cv2, non_max_suppression, print_args, scale_boxes
+
+NOTE_IMAGE = ROOT.parent / "app/test/notes/testimage.png"
+STAGES = ("letterbox", "preprocess", "forward", "nms", "scale_boxes", "reading_order", "sorted_itemgetter",
+          "save_one_box", "crop_detections", "annotator")
+NAMES = {0: "circled_text", 1: "underlined_text"}
+
+
+def synthetic_image(h, w, seed=0):
+    """Returns a deterministic BGR 'note page': light paper with dark text-like strokes."""
+    rng = np.random.default_rng(seed)
+    im = np.full((h, w, 3), 235, np.uint8)
+    im += rng.integers(0, 12, (h, w, 1), dtype=np.uint8)  # paper grain
+    for y in range(40, h - 20, 36):  # text lines
+        x = 30
+        while x < w - 60:
+            word = int(rng.integers(20, 80))
+            cv2.rectangle(im, (x, y), (min(x + word, w - 30), y + 14), (40, 40, 40), -1)
+            x += word + int(rng.integers(8, 20))
+    return im
+
+
+def synthetic_det(n, shape, seed=0):
+    """Returns n deterministic [x1, y1, x2, y2, conf, cls] text-line boxes inside an image of `shape` (h, w)."""
+    g = torch.Generator().manual_seed(seed)
+    h, w = shape[:2]
+    x1 = torch.rand(n, generator=g) * w * 0.8
+    y1 = torch.rand(n, generator=g) * h * 0.95
+    x2 = (x1 + 40 + torch.rand(n, generator=g) * w * 0.2).clamp(max=w)
+    y2 = (y1 + 12 + torch.rand(n, generator=g) * 24).clamp(max=h)
+    conf = 0.3 + torch.rand(n, generator=g) * 0.7
+    cls = torch.randint(0, 2, (n,), generator=g).float()
+    return torch.stack((x1, y1, x2, y2, conf, cls), 1).round()
+
+
+def synthetic_pred(n, imgsz, nc=2, seed=0):
+    """Returns a raw (1, anchors, 5 + nc) prediction at `imgsz` where n candidates clear the confidence threshold."""
+    g = torch.Generator().manual_seed(seed)
+    anchors = 3 * sum((imgsz[0] // s) * (imgsz[1] // s) for s in (8, 16, 32))
+    pred = torch.rand(1, anchors, 5 + nc, generator=g)
+    pred[..., 0] *= imgsz[1]
+    pred[..., 1] *= imgsz[0]
+    pred[..., 2] = 20 + pred[..., 2] * 200
+    pred[..., 3] = 8 + pred[..., 3] * 30
+    pred[..., 4] *= 0.2  # below conf_thres
+    keep = torch.randperm(anchors, generator=g)[:n]
+    pred[0, keep, 4] = 0.5 + pred[0, keep, 4]
+    return pred
+
+
+def measure(fn, min_time=0.5, max_iters=10000, warmup=2):
+    """Times fn() until min_time has elapsed, then traces one extra call for allocations; returns a stats dict."""
+    for _ in range(warmup):
+        fn()
+    times = []
+    start = time.perf_counter()
+    while len(times) < max_iters and (time.perf_counter() - start) < min_time:
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    tracemalloc.start()
+    fn()
+    current, peak = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(stat.count for stat in snapshot.statistics("filename"))
+    times = np.array(times)
+    return {
+        "iters": len(times),
+        "ops_per_sec": float(len(times) / times.sum()),
+        "mean_ms": float(times.mean() * 1e3),
+        "median_ms": float(np.median(times) * 1e3),
+        "p95_ms": float(np.percentile(times, 95) * 1e3),
+        "peak_alloc_bytes": int(peak),
+        "retained_alloc_bytes": int(current),
+        "retained_alloc_blocks": int(blocks),
+    }
+
+
+def cases(sizes, note):
+    """Yields (case name, BGR image) for each synthetic size and the real note image."""
+    for size in sizes:
+        h, w = (size * 4 // 3, size)  # portrait page
+        yield f"synthetic_{w}x{h}", synthetic_image(h, w)
+    if note and Path(note).is_file():
+        im = cv2.imread(str(note))
+        yield f"note_{im.shape[1]}x{im.shape[0]}", im
+    elif note:
+        LOGGER.warning(f"WARNING ⚠️ note image {note} not found, skipping")
+
+
+def stage_benchmarks(stage, im0, counts, imgsz, model):
+    """Yields (params, fn) benchmarks for one stage on one image."""
+    stride = int(model.stride) if model is not None else 32
+    if stage == "letterbox":
+        yield {"auto": True}, lambda: letterbox(im0, imgsz, stride=stride, auto=True)
+        yield {"auto": False}, lambda: letterbox(im0, imgsz, stride=stride, auto=False)
+    elif stage == "preprocess":
+
+        def preprocess():
+            im = letterbox(im0, imgsz, stride=stride, auto=False)[0]
+            im = np.ascontiguousarray(im.transpose((2, 0, 1))[::-1])
+            return torch.from_numpy(im).float().div_(255)[None]
+
+        yield {}, preprocess
+    elif stage == "forward" and model is not None:
+        for bs in (1, 4):
+            im = torch.zeros(bs, 3, *imgsz, device=model.device)
+            im = im.half() if model.fp16 else im.float()
+            yield {"batch": bs}, lambda im=im: model(im)
+    elif stage == "nms":
+        for n in counts:
+            pred = synthetic_pred(n, imgsz)
+            yield {"candidates": n}, lambda pred=pred: non_max_suppression(pred.clone(), 0.25, 0.45, max_det=1000)
+    else:
+        for n in counts:
+            det = synthetic_det(n, im0.shape)
+            if stage == "scale_boxes":
+                boxes = det[:, :4] * min(imgsz) / max(im0.shape[:2])
+                yield {"detections": n}, lambda boxes=boxes: scale_boxes(imgsz, boxes.clone(), im0.shape)
+            elif stage == "reading_order":
+                yield {"detections": n}, lambda det=det: reading_order(det)
+            elif stage == "sorted_itemgetter":
+                yield {"detections": n}, lambda det=det: sorted(det, key=itemgetter(1, 0))
+            elif stage == "save_one_box":
+                yield {"detections": n}, lambda det=det: [save_one_box(xyxy, im0, BGR=True, save=False) for xyxy in det[:, :4].tolist()]
+            elif stage == "crop_detections":
+                result = DetectionResult(det, im0.shape, NAMES)
+                yield {"detections": n}, lambda result=result: crop_detections(im0, result, "bench")
+            elif stage == "annotator":
+
+                def annotate(det=det):
+                    annotator = Annotator(im0.copy(), line_width=3, example=str(NAMES))
+                    for *xyxy, conf, cls in det.tolist():
+                        annotator.box_label(xyxy, f"{NAMES[int(cls)]} {conf:.2f}", color=colors(int(cls), True))
+                    return annotator.result()
+
+                yield {"detections": n}, annotate
+
+
+def run(
+    weights=DEFAULT_WEIGHTS,  # model path, forward is skipped if it does not exist
+    imgsz=(640, 640),  # inference size (height, width)
+    stages=STAGES,  # stages to run
+    sizes=(640, 1280, 3024),  # synthetic page widths
+    counts=(10, 100, 1000),  # detection / NMS candidate counts
+    note=NOTE_IMAGE,  # real note image, '' to skip
+    min_time=0.5,  # seconds per benchmark
+    threads=0,  # torch threads, 0 for default
+    json_path="",  # write results to this JSON file
+    compare="",  # earlier JSON to compare against
+):
+    """Runs the selected stage benchmarks and returns the report dict."""
+    if threads:
+        torch.set_num_threads(threads)
+    model = None
+    if "forward" in stages:
+        if Path(weights).exists():
+            model, imgsz = model_registry.get(weights, device="cpu", imgsz=imgsz)
+        else:
+            LOGGER.warning(f"WARNING ⚠️ weights {weights} not found, skipping forward")
+
+    results = []
+    for case, im0 in cases(sizes, note):
+        for stage in stages:
+            for params, fn in stage_benchmarks(stage, im0, counts, imgsz, model):
+                stats = measure(fn, min_time=min_time)
+                results.append({"stage": stage, "case": case, "params": params, **stats})
+                LOGGER.info(
+                    f"{stage:<18}{case:<24}{json.dumps(params):<22}"
+                    f"{stats['ops_per_sec']:>12.1f} ops/s {stats['median_ms']:>10.3f} ms {stats['peak_alloc_bytes'] / 1e6:>9.2f} MB"
+                )
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "torch": torch.__version__,
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+            "torch_threads": torch.get_num_threads(),
+            "imgsz": list(imgsz),
+            "weights": str(weights) if model is not None else None,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    if json_path:
+        Path(json_path).parent.mkdir(parents=True, exist_ok=True)
+        Path(json_path).write_text(json.dumps(report, indent=2))
+        LOGGER.info(f"Results saved to {json_path}")
+    if compare:
+        compare_reports(json.loads(Path(compare).read_text()), report)
+    return report
+
+
+def compare_reports(before, after):
+    """Logs the ops/sec speedup and allocation change of `after` relative to `before` for matching benchmarks."""
+    key = itemgetter("stage", "case")
+    baseline = {(*key(r), json.dumps(r["params"], sort_keys=True)): r for r in before["results"]}
+    LOGGER.info(f"\n{'stage':<18}{'case':<24}{'params':<22}{'speedup':>9}{'alloc':>9}")
+    for r in after["results"]:
+        b = baseline.get((*key(r), json.dumps(r["params"], sort_keys=True)))
+        if b is None:
+            continue
+        speedup = r["ops_per_sec"] / b["ops_per_sec"]
+        alloc = r["peak_alloc_bytes"] / b["peak_alloc_bytes"] if b["peak_alloc_bytes"] else float("nan")
+        LOGGER.info(f"{r['stage']:<18}{r['case']:<24}{json.dumps(r['params']):<22}{speedup:>8.2f}x{alloc:>8.2f}x")
+
+
+def parse_opt():
+    """Parses command-line arguments for the detection hot-path benchmarks."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--weights", type=str, default=DEFAULT_WEIGHTS, help="model path, forward is skipped if missing")
+    parser.add_argument("--imgsz", "--img", "--img-size", nargs="+", type=int, default=[640], help="inference size h,w")
+    parser.add_argument("--stages", nargs="+", default=list(STAGES), choices=STAGES, help="stages to benchmark")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[640, 1280, 3024], help="synthetic page widths")
+    parser.add_argument("--counts", nargs="+", type=int, default=[10, 100, 1000], help="detection / NMS candidate counts")
+    parser.add_argument("--note", type=str, default=NOTE_IMAGE, help="real note image, '' to skip")
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds per benchmark")
+    parser.add_argument("--threads", type=int, default=0, help="torch threads, 0 for default")
+    parser.add_argument("--json", dest="json_path", type=str, default="", help="write results to this JSON file")
+    parser.add_argument("--compare", type=str, default="", help="earlier JSON results to compare against")
+    opt = parser.parse_args()
+    opt.imgsz *= 2 if len(opt.imgsz) == 1 else 1  # expand
+    print_args(vars(opt))
+    return opt
+
+
+def main(opt):
+    """Runs the benchmarks with parsed options."""
+    run(**vars(opt))
+
+
+if __name__ == "__main__":
+    opt = parse_opt()
+    main(opt)
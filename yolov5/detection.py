@@ -29,12 +29,18 @@ Usage - formats:
 """
 
 import argparse
+import contextlib
 import csv
 import os
 import platform
 import sys
+import threading
+import time
+from io import BytesIO
 
+import numpy as np
 import torch
+from PIL import Image, ImageOps
 
 # 윈도우에서만 실행할 코드 - PosixPath를 WindowsPath로 변경
 if os.name == 'nt':
@@ -46,11 +52,6 @@ else:
 #If you have linux (or deploying for linux) use:
     from pathlib import Path
 
-# 추가된 패키지 ========================================
-from operator import itemgetter
-#=====================================================
-
-
 FILE = Path(__file__).resolve()
 ROOT = FILE.parents[0]  # YOLOv5 root directory
 if str(ROOT) not in sys.path:
@@ -60,6 +61,7 @@ ROOT = Path(os.path.relpath(ROOT, Path.cwd()))  # relative
 from ultralytics.utils.plotting import Annotator, colors, save_one_box
 
 from models.common import DetectMultiBackend
+from utils.augmentations import letterbox
 from utils.dataloaders import IMG_FORMATS, VID_FORMATS, LoadImages, LoadScreenshots, LoadStreams
 from utils.general import (
     LOGGER,
@@ -79,10 +81,300 @@ from utils.general import (
 )
 from utils.torch_utils import select_device, smart_inference_mode
 
+# 노트 밑줄/동그라미 탐지 가중치 (서비스 기본값)
+DEFAULT_WEIGHTS = ROOT / "weights/underline+circle_yolov5m_10_07_best.pt"
+
+
+class ModelRegistry:
+    # 프로세스 내에 상주하는 모델 저장소. (weights, device, fp16, imgsz, dnn, data, 런타임 설정) 조합마다 한 번만 로드/퓨즈/워밍업한다
+    def __init__(self):
+        """Initializes an empty registry guarded by a lock so concurrent requests never load the same model twice."""
+        self.models = {}  # key -> (model, imgsz)
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(weights=DEFAULT_WEIGHTS, device="", half=False, imgsz=(640, 640), backend_options=None, dnn=False, data=None):
+        """Returns the registry key for a model configuration; weights (a path or a list of paths) and data are resolved
+        so relative paths match."""
+        weights = tuple(str(Path(w).resolve()) for w in (weights if isinstance(weights, (list, tuple)) else [weights]))
+        imgsz = (imgsz, imgsz) if isinstance(imgsz, int) else tuple(imgsz)
+        options = tuple(sorted((backend_options or {}).items()))
+        data = str(Path(data).resolve()) if data else None
+        return weights, str(device).strip().lower(), bool(half), imgsz, options, bool(dnn), data
+
+    def get(
+        self, weights=DEFAULT_WEIGHTS, device="", half=False, imgsz=(640, 640), dnn=False, data=None, backend_options=None, warmup=True
+    ):
+        """
+        Returns a resident (model, imgsz) pair, loading, fusing and warming the model on first use.
+
+        `backend_options` are runtime settings for exported weights: ORTSession options for *.onnx, OVSession options
+        for OpenVINO. `warmup=False` skips the warmup forward pass, i.e. in a parent process that forks inference workers.
+        """
+        key = self.key(weights, device, half, imgsz, backend_options, dnn, data)
+        entry = self.models.get(key)
+        if entry is None:
+            with self.lock:
+                entry = self.models.get(key)
+                if entry is None:
+                    entry = self.models[key] = self._load(weights, device, half, imgsz, dnn, data, backend_options, warmup)
+        return entry
+
+    def loaded(self):
+        """Returns the keys of all resident models."""
+        return list(self.models)
+
+    def clear(self):
+        """Drops every resident model, e.g. before reloading updated weights."""
+        with self.lock:
+            self.models.clear()
+
+    def share_memory(self):
+        """Moves resident PyTorch weights into shared memory so forked inference workers map one copy instead of N."""
+        for model, _ in self.models.values():
+            if model.pt:
+                model.share_memory()
+
+    def warmup(self):
+        """Runs one warmup forward pass of every resident model, i.e. in each forked worker after a warmup=False load."""
+        for model, imgsz in self.models.values():
+            self._warmup(model, imgsz)
+
+    @staticmethod
+    @smart_inference_mode()
+    def _load(weights, device, half, imgsz, dnn, data, backend_options=None, warmup=True):
+        """Loads and fuses a DetectMultiBackend, checks imgsz against its stride and runs one warmup forward pass."""
+        t = time.time()
+        device = select_device(device)
+        model = DetectMultiBackend(
+            weights, device=device, dnn=dnn, data=data, fp16=half, backend_options=backend_options
+        )  # fuse=True by default
+        imgsz = check_img_size(list(imgsz) if not isinstance(imgsz, int) else imgsz, s=model.stride)
+        imgsz = (imgsz, imgsz) if isinstance(imgsz, int) else tuple(imgsz)
+        if warmup:
+            ModelRegistry._warmup(model, imgsz)
+        LOGGER.info(f"Model registry: loaded {weights} on {device} (fp16={model.fp16}, imgsz={imgsz}) in {time.time() - t:.2f}s")
+        return model, imgsz
+
+    @staticmethod
+    @smart_inference_mode()
+    def _warmup(model, imgsz):
+        """Runs one forward pass on a zero image to allocate kernels and buffers before the first request."""
+        # DetectMultiBackend.warmup()은 CPU에서 건너뛰므로 직접 한 번 추론해 커널/메모리 할당을 미리 수행
+        im = torch.zeros(1, 3, *imgsz, dtype=torch.half if model.fp16 else torch.float, device=model.device)
+        model(im)
+
+
+model_registry = ModelRegistry()  # 프로세스 전역 모델 저장소
+
+
+def load_model(weights=DEFAULT_WEIGHTS, device="", half=False, imgsz=(640, 640), backend_options=None, warmup=True):
+    """Returns the resident (model, imgsz) pair for a configuration; a picklable entry point for worker processes."""
+    return model_registry.get(weights, device=device, half=half, imgsz=imgsz, backend_options=backend_options, warmup=warmup)
+
+
+class DetectionResult:
+    # 한 이미지의 탐지 결과. 박스는 원본 이미지 기준 절대 좌표(xyxy)이며 읽기 순서(상하좌우)로 정렬됨
+    def __init__(self, det, shape, names, timings=None):
+        """Initializes with an (n, 6) [x1, y1, x2, y2, conf, cls] tensor, the source image (h, w), class names and the
+        {stage: seconds} timings of the batch it came from."""
+        self.det = det.cpu()
+        self.shape = tuple(shape[:2])
+        self.names = names
+        self.timings = timings or {}
+
+    def __len__(self):
+        """Returns the number of detections."""
+        return len(self.det)
+
+    def __iter__(self):
+        """Yields (xyxy, conf, cls) per detection in reading order."""
+        for *xyxy, conf, cls in self.det.tolist():
+            yield xyxy, conf, int(cls)
+
+
+def decode_image(image):
+    """Decodes raw upload bytes to a BGR ndarray (as cv2.imread would); ndarrays are passed through unchanged."""
+    if isinstance(image, IngestedImage):
+        return image.full()
+    if isinstance(image, np.ndarray):
+        return image
+    im0 = cv2.imdecode(np.frombuffer(image, np.uint8), cv2.IMREAD_COLOR)
+    if im0 is None:
+        raise ValueError("could not decode image bytes")
+    return im0
+
+
+class IngestedImage:
+    # 업로드 이미지를 탐지용 축소 해상도로 한 번만 디코딩해 보관. 원본 해상도는 크롭을 잘라낼 때만 디코딩
+    #   JPEG은 DCT 단계에서 1/2, 1/4, 1/8로 축소 디코딩(PIL draft)하므로 12~48MP 사진도 디코딩 시간/메모리가 크게 줄어듦
+    #   EXIF 회전은 디코딩 시 한 번만 적용
+    def __init__(self, image, max_side=1280):
+        """Decodes `image` (bytes or BGR ndarray) so its longest side is at least `max_side` when JPEG scaling allows."""
+        if isinstance(image, np.ndarray):
+            self.data, self._full, self.reduced = None, image, image
+            self.shape = image.shape[:2]
+            return
+        self.data = bytes(image)
+        self._full = None
+        with self.open() as im, self.decoding():
+            w, h = im.size
+            orientation = im.getexif().get(0x0112, 1)  # EXIF orientation
+            scale = max_side / max(w, h)
+            if scale < 1:
+                im.draft("RGB", (max(1, round(w * scale)), max(1, round(h * scale))))  # JPEG DCT 축소 (JPEG 외에는 무시)
+            self.reduced = self.to_bgr(im)
+        self.shape = (w, h) if orientation in (5, 6, 7, 8) else (h, w)  # 원본 (h, w), 90도 회전이면 교환
+        if self.reduced.shape[:2] == self.shape:  # 축소되지 않았으면 그대로 원본으로 사용
+            self._full = self.reduced
+
+    def open(self):
+        """Opens the upload bytes with PIL, raising ValueError for undecodable data."""
+        try:
+            return Image.open(BytesIO(self.data))
+        except Exception as e:
+            raise ValueError(f"could not decode image bytes: {e}") from e
+
+    @staticmethod
+    @contextlib.contextmanager
+    def decoding():
+        """Re-raises errors of the lazy PIL load (i.e. 'image file is truncated' for a cut-off JPEG) as ValueError."""
+        try:
+            yield
+        except (OSError, SyntaxError) as e:  # 헤더는 정상이고 픽셀 데이터가 깨진 업로드
+            raise ValueError(f"could not decode image bytes: {e}") from e
+
+    @staticmethod
+    def to_bgr(im):
+        """Loads a PIL image, applies its EXIF orientation and returns a contiguous BGR ndarray."""
+        im = ImageOps.exif_transpose(im).convert("RGB")
+        return np.ascontiguousarray(np.asarray(im)[..., ::-1])
+
+    @property
+    def gain(self):
+        """Returns the (x, y) factors that map reduced-image coordinates to full-resolution coordinates."""
+        return self.shape[1] / self.reduced.shape[1], self.shape[0] / self.reduced.shape[0]
+
+    def full(self):
+        """Returns the full-resolution BGR image, decoding it on first use."""
+        if self._full is None:
+            assert self.data is not None, "full-resolution image is only available in the process that ingested it"
+            with self.open() as im, self.decoding():
+                self._full = self.to_bgr(im)
+        return self._full
+
+    def __getstate__(self):
+        """Sends only the reduced image and the original shape to a worker process; full-resolution decoding and
+        cropping stay in the process that ingested the upload."""
+        state = self.__dict__.copy()
+        state["data"] = None  # 업로드 바이트는 보내지 않음
+        if self._full is not self.reduced:
+            state["_full"] = None
+        return state
+
+
+def ingest_image(image, max_side=1280):
+    """Returns `image` as an IngestedImage (bytes are decoded at reduced resolution, ndarrays are wrapped as-is)."""
+    return image if isinstance(image, IngestedImage) else IngestedImage(image, max_side=max_side)
+
+
+def reading_order(det):
+    """Sorts detections top-to-bottom then left-to-right, like sorted(det, key=itemgetter(1, 0))."""
+    det = det[det[:, 0].argsort(stable=True)]
+    return det[det[:, 1].argsort(stable=True)]
+
+
+@smart_inference_mode()
+def detect_batch(
+    images,  # list of upload bytes, BGR ndarrays or IngestedImages
+    weights=DEFAULT_WEIGHTS,  # model path
+    imgsz=(640, 640),  # inference size (height, width)
+    conf_thres=0.25,  # confidence threshold, or one threshold per image
+    iou_thres=0.45,  # NMS IOU threshold
+    max_det=1000,  # maximum detections per image
+    device="",  # cuda device, i.e. 0 or 0,1,2,3 or cpu
+    classes=None,  # filter by class
+    agnostic_nms=False,  # class-agnostic NMS
+    half=False,  # use FP16 half-precision inference
+    backend_options=None,  # runtime settings for exported weights (ORTSession / OVSession options)
+):
+    """
+    Runs one batched forward pass and one batched NMS over in-memory images, returning a DetectionResult per image.
+
+    Images are letterboxed to a shared shape (the full imgsz when batching, the minimum rectangle for a single image).
+    Per-image thresholds are applied after NMS at the lowest threshold, which keeps the same boxes since a lower-scored
+    box never suppresses a higher-scored one. Inference runs on each image's reduced decode and boxes are mapped back
+    to full-resolution coordinates.
+    """
+    ims = [ingest_image(x) for x in images]
+    ims0 = [x.reduced for x in ims]
+    confs = list(conf_thres) if isinstance(conf_thres, (list, tuple)) else [conf_thres] * len(ims0)
+    model, imgsz = model_registry.get(weights, device=device, half=half, imgsz=imgsz, backend_options=backend_options)
+
+    dt = (Profile(device=model.device), Profile(device=model.device), Profile(device=model.device))
+    with dt[0]:
+        auto = model.pt and len(ims0) == 1  # 배치는 공통 크기로 letterbox
+        im = np.stack([letterbox(x, imgsz, stride=model.stride, auto=auto)[0] for x in ims0])  # padded resize
+        im = np.ascontiguousarray(im.transpose((0, 3, 1, 2))[:, ::-1])  # BHWC to BCHW, BGR to RGB
+        im = torch.from_numpy(im).to(model.device)
+        im = im.half() if model.fp16 else im.float()  # uint8 to fp16/32
+        im /= 255  # 0 - 255 to 0.0 - 1.0
+
+    with dt[1]:
+        # OpenVINO은 OVSession이 배치를 여러 비동기 추론 요청으로 나눠 실행
+        if model.onnx and not model.session.dynamic_batch and im.shape[0] > 1:  # static-batch ONNX (no --dynamic-batch)
+            # clone: IOBinding 세션은 같은 입력 크기의 출력 버퍼를 재사용하므로 다음 실행 전에 복사
+            pred = torch.cat([model(x).clone() for x in torch.chunk(im, im.shape[0], 0)], 0)
+        else:
+            pred = model(im)
+    with dt[2]:
+        pred = non_max_suppression(pred, min(confs), iou_thres, classes, agnostic_nms, max_det=max_det)
+    timings = {"preprocess": dt[0].t, "inference": dt[1].t, "nms": dt[2].t}
+
+    results = []
+    for det, x, conf in zip(pred, ims, confs):
+        det = det[det[:, 4] >= conf]
+        if len(det):
+            det[:, :4] = scale_boxes(im.shape[2:], det[:, :4], x.reduced.shape)
+            if x.reduced.shape[:2] != x.shape:  # 축소 디코딩 좌표 -> 원본 해상도 좌표
+                gx, gy = x.gain
+                det[:, [0, 2]] = (det[:, [0, 2]] * gx).clamp_(0, x.shape[1])
+                det[:, [1, 3]] = (det[:, [1, 3]] * gy).clamp_(0, x.shape[0])
+            det[:, :4] = det[:, :4].round()
+            det = reading_order(det)
+        results.append(DetectionResult(det, x.shape, model.names, timings))
+    return results
+
+
+def detect_image(image, **kwargs):
+    """Runs the resident model on a single in-memory image and returns a DetectionResult, touching no files."""
+    return detect_batch([image], **kwargs)[0]
+
+
+def crop_detections(image, result, file_id):
+    """
+    Cuts every detection out of `image` as an in-memory JPEG, grouped by class name.
+
+    Returns {class_name: [(file_name, jpeg_bytes), ...]} with the same names save_one_box would have written
+    (file_id.jpg, file_id2.jpg, ...), so OCR results keep their keys. Crops are always cut at full resolution; an
+    IngestedImage is only decoded at full resolution when there is something to crop.
+    """
+    if not len(result):
+        return {}
+    im0 = decode_image(image)
+    crops = {}
+    for xyxy, conf, c in result:
+        files = crops.setdefault(result.names[c], [])
+        crop = save_one_box(torch.tensor(xyxy), im0, BGR=True, save=False)
+        buffer = BytesIO()
+        Image.fromarray(crop[..., ::-1]).save(buffer, format="JPEG", quality=95, subsampling=0)  # save RGB
+        files.append((f"{file_id}{len(files) + 1 if files else ''}.jpg", buffer.getvalue()))
+    return crops
+
 
 @smart_inference_mode()
 def run(
-    weights=ROOT / "yolov5s.pt",  # model path or triton URL
+    weights=DEFAULT_WEIGHTS,  # model path or triton URL
     source=ROOT / "data/images",  # file/dir/URL/glob/screen/0(webcam)
     data=ROOT / "data/coco128.yaml",  # dataset.yaml path
     imgsz=(640, 640),  # inference size (height, width)
@@ -111,13 +403,12 @@ def run(
     dnn=False,  # use OpenCV DNN for ONNX inference
     vid_stride=1,  # video frame-rate stride
     file_id="test_file_id",  # File ID
+    backend_options=None,  # runtime settings for exported weights (ORTSession / OVSession options)
 ):
     
     
     ####################################
     
-    weights = ROOT / "weights/underline+circle_yolov5m_10_07_best.pt"
-    
     nosave = False # 결과 이미지 저장
     name = file_id
     
@@ -139,11 +430,10 @@ def run(
         source = check_file(source)  # download
 
 
-    # Load model
-    device = select_device(device)
-    model = DetectMultiBackend(weights, device=device, dnn=dnn, data=data, fp16=half)
+    # Load model (레지스트리에 상주하는 모델 재사용)
+    model, imgsz = model_registry.get(weights, device=device, half=half, imgsz=imgsz, dnn=dnn, data=data, backend_options=backend_options)
+    device = model.device
     stride, names, pt = model.stride, model.names, model.pt
-    imgsz = check_img_size(imgsz, s=stride)  # check image size
 
     # Dataloader
     bs = 1  # batch_size
@@ -157,9 +447,9 @@ def run(
         dataset = LoadImages(source, img_size=imgsz, stride=stride, auto=pt, vid_stride=vid_stride)
     vid_path, vid_writer = [None] * bs, [None] * bs
 
-    # Run inference
-    model.warmup(imgsz=(1 if pt or model.triton else bs, 3, *imgsz))  # warmup
+    # Run inference (워밍업은 레지스트리 로드 시 수행됨)
     seen, windows, dt = 0, [], (Profile(device=device), Profile(device=device), Profile(device=device))
+    results = []  # 이미지별 DetectionResult
     for path, im, im0s, vid_cap, s in dataset:
         with dt[0]:
             im = torch.from_numpy(im).to(model.device)
@@ -167,22 +457,11 @@ def run(
             im /= 255  # 0 - 255 to 0.0 - 1.0
             if len(im.shape) == 3:
                 im = im[None]  # expand for batch dim
-            if model.xml and im.shape[0] > 1:
-                ims = torch.chunk(im, im.shape[0], 0)
 
         # Inference
         with dt[1]:
             visualize = increment_path(save_dir / Path(path).stem, mkdir=True) if visualize else False
-            if model.xml and im.shape[0] > 1:
-                pred = None
-                for image in ims:
-                    if pred is None:
-                        pred = model(image, augment=augment, visualize=visualize).unsqueeze(0)
-                    else:
-                        pred = torch.cat((pred, model(image, augment=augment, visualize=visualize).unsqueeze(0)), dim=0)
-                pred = [pred, None]
-            else:
-                pred = model(im, augment=augment, visualize=visualize)
+            pred = model(im, augment=augment, visualize=visualize)  # OpenVINO batches run as async infer requests
         # NMS
         with dt[2]:
             pred = non_max_suppression(pred, conf_thres, iou_thres, classes, agnostic_nms, max_det=max_det)
@@ -232,10 +511,10 @@ def run(
                     s += f"{n} {names[int(c)]}{'s' * (n > 1)}, "  # add to string
 
                 # 정렬된 det
-                det_sorted = sorted(det, key=itemgetter(1, 0)) # 상하좌우 순으로 정렬(글을 읽듯이)
+                det = reading_order(det)  # 상하좌우 순으로 정렬(글을 읽듯이)
                 
                 # Write results
-                for *xyxy, conf, cls in det_sorted:
+                for *xyxy, conf, cls in det:
                     c = int(cls)  # integer class
                     label = names[c] if hide_conf else f"{names[c]}"
                     confidence = float(conf)
@@ -259,6 +538,8 @@ def run(
                         # crop/label_name/file_id,2,3... .jpg
                         save_one_box(xyxy, imc, file=save_dir / "crops" / names[c] / f"{file_id}.jpg", BGR=True)
 
+            results.append(DetectionResult(det, im0.shape, names))
+
             # Stream results
             im0 = annotator.result()
             if view_img:
@@ -298,13 +579,14 @@ def run(
         s = f"\n{len(list(save_dir.glob('labels/*.txt')))} labels saved to {save_dir / 'labels'}" if save_txt else ""
         LOGGER.info(f"Results saved to {colorstr('bold', save_dir)}{s}")
     if update:
-        strip_optimizer(weights[0])  # update model (to fix SourceChangeWarning)
+        strip_optimizer(weights[0] if isinstance(weights, (list, tuple)) else weights)  # update model (to fix SourceChangeWarning)
+    return results
 
 
 def parse_opt():
     """Parses command-line arguments for YOLOv5 detection, setting inference options and model configurations."""
     parser = argparse.ArgumentParser()
-    parser.add_argument("--weights", nargs="+", type=str, default=ROOT / "yolov5s.pt", help="model path or triton URL")
+    parser.add_argument("--weights", nargs="+", type=str, default=DEFAULT_WEIGHTS, help="model path or triton URL")
     parser.add_argument("--source", type=str, default=ROOT / "data/images", help="file/dir/URL/glob/screen/0(webcam)")
     parser.add_argument("--data", type=str, default=ROOT / "data/coco128.yaml", help="(optional) dataset.yaml path")
     parser.add_argument("--imgsz", "--img", "--img-size", nargs="+", type=int, default=[640], help="inference size h,w")
@@ -23,6 +23,7 @@ Requirements:
 
 Usage:
     $ python export.py --weights yolov5s.pt --include torchscript onnx openvino engine coreml tflite ...
+    $ python export.py --weights weights/underline+circle_yolov5m_10_07_best.pt --include onnx --dynamic-batch  # ORT serving
 
 Inference:
     $ python detect.py --weights yolov5s.pt                 # PyTorch
@@ -166,8 +167,10 @@ def export_torchscript(model, im, file, optimize, prefix=colorstr("TorchScript:"
 
 
 @try_export
-def export_onnx(model, im, file, opset, dynamic, simplify, prefix=colorstr("ONNX:")):
-    """Exports a YOLOv5 model to ONNX format with dynamic axes and optional simplification."""
+def export_onnx(model, im, file, opset, dynamic, simplify, dynamic_batch=False, prefix=colorstr("ONNX:")):
+    """Exports a YOLOv5 model to ONNX format with dynamic axes (or a dynamic batch axis only) and optional
+    simplification.
+    """
     check_requirements("onnx>=1.12.0")
     import onnx
 
@@ -182,6 +185,8 @@ def export_onnx(model, im, file, opset, dynamic, simplify, prefix=colorstr("ONNX
             dynamic["output1"] = {0: "batch", 2: "mask_height", 3: "mask_width"}  # shape(1,32,160,160)
         elif isinstance(model, DetectionModel):
             dynamic["output0"] = {0: "batch", 1: "anchors"}  # shape(1,25200,85)
+    elif dynamic_batch:  # batch only, fixed image size keeps static shapes for graph optimization
+        dynamic = {"images": {0: "batch"}, **{name: {0: "batch"} for name in output_names}}
 
     torch.onnx.export(
         model.cpu() if dynamic else model,  # --dynamic only compatible with cpu
@@ -767,6 +772,7 @@ def run(
     int8=False,  # CoreML/TF INT8 quantization
     per_tensor=False,  # TF per tensor quantization
     dynamic=False,  # ONNX/TF/TensorRT: dynamic axes
+    dynamic_batch=False,  # ONNX: dynamic batch axis only
     simplify=False,  # ONNX: simplify model
     opset=12,  # ONNX: opset version
     verbose=False,  # TensorRT: verbose log
@@ -791,6 +797,7 @@ def run(
     if half:
         assert device.type != "cpu" or coreml, "--half only compatible with GPU export, i.e. use --device 0"
         assert not dynamic, "--half not compatible with --dynamic, i.e. use either --half or --dynamic but not both"
+        assert not dynamic_batch, "--half not compatible with --dynamic-batch"
     model = attempt_load(weights, device=device, inplace=True, fuse=True)  # load FP32 model
 
     # Checks
@@ -827,7 +834,7 @@ def run(
     if engine:  # TensorRT required before ONNX
         f[1], _ = export_engine(model, im, file, half, dynamic, simplify, workspace, verbose)
     if onnx or xml:  # OpenVINO requires ONNX
-        f[2], _ = export_onnx(model, im, file, opset, dynamic, simplify)
+        f[2], _ = export_onnx(model, im, file, opset, dynamic, simplify, dynamic_batch)
     if xml:  # OpenVINO
         f[3], _ = export_openvino(file, metadata, half, int8, data)
     if coreml:  # CoreML
@@ -904,6 +911,7 @@ def parse_opt(known=False):
     parser.add_argument("--int8", action="store_true", help="CoreML/TF/OpenVINO INT8 quantization")
     parser.add_argument("--per-tensor", action="store_true", help="TF per-tensor quantization")
     parser.add_argument("--dynamic", action="store_true", help="ONNX/TF/TensorRT: dynamic axes")
+    parser.add_argument("--dynamic-batch", action="store_true", help="ONNX: dynamic batch axis only")
     parser.add_argument("--simplify", action="store_true", help="ONNX: simplify model")
     parser.add_argument("--opset", type=int, default=17, help="ONNX: opset version")
     parser.add_argument("--verbose", action="store_true", help="TensorRT: verbose log")
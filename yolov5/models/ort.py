@@ -0,0 +1,95 @@
+# YOLOv5 🚀 by Ultralytics, AGPL-3.0 license
+"""ONNX Runtime serving session for DetectMultiBackend: tuned session options and IOBinding with reused outputs."""
+
+import threading
+
+import numpy as np
+import torch
+
+from utils.general import LOGGER
+
+GRAPH_OPTIMIZATION_LEVELS = ("disable", "basic", "extended", "all")
+
+
+class ORTSession:
+    # ONNX Runtime 세션 래퍼 - 스레드/그래프 최적화/메모리 설정을 노출하고, IOBinding으로 입력은 복사 없이 바인딩하며
+    # 출력은 (스레드, 입력 shape)별로 미리 할당한 버퍼에 바로 쓰게 해서 요청마다 출력 배열을 새로 만들지 않음
+    def __init__(
+        self,
+        w,
+        cuda=False,
+        intra_op_threads=0,  # 0: ORT default (physical cores)
+        inter_op_threads=0,  # only used with execution_mode='parallel'
+        execution_mode="sequential",  # 'sequential' or 'parallel'
+        graph_optimization="all",  # 'disable', 'basic', 'extended' or 'all'
+        enable_mem_pattern=True,  # reuse planned allocations across runs with the same input shape
+        enable_cpu_mem_arena=True,  # keep freed CPU memory in ORT's arena
+        io_binding=True,  # bind input/output buffers instead of session.run copies
+        optimized_model_path="",  # save the optimized graph here (loads faster next time)
+    ):
+        """Creates an InferenceSession for `w` with the given CPU tuning options."""
+        import onnxruntime
+
+        assert graph_optimization in GRAPH_OPTIMIZATION_LEVELS, f"graph_optimization must be one of {GRAPH_OPTIMIZATION_LEVELS}"
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = int(intra_op_threads)
+        options.inter_op_num_threads = int(inter_op_threads)
+        options.execution_mode = (
+            onnxruntime.ExecutionMode.ORT_PARALLEL if execution_mode == "parallel" else onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+        )
+        options.graph_optimization_level = {
+            "disable": onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL,
+            "basic": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+            "extended": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+            "all": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL,
+        }[graph_optimization]
+        options.enable_mem_pattern = bool(enable_mem_pattern)
+        options.enable_cpu_mem_arena = bool(enable_cpu_mem_arena)
+        if optimized_model_path:
+            options.optimized_model_filepath = str(optimized_model_path)
+
+        providers = ["CUDAExecutionProvider", "CPUExecutionProvider"] if cuda else ["CPUExecutionProvider"]
+        self.session = onnxruntime.InferenceSession(w, sess_options=options, providers=providers)
+        self.input = self.session.get_inputs()[0]
+        self.output_names = [x.name for x in self.session.get_outputs()]
+        self.metadata = self.session.get_modelmeta().custom_metadata_map
+        self.dynamic_batch = not isinstance(self.input.shape[0], int)  # symbolic ('batch') or None
+        self.io_binding = io_binding
+        self.local = threading.local()  # per-thread IOBinding and output buffers
+        LOGGER.info(
+            f"ONNX Runtime {onnxruntime.__version__}: threads={options.intra_op_num_threads}/{options.inter_op_num_threads}, "
+            f"mode={execution_mode}, graph_optimization={graph_optimization}, mem_pattern={enable_mem_pattern}, "
+            f"cpu_mem_arena={enable_cpu_mem_arena}, io_binding={io_binding}, dynamic_batch={self.dynamic_batch}"
+        )
+
+    def __call__(self, im):
+        """Runs a BCHW float tensor or array and returns the outputs as numpy arrays.
+
+        With IOBinding the returned arrays are this thread's reusable buffers for the input shape: they stay valid until
+        the same thread runs the same shape again, so consume (e.g. NMS) or copy them before the next call.
+        """
+        im = im.cpu().numpy() if isinstance(im, torch.Tensor) else im  # CPU tensors share memory, no copy
+        im = np.ascontiguousarray(im, dtype=np.float32)
+        if not self.io_binding:
+            return self.session.run(self.output_names, {self.input.name: im})
+
+        binding, outputs = self.buffers(im.shape)
+        binding.bind_cpu_input(self.input.name, im)
+        self.session.run_with_iobinding(binding)
+        return outputs
+
+    def buffers(self, shape):
+        """Returns this thread's (IOBinding, output arrays) for an input shape, allocating them on first use."""
+        cache = getattr(self.local, "cache", None)
+        if cache is None:
+            cache = self.local.cache = {}
+        entry = cache.get(shape)
+        if entry is None:
+            # 출력 shape을 알기 위해 한 번 일반 실행한 뒤, 같은 크기의 버퍼를 만들어 출력으로 바인딩
+            probe = self.session.run(self.output_names, {self.input.name: np.zeros(shape, np.float32)})
+            outputs = [np.empty(x.shape, x.dtype) for x in probe]
+            binding = self.session.io_binding()
+            for name, out in zip(self.output_names, outputs):
+                binding.bind_output(name, "cpu", 0, out.dtype, out.shape, out.ctypes.data)
+            entry = cache[shape] = (binding, outputs)
+        return entry
@@ -0,0 +1,97 @@
+# YOLOv5 🚀 by Ultralytics, AGPL-3.0 license
+"""OpenVINO serving session for DetectMultiBackend: throughput-hinted compile and an AsyncInferQueue of infer requests."""
+
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+
+import numpy as np
+import torch
+
+from utils.general import LOGGER
+
+PERFORMANCE_HINTS = ("THROUGHPUT", "LATENCY", "CUMULATIVE_THROUGHPUT")
+
+
+class OVSession:
+    # OpenVINO 세션 래퍼 - THROUGHPUT 힌트로 여러 추론 스트림을 만들고 AsyncInferQueue의 추론 요청 여러 개에
+    # 배치를 나눠 동시에 실행함. 결과는 완료 콜백으로 받으므로 여러 스레드의 요청이 한 CPU 소켓에서 함께 진행됨
+    def __init__(
+        self,
+        w,
+        device="AUTO",  # OpenVINO device name, i.e. CPU, GPU or AUTO
+        performance_hint="THROUGHPUT",  # 'THROUGHPUT', 'LATENCY' or 'CUMULATIVE_THROUGHPUT'
+        num_requests=0,  # infer requests in the queue (0: device optimal for the hint)
+        num_streams="",  # CPU inference streams (empty: chosen by the hint)
+        num_threads=0,  # CPU inference threads shared by all streams (0: all cores)
+        dynamic_batch=True,  # reshape a static batch-1 model to a dynamic batch axis
+    ):
+        """Reads `w` (*.xml or *_openvino_model dir), compiles it with the given hint and creates the request queue."""
+        from openvino.runtime import AsyncInferQueue, Core, Layout, get_batch, set_batch
+
+        assert performance_hint in PERFORMANCE_HINTS, f"performance_hint must be one of {PERFORMANCE_HINTS}"
+        core = Core()
+        if not Path(w).is_file():  # if not *.xml
+            w = next(Path(w).glob("*.xml"))  # get *.xml file from *_openvino_model dir
+        self.w = w  # resolved *.xml path
+        ov_model = core.read_model(model=w, weights=Path(w).with_suffix(".bin"))
+        if ov_model.get_parameters()[0].get_layout().empty:
+            ov_model.get_parameters()[0].set_layout(Layout("NCHW"))
+        if dynamic_batch and get_batch(ov_model).is_static:
+            set_batch(ov_model, -1)
+        batch_dim = get_batch(ov_model)
+        self.batch_size = batch_dim.get_length() if batch_dim.is_static else None  # None: dynamic batch
+        self.dynamic_batch = self.batch_size is None
+
+        config = {"PERFORMANCE_HINT": performance_hint}
+        if num_requests:
+            config["PERFORMANCE_HINT_NUM_REQUESTS"] = str(int(num_requests))
+        if num_streams:
+            config["NUM_STREAMS"] = str(num_streams)
+        if num_threads:
+            config["INFERENCE_NUM_THREADS"] = str(int(num_threads))
+        self.compiled_model = core.compile_model(ov_model, device_name=device, config=config)
+        self.num_requests = int(num_requests) or self.compiled_model.get_property("OPTIMAL_NUMBER_OF_INFER_REQUESTS")
+        self.queue = AsyncInferQueue(self.compiled_model, self.num_requests)
+        self.queue.set_callback(self.completed)
+        self.lock = threading.Lock()  # start_async는 빈 요청이 생길 때까지 블로킹 - 제출 순서만 직렬화
+        LOGGER.info(
+            f"OpenVINO: device={device}, hint={performance_hint}, requests={self.num_requests}, "
+            f"streams={num_streams or 'auto'}, threads={num_threads or 'auto'}, dynamic_batch={self.dynamic_batch}"
+        )
+
+    @staticmethod
+    def completed(request, userdata):
+        """AsyncInferQueue callback: copies the outputs out of the request (it is reused) and hands them to userdata."""
+        callback, arg = userdata
+        try:
+            outputs = [request.get_output_tensor(i).data.copy() for i in range(len(request.model_outputs))]
+        except Exception as e:  # 콜백 밖으로 예외가 전달되지 않으므로 결과 대신 넘김
+            outputs = e
+        callback(outputs, arg)
+
+    def submit(self, im, callback, arg=None):
+        """
+        Queues a BCHW float tensor or array and returns immediately; `callback(outputs, arg)` is called from an
+        OpenVINO thread with the output arrays (or the exception) once the request completes.
+        """
+        im = im.cpu().numpy() if isinstance(im, torch.Tensor) else im
+        with self.lock:
+            self.queue.start_async({0: np.ascontiguousarray(im, dtype=np.float32)}, (callback, arg))
+
+    def chunks(self, im):
+        """Splits a batch into the inputs of separate infer requests: single images for a static batch-1 model,
+        otherwise up to one chunk per request so every stream gets work."""
+        n = len(im) if not self.dynamic_batch else min(len(im), self.num_requests)
+        return np.array_split(im, n) if n > 1 else [im]
+
+    def __call__(self, im):
+        """Runs a BCHW batch across the infer requests in parallel and returns the outputs as numpy arrays."""
+        im = im.cpu().numpy() if isinstance(im, torch.Tensor) else im
+        futures = []
+        for x in self.chunks(im):
+            future = Future()
+            futures.append(future)
+            self.submit(x, lambda y, f: f.set_exception(y) if isinstance(y, Exception) else f.set_result(y), future)
+        results = [f.result() for f in futures]
+        return [np.concatenate(y, 0) if len(y) > 1 else y[0] for y in zip(*results)]
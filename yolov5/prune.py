@@ -0,0 +1,289 @@
+# YOLOv5 🚀 by Ultralytics, AGPL-3.0 license
+"""
+Structured channel pruning of YOLOv5 detection weights.
+
+Unlike utils.torch_utils.prune (unstructured L1, zeros stay in dense tensors), whole channels are removed, so the
+pruned model has smaller convolutions and runs faster on CPU. Channels are ranked by BatchNorm |gamma| (network
+slimming) or filter L1 norm and removed from:
+    - Conv, C3.cv3 and SPPF.cv2 layer outputs, sliced through Upsample/Concat into every consumer (incl. Detect)
+    - C3.cv2 and the C3.cv1 -> Bottleneck chain (residual adds share one channel set)
+    - Bottleneck.cv1 and SPPF.cv1 hidden channels
+Detect outputs, the image input and layers of unsupported types (and their inputs) keep all channels.
+
+The pruned model is saved as a regular checkpoint that train.py fine-tunes as-is (it is not rebuilt from the yaml).
+
+Usage:
+    $ python prune.py --weights weights/underline+circle_yolov5m_10_07_best.pt --ratio 0.3
+    $ python prune.py --weights ... --ratio 0.3 --data notes.yaml --epochs 30  # prune, then fine-tune with train.py
+    $ python train.py --weights runs/prune/exp/weights/pruned.pt --data notes.yaml --epochs 30  # fine-tune later
+"""
+
+import argparse
+import os
+import sys
+import time
+from copy import deepcopy
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+FILE = Path(__file__).resolve()
+ROOT = FILE.parents[0]  # YOLOv5 root directory
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))  # add ROOT to PATH
+ROOT = Path(os.path.relpath(ROOT, Path.cwd()))  # relative
+
+from detection import DEFAULT_WEIGHTS
+from models.common import C3, SPPF, Concat, Conv
+from models.experimental import attempt_load
+from models.yolo import Detect
+from utils.general import LOGGER, check_img_size, colorstr, increment_path, print_args
+from utils.torch_utils import model_info
+
+PRUNABLE = (Conv, C3, SPPF)  # layers whose outputs and hidden channels can be sliced
+PASSTHROUGH = (nn.Upsample, Concat)  # layers that only move channels
+
+
+def channel_scores(convs, method="bn"):
+    """Returns per-output-channel importance summed over Conv modules that share a channel set."""
+    if method == "bn":
+        return sum(m.bn.weight.detach().abs() for m in convs)  # network slimming
+    return sum(m.conv.weight.detach().abs().sum((1, 2, 3)) for m in convs)  # filter L1 norm
+
+
+def keep_channels(convs, ratio, method="bn", round_to=8, min_channels=8):
+    """Returns the sorted indices of the channels to keep for Conv modules that share one output channel set."""
+    c = convs[0].conv.out_channels
+    n = min(c, max(min_channels, int(round(c * (1 - ratio) / round_to)) * round_to))  # SIMD-friendly widths
+    return channel_scores(convs, method).argsort(descending=True)[:n].sort().values
+
+
+def layer_sources(model):
+    """Returns {layer index: [absolute source layer indices]} from each layer's `from` field."""
+    return {m.i: [x if x >= 0 else m.i + x for x in ([m.f] if isinstance(m.f, int) else m.f)] for m in model.model}
+
+
+def output_channels(model, imgsz=64):
+    """Returns {layer index: output channels} by running one small forward pass with hooks."""
+    channels, hooks = {}, []
+    for m in model.model:
+        if not isinstance(m, Detect):
+            hooks.append(m.register_forward_hook(lambda m, i, o: channels.__setitem__(m.i, o.shape[1])))
+    p = next(model.parameters())
+    with torch.no_grad():
+        model(torch.zeros(1, 3, imgsz, imgsz, device=p.device, dtype=p.dtype))
+    for h in hooks:
+        h.remove()
+    return channels
+
+
+def prunable_outputs(model, sources):
+    """Returns the indices of Conv/C3/SPPF layers whose outputs only reach layers that can slice their inputs."""
+    consumers = {m.i: [] for m in model.model}
+    for i, src in sources.items():
+        for s in src:
+            consumers[s].append(i)
+
+    def sliceable(i):  # layer i can take a pruned input
+        m = model.model[i]
+        if isinstance(m, PASSTHROUGH):
+            return bool(consumers[i]) and all(sliceable(j) for j in consumers[i])
+        return type(m) in PRUNABLE or isinstance(m, Detect)
+
+    return {m.i for m in model.model if type(m) in PRUNABLE and consumers[m.i] and all(map(sliceable, consumers[m.i]))}
+
+
+def slice_conv(m, out_idx=None, in_idx=None):
+    """Keeps only `out_idx` output / `in_idx` input channels of a Conv (conv + bn) or nn.Conv2d in place."""
+    conv = m.conv if isinstance(m, Conv) else m
+    assert conv.groups == 1, "grouped convolutions can not be pruned"
+    w = conv.weight.detach()
+    if out_idx is not None:
+        w = w[out_idx]
+        conv.out_channels = len(out_idx)
+        if conv.bias is not None:
+            conv.bias = nn.Parameter(conv.bias.detach()[out_idx].clone())
+        if isinstance(m, Conv) and isinstance(m.bn, nn.BatchNorm2d):
+            bn = m.bn
+            bn.weight = nn.Parameter(bn.weight.detach()[out_idx].clone())
+            bn.bias = nn.Parameter(bn.bias.detach()[out_idx].clone())
+            bn.running_mean, bn.running_var = bn.running_mean[out_idx].clone(), bn.running_var[out_idx].clone()
+            bn.num_features = len(out_idx)
+    if in_idx is not None:
+        w = w[:, in_idx]
+        conv.in_channels = len(in_idx)
+    conv.weight = nn.Parameter(w.clone())
+
+
+@torch.no_grad()
+def prune_model(model, ratio=0.3, method="bn", round_to=8, min_channels=8, skip=()):
+    """
+    Removes `ratio` of the channels of every prunable channel set of an unfused DetectionModel in place.
+
+    Every layer's kept output channels are tracked as indices into its original output, so Concat inputs map to
+    offsets in the concatenated tensor and each consumer (Conv, C3, SPPF, Detect) slices exactly the kept channels.
+    """
+    assert not any(isinstance(m, Conv) and not hasattr(m, "bn") for m in model.modules()), "prune an unfused model"
+    sources = layer_sources(model)
+    channels = output_channels(model)
+    prunable = prunable_outputs(model, sources) - set(skip)
+    keep = {}  # layer index -> kept output channels
+    outs, ins = {}, {}  # Conv -> kept output channels, nn.Conv2d -> kept input channels
+
+    def pick(prune, *convs):  # kept channels of Conv modules sharing one channel set
+        return keep_channels(list(convs), ratio, method, round_to, min_channels) if prune else torch.arange(convs[0].conv.out_channels)
+
+    for m in model.model:
+        i, src = m.i, sources[m.i]
+        x = keep.get(src[0])  # kept input channels (None: image input)
+        hidden = i not in skip  # prune channels inside the block
+        if type(m) is Conv:  # not DWConv/C3x etc. subclasses with other channel layouts
+            ins[m.conv] = x
+            keep[i] = outs[m] = pick(i in prunable, m)
+        elif type(m) is C3:
+            c_ = m.cv1.conv.out_channels
+            ins[m.cv1.conv] = ins[m.cv2.conv] = x
+            k2 = outs[m.cv2] = pick(hidden, m.cv2)
+            if all(b.add for b in m.m):  # residual adds tie cv1 and every Bottleneck.cv2 to one channel set
+                k = outs[m.cv1] = pick(hidden, m.cv1, *(b.cv2 for b in m.m))
+                for b in m.m:
+                    ins[b.cv1.conv] = outs[b.cv2] = k
+            else:  # cv1 -> m[0] -> m[1] ... each output is its own channel set
+                k = outs[m.cv1] = pick(hidden, m.cv1)
+                for b in m.m:
+                    ins[b.cv1.conv] = k
+                    k = outs[b.cv2] = pick(hidden, b.cv2)
+            for b in m.m:  # Bottleneck hidden channels
+                ins[b.cv2.conv] = outs[b.cv1] = pick(hidden, b.cv1)
+            ins[m.cv3.conv] = torch.cat((k, k2 + c_))  # cat(m(cv1(x)), cv2(x))
+            keep[i] = outs[m.cv3] = pick(i in prunable, m.cv3)
+        elif type(m) is SPPF:
+            c_ = m.cv1.conv.out_channels
+            ins[m.cv1.conv] = x
+            k = outs[m.cv1] = pick(hidden, m.cv1)
+            ins[m.cv2.conv] = torch.cat([k + j * c_ for j in range(4)])  # cat(x, y1, y2, y3)
+            keep[i] = outs[m.cv2] = pick(i in prunable, m.cv2)
+        elif isinstance(m, nn.Upsample):
+            keep[i] = x
+        elif isinstance(m, Concat):
+            offsets = np.cumsum([0] + [channels[s] for s in src[:-1]])
+            keep[i] = torch.cat([keep[s] + int(o) for s, o in zip(src, offsets)])
+        elif isinstance(m, Detect):
+            for conv, s in zip(m.m, src):
+                ins[conv] = keep[s]
+        else:  # unsupported layer: its inputs are never pruned (see prunable_outputs) and its outputs are kept
+            keep[i] = torch.arange(channels[i])
+
+    for m, idx in outs.items():
+        slice_conv(m, out_idx=idx)
+    for conv, idx in ins.items():
+        if idx is not None:
+            slice_conv(conv, in_idx=idx)
+    model.pruned = {"ratio": ratio, "method": method, "round": round_to, "date": datetime.now().isoformat()}
+    return model
+
+
+def cpu_latency(model, imgsz, iters=30, warmup=5):
+    """Returns the median single-image CPU forward latency in ms of a fused copy of `model`."""
+    model = deepcopy(model).float().cpu().fuse().eval()
+    im = torch.zeros(1, 3, *imgsz)
+    times = []
+    with torch.no_grad():
+        for i in range(warmup + iters):
+            t = time.perf_counter()
+            model(im)
+            if i >= warmup:
+                times.append(time.perf_counter() - t)
+    return float(np.median(times) * 1e3)
+
+
+def run(
+    weights=DEFAULT_WEIGHTS,  # model.pt path
+    ratio=0.3,  # fraction of channels to remove from every prunable channel set
+    method="bn",  # channel importance: 'bn' (BatchNorm |gamma|) or 'l1' (filter L1 norm)
+    round_to=8,  # keep channel counts at multiples of this
+    min_channels=8,  # never keep fewer channels than this
+    skip=(),  # layer indices to leave unpruned
+    imgsz=(640, 640),  # FLOPs / latency size (height, width)
+    bench_iters=30,  # latency iterations
+    threads=0,  # torch threads, 0 for default
+    data="",  # dataset.yaml to fine-tune on, '' to skip
+    epochs=0,  # fine-tuning epochs with train.py (0: skip)
+    batch_size=16,  # fine-tuning batch size
+    device="",  # fine-tuning device, i.e. 0 or cpu
+    project=ROOT / "runs/prune",  # save to project/name
+    name="exp",  # save to project/name
+    exist_ok=False,  # existing project/name ok, do not increment
+):
+    if threads:
+        torch.set_num_threads(threads)
+    save_dir = increment_path(Path(project) / name, exist_ok=exist_ok)
+    (save_dir / "weights").mkdir(parents=True, exist_ok=True)
+
+    model = attempt_load(weights, device=torch.device("cpu"), fuse=False).float().eval()
+    imgsz = [check_img_size(x, int(max(model.stride))) for x in imgsz]
+    LOGGER.info(f"\n{colorstr('Before:')}")
+    params0, flops0 = model_info(model, imgsz=imgsz)
+    t0 = cpu_latency(model, imgsz, bench_iters)
+
+    prune_model(model, ratio, method, round_to, min_channels, skip)
+    LOGGER.info(f"\n{colorstr('After:')}")
+    params1, flops1 = model_info(model, imgsz=imgsz)
+    t1 = cpu_latency(model, imgsz, bench_iters)
+
+    f = save_dir / "weights/pruned.pt"
+    ckpt = {"epoch": -1, "best_fitness": None, "model": deepcopy(model).half(), "ema": None, "updates": None,
+            "optimizer": None, "opt": None, "git": None, "date": datetime.now().isoformat()}  # fmt: skip
+    torch.save(ckpt, f)
+
+    flops = f"{flops0:.1f} -> {flops1:.1f} GFLOPs ({flops1 / flops0:.0%}), " if flops0 and flops1 else ""
+    LOGGER.info(
+        f"\n{colorstr('Pruning:')} ratio={ratio} ({method}), {params0} -> {params1} parameters ({params1 / params0:.0%}), "
+        f"{flops}CPU latency {t0:.1f} -> {t1:.1f} ms ({t0 / t1:.2f}x) at {tuple(imgsz)}"
+        f"\nSaved {f}, fine-tune with: python train.py --weights {f} --data <notes.yaml> --epochs 30"
+    )
+
+    if data and epochs:
+        import train
+
+        train.run(weights=str(f), data=data, epochs=epochs, batch_size=batch_size, imgsz=imgsz[0], device=device,
+                  project=str(save_dir), name="finetune", exist_ok=True)  # fmt: skip
+    return f
+
+
+def parse_opt():
+    """Parses command-line arguments for structured pruning."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--weights", type=str, default=DEFAULT_WEIGHTS, help="model.pt path")
+    parser.add_argument("--ratio", type=float, default=0.3, help="fraction of channels to remove per channel set")
+    parser.add_argument("--method", default="bn", choices=("bn", "l1"), help="channel importance: BN |gamma| or L1")
+    parser.add_argument("--round-to", type=int, default=8, help="keep channel counts at multiples of this")
+    parser.add_argument("--min-channels", type=int, default=8, help="minimum channels per channel set")
+    parser.add_argument("--skip", nargs="*", type=int, default=[], help="layer indices to leave unpruned")
+    parser.add_argument("--imgsz", "--img", "--img-size", nargs="+", type=int, default=[640], help="FLOPs/latency size h,w")
+    parser.add_argument("--bench-iters", type=int, default=30, help="latency iterations")
+    parser.add_argument("--threads", type=int, default=0, help="torch threads, 0 for default")
+    parser.add_argument("--data", type=str, default="", help="dataset.yaml to fine-tune on")
+    parser.add_argument("--epochs", type=int, default=0, help="fine-tuning epochs, 0 to skip")
+    parser.add_argument("--batch-size", type=int, default=16, help="fine-tuning batch size")
+    parser.add_argument("--device", default="", help="fine-tuning device, i.e. 0 or 0,1,2,3 or cpu")
+    parser.add_argument("--project", default=ROOT / "runs/prune", help="save to project/name")
+    parser.add_argument("--name", default="exp", help="save to project/name")
+    parser.add_argument("--exist-ok", action="store_true", help="existing project/name ok, do not increment")
+    opt = parser.parse_args()
+    opt.imgsz *= 2 if len(opt.imgsz) == 1 else 1  # expand
+    print_args(vars(opt))
+    return opt
+
+
+def main(opt):
+    """Prunes (and optionally fine-tunes) with parsed options."""
+    run(**vars(opt))
+
+
+if __name__ == "__main__":
+    opt = parse_opt()
+    main(opt)
@@ -0,0 +1,330 @@
+# YOLOv5 🚀 by Ultralytics, AGPL-3.0 license
+"""
+INT8 post-training quantization of YOLOv5 detection weights, calibrated on a folder of our own note images.
+
+Produces INT8 artifacts next to the weights, validates each one with val.py, benchmarks its CPU latency, and writes a
+comparison table (runs/quantize/exp/quantize.csv) against the FP32 baseline.
+
+Artifact                    | Toolkit                                   | File
+---                         | ---                                       | ---
+ONNX Runtime INT8           | onnxruntime.quantization.quantize_static  | *_int8.onnx (QDQ, dynamic batch)
+OpenVINO INT8               | nncf.quantize                             | *_int8_openvino_model/
+PyTorch INT8                | torch.ao.quantization FX graph mode       | *_int8.torchscript
+
+The Detect head is kept in FP32 by default: its last convolutions and the box decoding are the most sensitive to
+quantization error and cost little compared to the backbone. Use --quantize-head to quantize it as well.
+
+Requirements:
+    $ pip install -r requirements.txt onnx onnxruntime openvino-dev nncf
+
+Usage:
+    $ python quantize.py --weights weights/underline+circle_yolov5m_10_07_best.pt --calib ../app/test/notes --data notes.yaml
+    $ python quantize.py --weights weights/underline+circle_yolov5m_10_07_best.pt --calib notes/ --formats onnx openvino
+    $ python quantize.py ... --recall-class underlined_text --max-recall-drop 0.01  # pick the fastest acceptable model
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import torch
+
+FILE = Path(__file__).resolve()
+ROOT = FILE.parents[0]  # YOLOv5 root directory
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))  # add ROOT to PATH
+ROOT = Path(os.path.relpath(ROOT, Path.cwd()))  # relative
+
+import export
+from detection import DEFAULT_WEIGHTS
+from models.common import DetectMultiBackend
+from models.experimental import attempt_load
+from models.yolo import Detect
+from utils.callbacks import Callbacks
+from utils.dataloaders import IMG_FORMATS, LoadImages
+from utils.general import (
+    LOGGER,
+    check_dataset,
+    check_img_size,
+    check_requirements,
+    check_yaml,
+    colorstr,
+    file_size,
+    increment_path,
+    print_args,
+    yaml_save,
+)
+from val import run as val_det
+
+FORMATS = ("onnx", "openvino", "torch")
+CALIBRATION_METHODS = ("MinMax", "Entropy", "Percentile")
+
+
+def calibration_images(calib, imgsz, stride=32, n=300):
+    """Returns up to `n` letterboxed (1,3,H,W) float32 arrays from a folder of images, evenly spaced over the folder."""
+    files = sorted(str(p) for p in Path(calib).rglob("*") if p.suffix[1:].lower() in IMG_FORMATS)
+    assert files, f"no images found in --calib {calib}"
+    if len(files) > n:
+        files = [files[i] for i in np.linspace(0, len(files) - 1, n).round().astype(int)]
+    images = []
+    for _, im, _, _, _ in LoadImages(files, img_size=imgsz, stride=stride, auto=False):
+        images.append((im[None].astype(np.float32) / 255.0))  # uint8 CHW RGB to float32 BCHW 0.0 - 1.0
+    LOGGER.info(f"{colorstr('Calibration:')} {len(images)} images from {calib} at {tuple(imgsz)}")
+    return images
+
+
+def head_index(model):
+    """Returns the model.N index of the Detect layer, which names its nodes /model.N/... in exported graphs."""
+    return next(i for i, m in enumerate(model.model) if isinstance(m, Detect))
+
+
+def quantize_onnx(f_onnx, images, head, quantize_head=False, per_channel=True, method="MinMax", prefix=colorstr("ONNX INT8:")):
+    """Statically quantizes an FP32 ONNX model to QDQ INT8 with ONNX Runtime, keeping the model metadata."""
+    check_requirements(("onnx", "onnxruntime"))
+    import onnx
+    from onnxruntime.quantization import CalibrationDataReader, CalibrationMethod, QuantFormat, QuantType, quantize_static
+
+    class NoteCalibrationReader(CalibrationDataReader):
+        # quantize_static이 한 장씩 가져가는 보정 입력
+        def __init__(self, name):
+            self.inputs = iter({name: x} for x in images)
+
+        def get_next(self):
+            return next(self.inputs, None)
+
+    f = Path(f_onnx).with_name(f"{Path(f_onnx).stem}_int8.onnx")
+    model_onnx = onnx.load(f_onnx)
+    exclude = [] if quantize_head else [n.name for n in model_onnx.graph.node if n.name.startswith(f"/model.{head}/")]
+    LOGGER.info(f"\n{prefix} quantizing {f_onnx} ({method}, per_channel={per_channel}, {len(exclude)} FP32 head nodes)...")
+    quantize_static(
+        f_onnx,
+        f,
+        NoteCalibrationReader(model_onnx.graph.input[0].name),
+        quant_format=QuantFormat.QDQ,
+        per_channel=per_channel,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        calibrate_method=getattr(CalibrationMethod, method),
+        nodes_to_exclude=exclude,
+    )
+
+    # stride/names metadata for DetectMultiBackend
+    model_int8 = onnx.load(f)
+    for prop in model_onnx.metadata_props:
+        meta = model_int8.metadata_props.add()
+        meta.key, meta.value = prop.key, prop.value
+    onnx.save(model_int8, f)
+    return str(f)
+
+
+def quantize_openvino(f_onnx, images, head, metadata, quantize_head=False, prefix=colorstr("OpenVINO INT8:")):
+    """Quantizes an FP32 ONNX model to an INT8 OpenVINO IR with NNCF, calibrated on the note images."""
+    check_requirements(("openvino-dev>=2023.0", "nncf>=2.7.0"))
+    import nncf
+    import openvino.runtime as ov
+
+    f_onnx = Path(f_onnx)
+    f = f_onnx.with_name(f"{f_onnx.stem}_int8_openvino_model")
+    LOGGER.info(f"\n{prefix} quantizing {f_onnx} with nncf {nncf.__version__}...")
+    ov_model = ov.Core().read_model(str(f_onnx))
+    ignored = None if quantize_head else nncf.IgnoredScope(patterns=[rf".*/model\.{head}/.*"], validate=False)
+    ov_model = nncf.quantize(
+        ov_model,
+        nncf.Dataset(images),
+        preset=nncf.QuantizationPreset.MIXED,
+        subset_size=len(images),
+        ignored_scope=ignored,
+    )
+    ov.serialize(ov_model, str(f / f_onnx.with_suffix(".xml").name))  # save
+    yaml_save(f / f_onnx.with_suffix(".yaml").name, metadata)  # add metadata.yaml
+    return str(f)
+
+
+@torch.no_grad()
+def quantize_torch(weights, images, imgsz, quantize_head=False, prefix=colorstr("PyTorch INT8:")):
+    """
+    Quantizes the PyTorch model with FX graph mode static PTQ (x86 backend) and saves it as TorchScript.
+
+    Detect is never traced (its grid cache depends on input shapes) and stays FP32 unless --quantize-head is set.
+    SiLU has no quantized kernel, so activations are dequantized around it; expect smaller gains than ONNX/OpenVINO.
+    """
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.fx.custom_config import PrepareCustomConfig
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+    LOGGER.info(f"\n{prefix} quantizing {weights} with torch {torch.__version__}...")
+    model = attempt_load(weights, device=torch.device("cpu"), inplace=True, fuse=True).eval()
+    for m in model.modules():
+        if isinstance(m, Detect):
+            m.export = True  # return only the concatenated predictions
+    torch.backends.quantized.engine = "x86" if "x86" in torch.backends.quantized.supported_engines else "fbgemm"
+    qconfig_mapping = get_default_qconfig_mapping(torch.backends.quantized.engine)
+    if not quantize_head:
+        qconfig_mapping.set_object_type(Detect, None)
+    example = torch.from_numpy(images[0])
+    prepared = prepare_fx(
+        model,
+        qconfig_mapping,
+        (example,),
+        prepare_custom_config=PrepareCustomConfig().set_non_traceable_module_classes([Detect]),
+    )
+    for x in images:  # calibrate observers
+        prepared(torch.from_numpy(x))
+    quantized = convert_fx(prepared)
+    quantized.stride, quantized.names = model.stride, model.names  # GraphModule keeps only traced attributes
+
+    # Same TorchScript layout as export.py so DetectMultiBackend / val.py can load it
+    f, _ = export.export_torchscript(quantized, torch.zeros(1, 3, *imgsz), Path(weights).with_name(f"{Path(weights).stem}_int8.pt"), False)
+    return str(f)
+
+
+def benchmark_latency(w, imgsz, data=None, iters=50, warmup=10):
+    """Returns (p50, p95) single-image CPU forward latency in ms for any DetectMultiBackend weights."""
+    backend_options = {"performance_hint": "LATENCY"} if str(w).rstrip("/\\").endswith("_openvino_model") else None
+    model = DetectMultiBackend(w, device=torch.device("cpu"), data=data, backend_options=backend_options)
+    im = torch.zeros(1, 3, *imgsz)
+    for _ in range(warmup):
+        model(im)
+    times = []
+    for _ in range(iters):
+        t = time.perf_counter()
+        model(im)
+        times.append(time.perf_counter() - t)
+    return tuple(np.percentile(times, (50, 95)) * 1e3)
+
+
+def validate(w, data, imgsz, save_dir, name, recall_class):
+    """Runs val.py on `w`, returning (P, R, mAP50, mAP50-95, recall of `recall_class`)."""
+    recall = {}
+
+    def on_val_end(nt, tp, fp, p, r, f1, ap, ap50, ap_class, confusion_matrix):
+        recall.update(zip(ap_class.tolist(), r.tolist()))  # per-class recall at the max-F1 confidence
+
+    callbacks = Callbacks()
+    callbacks.register_action("on_val_end", name="quantize", callback=on_val_end)
+    (mp, mr, map50, map, *_), _, _ = val_det(
+        data, w, batch_size=1, imgsz=imgsz, device="cpu", half=False, plots=True, callbacks=callbacks,
+        project=save_dir / "val", name=name, exist_ok=True,
+    )  # fmt: skip
+    names = check_dataset(data)["names"]
+    c = next((i for i, x in names.items() if x == recall_class), None)
+    return mp, mr, map50, map, recall.get(c)
+
+
+def run(
+    weights=DEFAULT_WEIGHTS,  # FP32 model.pt path
+    calib=ROOT.parent / "app/test/notes",  # folder of note images for calibration
+    data="",  # dataset.yaml with labelled note images for val.py, '' to only benchmark latency
+    imgsz=(640, 640),  # inference size (height, width)
+    formats=FORMATS,  # INT8 artifacts to produce
+    calib_images=300,  # maximum calibration images
+    calib_method="MinMax",  # ONNX Runtime calibration method
+    per_channel=True,  # ONNX Runtime per-channel weight quantization
+    quantize_head=False,  # also quantize the Detect head
+    recall_class="underlined_text",  # class whose recall must be kept
+    max_recall_drop=0.01,  # largest acceptable recall drop vs FP32 for the recommendation
+    bench_iters=50,  # latency benchmark iterations
+    threads=0,  # torch threads, 0 for default
+    project=ROOT / "runs/quantize",  # save to project/name
+    name="exp",  # save to project/name
+    exist_ok=False,  # existing project/name ok, do not increment
+):
+    t = time.time()
+    if threads:
+        torch.set_num_threads(threads)
+    save_dir = increment_path(Path(project) / name, exist_ok=exist_ok)
+    save_dir.mkdir(parents=True, exist_ok=True)
+    data = check_yaml(data) if data else ""
+
+    # FP32 baselines (ONNX export with a dynamic batch axis, as served by ORTSession)
+    model = attempt_load(weights, device=torch.device("cpu"), fuse=False)
+    stride, head = int(max(model.stride)), head_index(model)
+    metadata = {"stride": stride, "names": model.names}
+    imgsz = [check_img_size(x, stride) for x in imgsz]
+    include = ["onnx"] + (["openvino"] if "openvino" in formats else [])
+    exported = export.run(weights=weights, imgsz=imgsz, include=include, device="cpu", dynamic_batch=True)
+    f_onnx = exported[0]
+    artifacts = [("PyTorch", "FP32", str(weights)), ("ONNX Runtime", "FP32", f_onnx)]
+    if "openvino" in formats:
+        artifacts.append(("OpenVINO", "FP32", exported[1]))
+
+    # INT8
+    images = calibration_images(calib, imgsz, stride, calib_images)
+    if "onnx" in formats:
+        artifacts.append(("ONNX Runtime", "INT8", quantize_onnx(f_onnx, images, head, quantize_head, per_channel, calib_method)))
+    if "openvino" in formats:
+        artifacts.append(("OpenVINO", "INT8", quantize_openvino(f_onnx, images, head, metadata, quantize_head)))
+    if "torch" in formats:
+        artifacts.append(("PyTorch", "INT8", quantize_torch(weights, images, imgsz, quantize_head)))
+
+    # Validate and benchmark
+    y = []
+    for backend, precision, w in artifacts:
+        try:
+            metrics = validate(w, data, imgsz[0], save_dir, f"{backend}_{precision}".replace(" ", ""), recall_class) if data else (None,) * 5
+            p50, p95 = benchmark_latency(w, imgsz, data or None, iters=bench_iters)
+            y.append([backend, precision, w, round(file_size(w), 1), *metrics, p50, p95])
+        except Exception as e:
+            LOGGER.warning(f"WARNING ⚠️ Quantize benchmark failure for {backend} {precision}: {e}")
+            y.append([backend, precision, w, None, None, None, None, None, None, None, None])
+
+    # Report
+    c = ["Backend", "Precision", "Weights", "Size (MB)", "P", "R", "mAP50", "mAP50-95", f"R({recall_class})",
+         "Latency p50 (ms)", "Latency p95 (ms)"]  # fmt: skip
+    py = pd.DataFrame(y, columns=c)
+    base = py.iloc[0]
+    py["Speedup"] = (base["Latency p50 (ms)"] / py["Latency p50 (ms)"]).round(2)
+    if data:
+        py["Recall drop"] = (base[f"R({recall_class})"] - py[f"R({recall_class})"]).round(4)
+    py.to_csv(save_dir / "quantize.csv", index=False)
+    LOGGER.info(f"\nQuantization complete ({time.time() - t:.2f}s)")
+    LOGGER.info(str(py.drop(columns="Weights").round(4)))
+
+    if data:  # fastest model within the recall budget
+        ok = py[(py["Precision"] == "INT8") & (py["Recall drop"] <= max_recall_drop)]
+        if len(ok):
+            best = ok.loc[ok["Latency p50 (ms)"].idxmin()]
+            LOGGER.info(f"Recommended: {best['Weights']} ({best['Speedup']}x, {recall_class} recall -{best['Recall drop']})")
+        else:
+            LOGGER.info(f"No INT8 model keeps {recall_class} recall within {max_recall_drop}, try --calib-method or more --calib-images")
+    LOGGER.info(f"Results saved to {colorstr('bold', save_dir / 'quantize.csv')}")
+    return py
+
+
+def parse_opt():
+    """Parses command-line arguments for INT8 quantization and its accuracy/latency report."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--weights", type=str, default=DEFAULT_WEIGHTS, help="FP32 model.pt path")
+    parser.add_argument("--calib", type=str, default=ROOT.parent / "app/test/notes", help="folder of note images for calibration")
+    parser.add_argument("--data", type=str, default="", help="dataset.yaml with labelled notes for val.py, '' for latency only")
+    parser.add_argument("--imgsz", "--img", "--img-size", nargs="+", type=int, default=[640], help="inference size h,w")
+    parser.add_argument("--formats", nargs="+", default=list(FORMATS), choices=FORMATS, help="INT8 artifacts to produce")
+    parser.add_argument("--calib-images", type=int, default=300, help="maximum calibration images")
+    parser.add_argument("--calib-method", default="MinMax", choices=CALIBRATION_METHODS, help="ONNX Runtime calibration")
+    parser.add_argument("--no-per-channel", dest="per_channel", action="store_false", help="ONNX: per-tensor weights")
+    parser.add_argument("--quantize-head", action="store_true", help="also quantize the Detect head")
+    parser.add_argument("--recall-class", default="underlined_text", help="class whose recall must be kept")
+    parser.add_argument("--max-recall-drop", type=float, default=0.01, help="acceptable recall drop vs FP32")
+    parser.add_argument("--bench-iters", type=int, default=50, help="latency benchmark iterations")
+    parser.add_argument("--threads", type=int, default=0, help="torch threads, 0 for default")
+    parser.add_argument("--project", default=ROOT / "runs/quantize", help="save to project/name")
+    parser.add_argument("--name", default="exp", help="save to project/name")
+    parser.add_argument("--exist-ok", action="store_true", help="existing project/name ok, do not increment")
+    opt = parser.parse_args()
+    opt.imgsz *= 2 if len(opt.imgsz) == 1 else 1  # expand
+    print_args(vars(opt))
+    return opt
+
+
+def main(opt):
+    """Quantizes, validates and benchmarks with parsed options."""
+    run(**vars(opt))
+
+
+if __name__ == "__main__":
+    opt = parse_opt()
+    main(opt)
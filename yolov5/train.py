@@ -6,6 +6,9 @@ Usage - Single-GPU training:
     $ python train.py --data coco128.yaml --weights yolov5s.pt --img 640  # from pretrained (recommended)
     $ python train.py --data coco128.yaml --weights '' --cfg yolov5s.yaml --img 640  # from scratch
 
+Usage - Knowledge distillation (small student, frozen large teacher):
+    $ python train.py --data notes.yaml --weights yolov5s.pt --teacher weights/underline+circle_yolov5x_10_07_best.pt
+
 Usage - Multi-GPU DDP training:
     $ python -m torch.distributed.run --nproc_per_node 4 --master_port 1 train.py --data coco128.yaml --weights yolov5s.pt --img 640 --device 0,1,2,3
 
@@ -15,6 +18,7 @@ Tutorial:   https://docs.ultralytics.com/yolov5/tutorials/train_custom_data
 """
 
 import argparse
+import contextlib
 import math
 import os
 import random
@@ -80,7 +84,8 @@ from utils.general import (
 )
 from utils.loggers import LOGGERS, Loggers
 from utils.loggers.comet.comet_utils import check_comet_resume
-from utils.loss import ComputeLoss
+from utils.distill import DetectInputs, Teacher, random_augmentations
+from utils.loss import ComputeDistillLoss, ComputeLoss
 from utils.metrics import fitness
 from utils.plots import plot_evolve
 from utils.torch_utils import (
@@ -186,12 +191,17 @@ def train(hyp, opt, device, callbacks):
         with torch_distributed_zero_first(LOCAL_RANK):
             weights = attempt_download(weights)  # download if not found locally
         ckpt = torch.load(weights, map_location="cpu")  # load checkpoint to CPU to avoid CUDA memory leak
-        model = Model(cfg or ckpt["model"].yaml, ch=3, nc=nc, anchors=hyp.get("anchors")).to(device)  # create
-        exclude = ["anchor"] if (cfg or hyp.get("anchors")) and not resume else []  # exclude keys
-        csd = ckpt["model"].float().state_dict()  # checkpoint state_dict as FP32
-        csd = intersect_dicts(csd, model.state_dict(), exclude=exclude)  # intersect
-        model.load_state_dict(csd, strict=False)  # load
-        LOGGER.info(f"Transferred {len(csd)}/{len(model.state_dict())} items from {weights}")  # report
+        if getattr(ckpt["model"], "pruned", None) and not cfg:  # prune.py channel widths are not in the yaml
+            model = ckpt["model"].float().to(device)  # fine-tune the pruned model as-is
+            assert model.model[-1].nc == nc, f"pruned {weights} has {model.model[-1].nc} classes, --data has {nc}"
+            LOGGER.info(f"Fine-tuning pruned model {weights} ({model.pruned})")
+        else:
+            model = Model(cfg or ckpt["model"].yaml, ch=3, nc=nc, anchors=hyp.get("anchors")).to(device)  # create
+            exclude = ["anchor"] if (cfg or hyp.get("anchors")) and not resume else []  # exclude keys
+            csd = ckpt["model"].float().state_dict()  # checkpoint state_dict as FP32
+            csd = intersect_dicts(csd, model.state_dict(), exclude=exclude)  # intersect
+            model.load_state_dict(csd, strict=False)  # load
+            LOGGER.info(f"Transferred {len(csd)}/{len(model.state_dict())} items from {weights}")  # report
     else:
         model = Model(cfg, ch=3, nc=nc, anchors=hyp.get("anchors")).to(device)  # create
     amp = check_amp(model)  # check AMP
@@ -220,6 +230,14 @@ def train(hyp, opt, device, callbacks):
     hyp["weight_decay"] *= batch_size * accumulate / nbs  # scale weight_decay
     optimizer = smart_optimizer(model, opt.optimizer, hyp["lr0"], hyp["momentum"], hyp["weight_decay"])
 
+    # Distillation
+    teacher = distill_loss = student_inputs = None
+    if opt.teacher:
+        assert not (cuda and RANK == -1 and torch.cuda.device_count() > 1), "--teacher supports single-GPU or DDP, not DP"
+        teacher = Teacher(opt.teacher, device)
+        distill_loss = ComputeDistillLoss(model, teacher.model, feat=opt.distill_feat, pred=opt.distill_pred)
+        optimizer.add_param_group({"params": list(distill_loss.parameters()), "weight_decay": 0.0})  # feature adapters
+
     # Scheduler
     if opt.cos_lr:
         lf = one_cycle(1, hyp["lrf"], epochs)  # cosine 1->hyp['lrf']
@@ -235,6 +253,11 @@ def train(hyp, opt, device, callbacks):
     if pretrained:
         if resume:
             best_fitness, start_epoch, epochs = smart_resume(ckpt, optimizer, ema, weights, epochs, resume)
+            if distill_loss:
+                if ckpt.get("distill_adapters"):
+                    distill_loss.load_state_dict(ckpt["distill_adapters"])
+                else:
+                    LOGGER.warning(f"WARNING ⚠️ {weights} has no distillation adapter weights, adapters restart from scratch")
         del ckpt, csd
 
     # DP mode
@@ -324,6 +347,16 @@ def train(hyp, opt, device, callbacks):
     scaler = torch.cuda.amp.GradScaler(enabled=amp)
     stopper, stop = EarlyStopping(patience=opt.patience), False
     compute_loss = ComputeLoss(model)  # init loss class
+    if teacher:
+        student_inputs = DetectInputs(de_parallel(model).model[-1])  # after EMA so the EMA copy has no hook
+        if opt.teacher_cache != "off":
+            if augmentations := random_augmentations(hyp, opt, dataset):
+                LOGGER.info(
+                    f"{colorstr('distill:')} teacher output cache disabled, random augmentation changes pixels every "
+                    f"epoch ({', '.join(augmentations)}). Set these to 0 to cache, or pass --teacher-cache off to silence."
+                )
+            else:
+                teacher.enable_cache(opt.teacher_cache, save_dir / "teacher_cache")
     callbacks.run("on_train_start")
     LOGGER.info(
         f'Image sizes {imgsz} train, {imgsz} val\n'
@@ -346,6 +379,7 @@ def train(hyp, opt, device, callbacks):
         # dataset.mosaic_border = [b - imgsz, -b]  # height, width borders
 
         mloss = torch.zeros(3, device=device)  # mean losses
+        mdistill = torch.zeros(2, device=device)  # mean distillation losses (feature, prediction)
         if RANK != -1:
             train_loader.sampler.set_epoch(epoch)
         pbar = enumerate(train_loader)
@@ -381,6 +415,10 @@ def train(hyp, opt, device, callbacks):
             with torch.cuda.amp.autocast(amp):
                 pred = model(imgs)  # forward
                 loss, loss_items = compute_loss(pred, targets.to(device))  # loss scaled by batch_size
+                if teacher:
+                    dloss, dloss_items = distill_loss(pred, student_inputs.pop(), *teacher(imgs, paths))
+                    loss += dloss
+                    mdistill = (mdistill * i + dloss_items) / (i + 1)
                 if RANK != -1:
                     loss *= WORLD_SIZE  # gradient averaged between devices in DDP mode
                 if opt.quad:
@@ -414,10 +452,13 @@ def train(hyp, opt, device, callbacks):
             # end batch ------------------------------------------------------------------------------------------------
 
         # Scheduler
-        lr = [x["lr"] for x in optimizer.param_groups]  # for loggers
+        lr = [x["lr"] for x in optimizer.param_groups[:3]]  # for loggers (without distillation adapters)
         scheduler.step()
 
         if RANK in {-1, 0}:
+            if teacher:
+                LOGGER.info(f"{colorstr('distill:')} feature loss {mdistill[0]:.4g}, prediction loss {mdistill[1]:.4g}")
+
             # mAP
             callbacks.run("on_train_epoch_end", epoch=epoch)
             ema.update_attr(model, include=["yaml", "nc", "hyp", "names", "stride", "class_weights"])
@@ -447,17 +488,19 @@ def train(hyp, opt, device, callbacks):
 
             # Save model
             if (not nosave) or (final_epoch and not evolve):  # if save
-                ckpt = {
-                    "epoch": epoch,
-                    "best_fitness": best_fitness,
-                    "model": deepcopy(de_parallel(model)).half(),
-                    "ema": deepcopy(ema.ema).half(),
-                    "updates": ema.updates,
-                    "optimizer": optimizer.state_dict(),
-                    "opt": vars(opt),
-                    "git": GIT_INFO,  # {remote, branch, commit} if a git repo
-                    "date": datetime.now().isoformat(),
-                }
+                with student_inputs.detached() if student_inputs else contextlib.nullcontext():  # no hook in ckpt
+                    ckpt = {
+                        "epoch": epoch,
+                        "best_fitness": best_fitness,
+                        "model": deepcopy(de_parallel(model)).half(),
+                        "ema": deepcopy(ema.ema).half(),
+                        "updates": ema.updates,
+                        "optimizer": optimizer.state_dict(),
+                        "distill_adapters": distill_loss.state_dict() if distill_loss else None,  # for --resume
+                        "opt": vars(opt),
+                        "git": GIT_INFO,  # {remote, branch, commit} if a git repo
+                        "date": datetime.now().isoformat(),
+                    }
 
                 # Save last, best and delete
                 torch.save(ckpt, last)
@@ -552,6 +595,14 @@ def parse_opt(known=False):
     parser.add_argument("--seed", type=int, default=0, help="Global training seed")
     parser.add_argument("--local_rank", type=int, default=-1, help="Automatic DDP Multi-GPU argument, do not modify")
 
+    # Knowledge distillation arguments
+    parser.add_argument("--teacher", type=str, default="", help="frozen teacher weights to distill from, i.e. yolov5x.pt")
+    parser.add_argument("--distill-feat", type=float, default=0.05, help="feature (Detect input) distillation loss gain")
+    parser.add_argument("--distill-pred", type=float, default=1.0, help="prediction distillation loss gain")
+    parser.add_argument(
+        "--teacher-cache", default="ram", choices=["ram", "disk", "off"], help="cache teacher outputs if augmentation allows"
+    )
+
     # Logger arguments
     parser.add_argument("--entity", default=None, help="Entity")
     parser.add_argument("--upload_dataset", nargs="?", const=True, default=False, help='Upload data, "val" option')
@@ -0,0 +1,110 @@
+# YOLOv5 🚀 by Ultralytics, AGPL-3.0 license
+"""Knowledge distillation utilities: a frozen teacher with an optional cache of its outputs across epochs."""
+
+import contextlib
+import hashlib
+from pathlib import Path
+
+import torch
+
+from models.experimental import attempt_load
+from utils.general import LOGGER, colorstr
+
+# Random image augmentations, any non-zero value makes teacher outputs differ between epochs
+AUGMENT_HYPS = (
+    "hsv_h", "hsv_s", "hsv_v", "degrees", "translate", "scale", "shear", "perspective",
+    "flipud", "fliplr", "mosaic", "mixup", "copy_paste",
+)  # fmt: skip
+
+
+class DetectInputs:
+    # Forward pre-hook that keeps the feature maps (P3-P5) passed into a Detect() module
+    def __init__(self, detect):
+        """Registers the hook on `detect`; `x` holds the inputs of the latest forward pass."""
+        self.detect, self.x = detect, None
+        self.handle = detect.register_forward_pre_hook(self)
+
+    def __call__(self, module, args):
+        """Copies the input list, Detect() replaces its elements in place."""
+        self.x = list(args[0])
+
+    @contextlib.contextmanager
+    def detached(self):
+        """Temporarily removes the hook, i.e. while the model is deep-copied or pickled into a checkpoint."""
+        self.handle.remove()
+        try:
+            yield
+        finally:
+            self.handle = self.detect.register_forward_pre_hook(self)
+
+    def pop(self):
+        """Returns and releases the captured inputs."""
+        x, self.x = self.x, None
+        return x
+
+
+def random_augmentations(hyp, opt, dataset):
+    """Returns the settings that change an image's pixels between epochs; teacher outputs can be cached if empty."""
+    sources = [k for k in AUGMENT_HYPS if hyp.get(k, 0)]
+    sources += [f"--{k.replace('_', '-')}" for k in ("multi_scale", "quad") if getattr(opt, k)]
+    if getattr(getattr(dataset, "albumentations", None), "transform", None):
+        sources.append("albumentations")
+    return sources
+
+
+class Teacher:
+    # Frozen teacher model returning raw Detect() predictions and the features fed into Detect()
+    def __init__(self, weights, device):
+        """Loads, fuses and freezes `weights` through attempt_load."""
+        self.model = attempt_load(weights, device=device, inplace=True, fuse=True).eval()
+        self.model.requires_grad_(False)
+        self.inputs = DetectInputs(self.model.model[-1])
+        self.cache, self.cache_dir = None, None
+        LOGGER.info(f"{colorstr('distill:')} teacher {weights}")
+
+    def enable_cache(self, mode="ram", cache_dir=None):
+        """Caches outputs per (image, input shape) in RAM or as FP16 files in `cache_dir`."""
+        if mode == "disk":
+            self.cache_dir = Path(cache_dir)
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        else:
+            self.cache = {}
+        LOGGER.info(f"{colorstr('distill:')} caching teacher outputs ({mode}), augmentation is deterministic")
+
+    def key(self, path, shape):
+        """Returns the cache key of one image at one input shape."""
+        return hashlib.sha256(f"{path}:{tuple(shape)}".encode()).hexdigest()
+
+    def load(self, key):
+        """Returns cached outputs for `key` or None."""
+        if self.cache is not None:
+            return self.cache.get(key)
+        f = self.cache_dir / f"{key}.pt"
+        return torch.load(f) if f.exists() else None
+
+    def save(self, key, outputs):
+        """Stores one image's outputs as FP16 on CPU."""
+        outputs = [x.half().cpu() for x in outputs]
+        if self.cache is not None:
+            self.cache[key] = outputs
+        else:
+            torch.save(outputs, self.cache_dir / f"{key}.pt")
+
+    @torch.no_grad()
+    def __call__(self, imgs, paths):
+        """Returns (predictions, features) lists for a batch, from the cache when every image is cached."""
+        nl = len(self.model.model[-1].m)
+        caching = self.cache is not None or self.cache_dir is not None
+        if caching:
+            keys = [self.key(p, imgs.shape[2:]) for p in paths]
+            cached = [self.load(k) for k in keys]
+            if all(x is not None for x in cached):
+                outputs = [torch.stack(x).to(imgs.device) for x in zip(*cached)]
+                return outputs[:nl], outputs[nl:]
+
+        _, p = self.model(imgs)  # eval mode returns (inference output, raw predictions)
+        features = self.inputs.pop()
+        if caching:
+            for i, k in enumerate(keys):
+                self.save(k, [x[i] for x in (*p, *features)])
+        return list(p), features
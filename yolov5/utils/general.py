@@ -1126,7 +1126,7 @@ def strip_optimizer(f="best.pt", s=""):
     x = torch.load(f, map_location=torch.device("cpu"))
     if x.get("ema"):
         x["model"] = x["ema"]  # replace model with ema
-    for k in "optimizer", "best_fitness", "ema", "updates":  # keys
+    for k in "optimizer", "best_fitness", "ema", "updates", "distill_adapters":  # keys
         x[k] = None
     x["epoch"] = -1
     x["model"].half()  # to FP16
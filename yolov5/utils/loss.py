@@ -252,3 +252,72 @@ class ComputeLoss:
             tcls.append(c)  # class
 
         return tcls, tbox, indices, anch
+
+
+class ComputeDistillLoss:
+    # Knowledge distillation terms added to ComputeLoss when training a student against a frozen teacher
+    def __init__(self, model, teacher, feat=0.05, pred=1.0):
+        """
+        Initializes feature adapters and prediction-level distillation for a student `model` and `teacher` model.
+
+        Both models must share strides, anchors per level and classes; feature channels may differ (1x1 adapters).
+        """
+        device = next(model.parameters()).device
+        m, mt = de_parallel(model).model[-1], teacher.model[-1]  # Detect() modules
+        assert (m.nl, m.na, m.nc) == (mt.nl, mt.na, mt.nc), "student and teacher need the same levels/anchors/classes"
+        assert torch.equal(m.stride.cpu(), mt.stride.cpu()), f"student strides {m.stride} != teacher strides {mt.stride}"
+        self.adapters = nn.ModuleList(nn.Conv2d(s.in_channels, t.in_channels, 1) for s, t in zip(m.m, mt.m)).to(device)
+        self.detect, self.teacher_anchors = m, mt.anchors  # student anchors read per call (AutoAnchor may update them)
+        self.nc, self.nl = m.nc, m.nl
+        self.feat, self.pred = feat, pred
+        self.BCE = nn.BCEWithLogitsLoss(reduction="none")
+        self.device = device
+
+    def parameters(self):
+        """Returns the trainable adapter parameters (not part of the saved student model)."""
+        return self.adapters.parameters()
+
+    def state_dict(self):
+        """Returns the feature adapter weights, saved in training checkpoints for --resume."""
+        return self.adapters.state_dict()
+
+    def load_state_dict(self, state_dict):
+        """Restores feature adapter weights saved by state_dict()."""
+        self.adapters.load_state_dict(state_dict)
+
+    @staticmethod
+    def normalize(x):
+        """Standardizes each channel of each image, so features of different scale and width compare (PKD)."""
+        x = x.flatten(2)
+        return (x - x.mean(2, keepdim=True)) / (x.std(2, keepdim=True) + 1e-6)
+
+    @staticmethod
+    def decode(p, anchors):
+        """Returns (xy, wh) in grid units from raw (bs, na, ny, nx, no) predictions, like ComputeLoss."""
+        xy = p[..., :2].sigmoid() * 2 - 0.5
+        wh = (p[..., 2:4].sigmoid() * 2) ** 2 * anchors.view(1, -1, 1, 1, 2)
+        return torch.cat((xy, wh), -1)
+
+    def __call__(self, p, features, tp, tfeatures):
+        """Returns the feature + prediction distillation loss scaled by batch size, and its detached items."""
+        lfeat = torch.zeros(1, device=self.device)  # feature imitation loss
+        lpred = torch.zeros(1, device=self.device)  # prediction loss
+        for adapter, f, tf in zip(self.adapters, features, tfeatures):
+            f = adapter(f.to(adapter.weight.dtype))
+            lfeat += (self.normalize(f) - self.normalize(tf.to(f.dtype))).pow(2).mean()
+
+        for i, (pi, ti) in enumerate(zip(p, tp)):
+            ti = ti.to(pi.dtype)
+            tobj = ti[..., 4].sigmoid()
+            lpred += self.BCE(pi[..., 4], tobj).mean()  # objectness everywhere
+            w = tobj.detach().unsqueeze(-1)  # box/class terms weighted by teacher objectness
+            box = (self.decode(pi, self.detect.anchors[i]) - self.decode(ti, self.teacher_anchors[i])).pow(2)
+            lpred += (box * w).sum() / (w.sum() * 4 + 1e-6)
+            if self.nc > 1:
+                cls = self.BCE(pi[..., 5:], ti[..., 5:].sigmoid())
+                lpred += (cls * w).sum() / (w.sum() * self.nc + 1e-6)
+
+        lfeat *= self.feat / self.nl
+        lpred *= self.pred / self.nl
+        bs = p[0].shape[0]  # batch size
+        return (lfeat + lpred) * bs, torch.cat((lfeat, lpred)).detach()
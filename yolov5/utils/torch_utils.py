@@ -297,6 +297,8 @@ def model_info(model, verbose=False, imgsz=640):
     """
     Prints model summary including layers, parameters, gradients, and FLOPs; imgsz may be int or list.
 
+    Returns (parameters, GFLOPs at imgsz), GFLOPs is None when thop is unavailable.
+
     Example: img_size=640 or img_size=[640, 320]
     """
     n_p = sum(x.numel() for x in model.parameters())  # number parameters
@@ -315,13 +317,15 @@ def model_info(model, verbose=False, imgsz=640):
         stride = max(int(model.stride.max()), 32) if hasattr(model, "stride") else 32  # max stride
         im = torch.empty((1, p.shape[1], stride, stride), device=p.device)  # input image in BCHW format
         flops = thop.profile(deepcopy(model), inputs=(im,), verbose=False)[0] / 1e9 * 2  # stride GFLOPs
-        imgsz = imgsz if isinstance(imgsz, list) else [imgsz, imgsz]  # expand if int/float
-        fs = f", {flops * imgsz[0] / stride * imgsz[1] / stride:.1f} GFLOPs"  # 640x640 GFLOPs
+        imgsz = imgsz if isinstance(imgsz, (list, tuple)) else [imgsz, imgsz]  # expand if int/float
+        gflops = flops * imgsz[0] / stride * imgsz[1] / stride  # 640x640 GFLOPs
+        fs = f", {gflops:.1f} GFLOPs"
     except Exception:
-        fs = ""
+        gflops, fs = None, ""
 
     name = Path(model.yaml_file).stem.replace("yolov5", "YOLOv5") if hasattr(model, "yaml_file") else "Model"
     LOGGER.info(f"{name} summary: {len(list(model.modules()))} layers, {n_p} parameters, {n_g} gradients{fs}")
+    return n_p, gflops
 
 
 def scale_img(img, ratio=1.0, same_shape=False, gs=32):  # img(16,3,256,416)